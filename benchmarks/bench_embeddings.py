@@ -0,0 +1,80 @@
+"""
+Embedding throughput benchmark (documents/second).
+
+Embeds synthetic prior-auth chunks with each backend and batch size, so the
+local CPU model can be compared with the hashing fallback (and OpenAI when a
+key is configured).
+
+Usage:
+    python benchmarks/bench_embeddings.py [--models hashing,sentence-transformers/all-MiniLM-L6-v2]
+                                          [--docs 512] [--batch-sizes 8,32,64] [--threads 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from rag_indexer import HashingEmbeddings, LocalEmbeddings, get_embeddings  # noqa: E402
+
+_FIELDS = [
+    ("Patient Name", ["John Doe", "Jane Roe", "Maria Lopez", "Sam Patel"]),
+    ("DOB", ["02/14/1980", "11/03/1975", "07/22/1992"]),
+    ("NPI #", ["1234567890", "9876543210", "1122334455"]),
+    ("ICD10", ["I10", "E11.9", "M54.5", "S52.501A"]),
+    ("Diagnosis", ["Hypertension", "Type 2 diabetes", "Low back pain", "Radius fracture"]),
+    ("Provider", ["Dr. Smith", "Dr. Nguyen", "Dr. Alvarez"]),
+    ("Urgency", ["Urgent", "Non-urgent"]),
+    ("Service Type", ["Physical Therapy", "Occupational Therapy", "Home Health"]),
+]
+
+
+def synthetic_chunks(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        "\n".join(f"{label}: {rng.choice(values)}" for label, values in rng.sample(_FIELDS, 6))
+        for _ in range(n)
+    ]
+
+
+def bench(backend, texts, repeats=3):
+    backend.embed_documents(texts[:8])  # warm caches / lazy init
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        backend.embed_documents(texts)
+        best = min(best, time.perf_counter() - t0)
+    return len(texts) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="hashing,sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="8,32,64")
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = synthetic_chunks(args.docs)
+    print(f"{args.docs} synthetic form chunks\n")
+    print(f"{'model':<45}{'batch':>7}{'docs/s':>12}")
+    for name in args.models.split(","):
+        if name == "hashing":
+            print(f"{name:<45}{'-':>7}{bench(HashingEmbeddings(), texts):>12.1f}")
+            continue
+        if name == "openai" or name.startswith("text-embedding"):
+            print(f"{name:<45}{'-':>7}{bench(get_embeddings(name), texts, repeats=1):>12.1f}")
+            continue
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            try:
+                backend = LocalEmbeddings(name, batch_size=batch_size, num_threads=args.threads)
+            except Exception as e:
+                print(f"{name:<45} unavailable: {e}")
+                break
+            print(f"{name:<45}{batch_size:>7}{bench(backend, texts):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Import-time benchmark based on `python -X importtime`.
+
+Imports each module in a fresh interpreter several times and reports the
+median cumulative import time, plus the heaviest dependencies pulled in.
+
+Usage:
+    python benchmarks/bench_imports.py [module ...] [--runs 5] [--top 8]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+DEFAULT_MODULES = ["reader", "extractor", "summarizer", "rag_indexer", "qa_agent"]
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module):
+    """Return [(cumulative_us, depth, name)] for one cold import of `module`."""
+    env = dict(os.environ, PYTHONPATH=SRC, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-bench"))
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(2)), len(m.group(3)), m.group(4)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest top-level dependencies to list")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        totals, last = [], []
+        for _ in range(args.runs):
+            last = import_profile(module)
+            totals.extend(us for us, _, name in last if name == module)
+        if not totals:
+            print(f"{module:<14} import failed")
+            continue
+        print(f"{module:<14} {statistics.median(totals) / 1000:>9.1f} ms  (median of {len(totals)})")
+
+        # Direct dependencies of the module, heaviest first
+        direct = sorted((r for r in last if r[1] == 3), reverse=True)[: args.top]
+        for us, _, name in direct:
+            print(f"    {name:<40} {us / 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
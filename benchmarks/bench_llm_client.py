@@ -0,0 +1,132 @@
+"""
+OpenAI client connection-reuse benchmark.
+
+Compares building a client per request (what extractor/summarizer used to do)
+with the shared pooled client from llm_client. By default it runs against a
+local HTTPS stub with a self-signed certificate, so the difference is the
+TCP + TLS handshake a reused keep-alive connection avoids. Pass --base-url
+and an API key to measure a real endpoint (uses the free GET /models call).
+
+Usage:
+    python benchmarks/bench_llm_client.py [--requests 50] [--plain-http]
+    python benchmarks/bench_llm_client.py --base-url https://api.openai.com/v1 --requests 10
+"""
+import argparse
+import datetime
+import json
+import os
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from llm_client import create_openai_client  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"object": "list", "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "me"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _self_signed_cert(directory):
+    """Write a localhost cert/key pair; returns their paths."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+    import ipaddress
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def start_stub(tls, directory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    verify, scheme = True, "http"
+    if tls:
+        cert_path, key_path = _self_signed_cert(directory)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(cert_path, key_path)
+        server.socket = ctx.wrap_socket(server.socket, server_side=True)
+        verify, scheme = cert_path, "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1", verify
+
+
+def per_call(n, **client_kwargs):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        client = create_openai_client(**client_kwargs)
+        client.models.list()
+        client.close()
+    return (time.perf_counter() - t0) / n * 1000
+
+
+def shared(n, **client_kwargs):
+    client = create_openai_client(**client_kwargs)
+    client.models.list()  # pay the handshake once, outside the timing
+    t0 = time.perf_counter()
+    for _ in range(n):
+        client.models.list()
+    elapsed = time.perf_counter() - t0
+    client.close()
+    return elapsed / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--base-url", default="", help="real endpoint instead of the local stub")
+    parser.add_argument("--plain-http", action="store_true", help="stub without TLS")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.base_url:
+            kwargs = {"base_url": args.base_url}
+            target = args.base_url
+        else:
+            server, url, verify = start_stub(not args.plain_http, tmp)
+            kwargs = {"base_url": url, "api_key": "sk-bench", "verify": verify}
+            target = f"local stub ({url.split(':')[0]})"
+
+        cold = per_call(args.requests, **kwargs)
+        warm = shared(args.requests, **kwargs)
+        print(f"{args.requests} requests against {target}")
+        print(f"  client per request : {cold:8.2f} ms/request")
+        print(f"  shared pooled client: {warm:8.2f} ms/request")
+        print(f"  setup saved        : {cold - warm:8.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Per-upload image decoding cost: one decode per engine vs one shared PageImage.
+
+Writes a synthetic scanned form (noise + text-like strokes, ~1-2 MB as PNG)
+and times the image reads a full cascade used to do — EasyOCR and Tesseract
+each decoding the file, Google Vision reading the bytes, Donut opening it
+with PIL — against the same four views taken from one PageImage.
+
+Usage:
+    python benchmarks/bench_page_image.py [--width 1700] [--height 2200] [--repeats 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from page_image import PageImage  # noqa: E402
+
+
+def synthetic_scan(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width), 235, dtype=np.uint8)
+    page += rng.integers(0, 4, size=page.shape, dtype=np.uint8)
+    for y in range(80, height - 80, 36):
+        for x in range(60, width - 200, 220):
+            cv2.putText(page, "Patient Name: John Doe", (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.4, 20, 1)
+    return cv2.cvtColor(page, cv2.COLOR_GRAY2RGB)
+
+
+def per_engine_reads(path):
+    rgb = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)      # EasyOCR
+    gray = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2GRAY)    # Tesseract
+    with open(path, "rb") as f:                                  # Google Vision
+        data = f.read()
+    pil = Image.open(path).convert("RGB")                        # Donut
+    return rgb, gray, data, pil
+
+
+def shared_page(path):
+    page = PageImage(path)
+    return page.rgb, page.gray, page.encoded, page.pil
+
+
+def best_of(fn, path, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1700)
+    parser.add_argument("--height", type=int, default=2200)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scan.png")
+        Image.fromarray(synthetic_scan(args.width, args.height)).save(path)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"{args.width}x{args.height} PNG, {size_mb:.2f} MB\n")
+
+        before = best_of(per_engine_reads, path, args.repeats)
+        after = best_of(shared_page, path, args.repeats)
+        print(f"{'decode per engine':<24}{before * 1000:>10.1f} ms")
+        print(f"{'shared PageImage':<24}{after * 1000:>10.1f} ms")
+        print(f"{'saved per upload':<24}{(before - after) * 1000:>10.1f} ms ({before / after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
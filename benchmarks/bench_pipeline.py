@@ -0,0 +1,93 @@
+"""
+Batch pipeline benchmark: sequential sync calls vs process_forms (async, semaphore-bounded).
+
+Runs extraction + summary + one question per form against a local stub
+chat-completions server that answers after a fixed delay, standing in for
+LLM round-trip latency.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--forms 50] [--latency 0.5] [--concurrency 8]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY = 0.5
+
+
+class StubChat(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(LATENCY)
+        content = json.dumps({"form_type": "Prior Authorization",
+                              "fields": {"Patient Name": "John Doe", "DOB": "02/14/1980", "Provider": "Dr. Smith"}})
+        body = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 500, "completion_tokens": 50, "total_tokens": 550},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    global LATENCY
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--forms", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub LLM call")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+    LATENCY = args.latency
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChat)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Point every client at the stub before the modules read their config
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "OPENAI_API_KEY": "sk-bench",
+        "FORCE_LOCAL_ONLY": "false",
+        "DISABLE_ANSWER_CACHE": "true",
+        "OPENAI_MAX_CONNECTIONS": str(max(args.concurrency, 10)),
+    })
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+    from extractor import extract_fields
+    from summarizer import summarize_doc
+    from qa_agent import answer_with_rag
+    from pipeline import process_forms
+
+    docs = [(f"form{i}", f"Patient Name: Patient {i}\nDiagnosis: Hypertension") for i in range(args.forms)]
+    question = "What diagnosis and treatment plan are described?"
+    calls = 3 * args.forms
+    print(f"{args.forms} forms × 3 LLM calls, {args.latency:.2f}s per call")
+
+    if not args.skip_sequential:
+        t0 = time.perf_counter()
+        for _, text in docs:
+            fields = extract_fields(text)
+            summarize_doc(fields, text)
+            answer_with_rag(question, [text])
+        print(f"  sequential           : {time.perf_counter() - t0:7.2f} s (sum of calls ≈ {calls * args.latency:.1f} s)")
+
+    t0 = time.perf_counter()
+    process_forms(docs, questions=[question], max_concurrency=args.concurrency)
+    ideal = calls * args.latency / args.concurrency
+    print(f"  process_forms (x{args.concurrency:<3}) : {time.perf_counter() - t0:7.2f} s (ideal ≈ {ideal:.1f} s)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
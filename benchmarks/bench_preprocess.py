@@ -0,0 +1,83 @@
+"""
+Cost and payoff of the shared OCR preprocessing stage on data/samples.
+
+For each page: preprocessing time (downscale / deskew / crop ... as in
+OCR_PREPROCESS), pixels before and after, and — for engines given with
+--engines and installed here — OCR seconds on the original scan vs the
+processed page. The OCR cache is disabled so every engine call runs.
+
+Usage:
+    python benchmarks/bench_preprocess.py [--samples data/samples] [--pages 5] [--dpi 200] \
+        [--steps downscale,deskew,crop] [--engines easyocr,tesseract]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+os.environ["DISABLE_OCR_CACHE"] = "true"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from page_image import PageImage  # noqa: E402
+from preprocess import preprocess_page  # noqa: E402
+import reader  # noqa: E402
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="data/samples")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--steps", default="downscale,deskew,crop")
+    parser.add_argument("--engines", default="easyocr,tesseract")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.samples, "*.png")) + glob.glob(os.path.join(args.samples, "*.jpg")))
+    paths = paths[:args.pages]
+    if not paths:
+        sys.exit(f"No page images in {args.samples}")
+    steps = [s.strip() for s in args.steps.split(",") if s.strip()]
+    engines = {name: reader._OCR_ENGINES[name] for name in args.engines.split(",") if name in reader._OCR_ENGINES}
+    if "easyocr" in engines and not reader._ensure_easyocr_loaded():
+        print("easyocr: unavailable (not installed or DISABLE_EASYOCR)")
+        del engines["easyocr"]
+
+    prep_seconds, engine_seconds = 0.0, {}
+    for path in paths:
+        page = PageImage(path)
+        page.rgb  # decode outside the timings
+        processed, seconds = timed(preprocess_page, page, steps, args.dpi)
+        before, after = page.shape[0] * page.shape[1], processed.shape[0] * processed.shape[1]
+        print(f"{os.path.basename(path)[:40]:<42}{seconds * 1000:>7.0f} ms  "
+              f"{before / 1e6:.1f} -> {after / 1e6:.1f} MP")
+        prep_seconds += seconds
+
+        for name, run in engines.items():
+            try:
+                _, original = timed(run, page)
+                _, normalized = timed(run, processed)
+            except Exception as e:
+                print(f"  {name:<12}unavailable ({type(e).__name__}: {e})")
+                engines = {k: v for k, v in engines.items() if k != name}
+                continue
+            print(f"  {name:<12}{original:>7.2f} s -> {normalized:.2f} s")
+            runs = engine_seconds.setdefault(name, [0.0, 0.0])
+            runs[0] += original
+            runs[1] += normalized
+
+    print(f"\nmean preprocessing: {prep_seconds / len(paths) * 1000:.0f} ms/page")
+    for name, (original, normalized) in engine_seconds.items():
+        if name in engines:
+            print(f"{name}: {original / len(paths):.2f} s -> {normalized / len(paths):.2f} s per page "
+                  f"({original / max(normalized, 1e-9):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Retrieval benchmark: recall@k and query latency for vector, BM25 and hybrid modes.
+
+Forms are OCR'd from data/samples (or synthesized when no OCR engine is
+available). Each "Label: value" line becomes a question: the query is the
+label, and a hit means a retrieved chunk contains the value.
+
+Usage:
+    python benchmarks/bench_retrieval.py [--samples data/samples] [--k 3]
+                                         [--embedding hashing] [--store numpy]
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import rag_indexer  # noqa: E402
+from reader import load_document_text  # noqa: E402
+
+_FIELD = re.compile(r"^\s*([A-Za-z][^:\n]{1,40}):\s*(\S[^\n]{2,})$", re.MULTILINE)
+_SYNTHETIC_FIELDS = [
+    ("Patient Name", ["John Doe", "Jane Roe", "Maria Lopez", "Sam Patel"]),
+    ("DOB", ["02/14/1980", "11/03/1975", "07/22/1992"]),
+    ("Member ID", ["XJ{:07d}"]),
+    ("NPI #", ["{:010d}"]),
+    ("ICD10", ["I10", "E11.9", "M54.5", "S52.501A"]),
+    ("Diagnosis", ["Hypertension", "Type 2 diabetes", "Low back pain"]),
+    ("Provider", ["Dr. Smith", "Dr. Nguyen", "Dr. Alvarez"]),
+    ("Service Type", ["Physical Therapy", "Occupational Therapy", "Home Health"]),
+]
+
+
+def load_forms(samples_dir):
+    forms = []
+    for path in sorted(glob.glob(os.path.join(samples_dir, "*"))):
+        try:
+            _, text = load_document_text(path)
+        except Exception:
+            text = ""
+        if text.strip():
+            forms.append((os.path.basename(path), text))
+    return forms
+
+
+def synthetic_forms(n, seed=0):
+    rng = random.Random(seed)
+    forms = []
+    for i in range(n):
+        lines = [f"{label}: {rng.choice(values).format(rng.randrange(10 ** 7))}" for label, values in _SYNTHETIC_FIELDS]
+        forms.append((f"synthetic-{i}", "\n".join(lines)))
+    return forms
+
+
+def questions_for(forms):
+    """
+    (query, value) for every field line of every form. Queries name the field
+    and, where the form has one, its Member ID, the way a user would ask
+    "NPI # for member XJ0012345" across a batch of similar forms.
+    """
+    questions = []
+    for _, text in forms:
+        fields = [(label.strip(), value.strip()) for label, value in _FIELD.findall(text)]
+        member = dict(fields).get("Member ID")
+        for label, value in fields:
+            if label != "Member ID":
+                questions.append((f"{label} for member {member}" if member else label, value))
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=os.path.join(ROOT, "data", "samples"))
+    parser.add_argument("--synthetic", type=int, default=40, help="forms to generate when OCR yields nothing")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--embedding", default="hashing")
+    parser.add_argument("--store", default="numpy")
+    args = parser.parse_args()
+
+    forms = load_forms(args.samples)
+    if not forms:
+        print(f"No OCR text from {args.samples}; using {args.synthetic} synthetic forms")
+        forms = synthetic_forms(args.synthetic)
+
+    rag_indexer.VECTOR_STORE = args.store
+    rag_indexer.EMBEDDING_MODEL = args.embedding
+    index = rag_indexer.build_index(forms)
+    questions = questions_for(forms)
+    print(f"{len(forms)} forms, {len(questions)} field questions, k={args.k}\n")
+
+    print(f"{'mode':<8}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}")
+    for mode in ("vector", "bm25", "hybrid"):
+        hits, latencies = 0, []
+        for query, value in questions:
+            t0 = time.perf_counter()
+            ctx = rag_indexer.retrieve_context(index, query, k=args.k, mode=mode)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += any(value in c for c in ctx)
+        latencies.sort()
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(f"{mode:<8}{hits / len(questions):>10.2f}{sum(latencies) / len(latencies):>10.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
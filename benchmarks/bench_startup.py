@@ -0,0 +1,73 @@
+"""
+Startup benchmark: cost of the first request with and without model warmup.
+
+Each scenario runs in a fresh interpreter so module imports and model
+construction are measured from a cold process:
+
+  cold    import reader, then time the first load_document_text() call
+  warmup  import reader, time warmup(background=False), then the first call
+
+Usage:
+    python benchmarks/bench_startup.py [image_path] [--models easyocr,donut]
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+_SCENARIO = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import reader
+t_import = time.perf_counter() - t0
+
+t_warmup = 0.0
+if {warm!r}:
+    t0 = time.perf_counter()
+    reader.warmup({models!r}, background=False)
+    t_warmup = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+reader.load_document_text({path!r})
+t_first = time.perf_counter() - t0
+
+t0 = time.perf_counter()
+reader.load_document_text({path!r})
+t_second = time.perf_counter() - t0
+
+print(json.dumps({{"import": t_import, "warmup": t_warmup, "first": t_first,
+                  "second": t_second, "status": reader.model_status()}}))
+"""
+
+
+def run_scenario(path, models, warm):
+    env = dict(os.environ, PYTHONPATH=SRC, DISABLE_OCR_CACHE="true")
+    code = _SCENARIO.format(path=path, models=tuple(models), warm=warm)
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", nargs="?", help="form image to OCR (default: first file in data/samples)")
+    parser.add_argument("--models", default="easyocr,donut", help="models to warm up")
+    args = parser.parse_args()
+
+    path = args.image or sorted(glob.glob(os.path.join(ROOT, "data", "samples", "*.png")))[0]
+    models = [m for m in args.models.split(",") if m]
+
+    print(f"Image: {os.path.basename(path)}  Models: {', '.join(models)}\n")
+    print(f"{'scenario':<10}{'import':>10}{'warmup':>10}{'1st req':>10}{'2nd req':>10}")
+    for name, warm in (("cold", False), ("warmup", True)):
+        r = run_scenario(path, models, warm)
+        print(f"{name:<10}{r['import']:>9.2f}s{r['warmup']:>9.2f}s{r['first']:>9.2f}s{r['second']:>9.2f}s")
+    print(f"\nModel status after warmup: {r['status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Tesseract throughput: one `tesseract` process per page (pytesseract) vs
+persistent in-process engines (TesseractPool / tesserocr).
+
+Runs the same Otsu-thresholded pages `_ocr_tesseract` feeds Tesseract through
+both backends, sequentially and with --threads callers, and reports
+pages/second. Backends that are not installed are reported and skipped.
+
+Usage:
+    python benchmarks/bench_tesseract.py [--samples data/samples] [--pages 10] [--threads 4]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from page_image import PageImage  # noqa: E402
+from tesseract_pool import TesseractPool  # noqa: E402
+
+
+def load_pages(samples, limit):
+    paths = sorted(glob.glob(os.path.join(samples, "*.png")) + glob.glob(os.path.join(samples, "*.jpg")))[:limit]
+    pages = []
+    for path in paths:
+        _, thresh = cv2.threshold(PageImage(path).gray, 0, 255, cv2.THRESH_OTSU | cv2.THRESH_BINARY)
+        pages.append(thresh)
+    return pages
+
+
+def subprocess_backend(threads):
+    import pytesseract
+    pytesseract.get_tesseract_version()  # fails fast when the binary is missing
+    return lambda gray: pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
+
+
+def pool_backend(threads):
+    import tesserocr  # noqa: F401
+    return TesseractPool(size=threads).image_to_data
+
+
+def pages_per_second(ocr, pages, threads):
+    ocr(pages[0])  # warm up (engine creation / first process start)
+    t0 = time.perf_counter()
+    if threads == 1:
+        for page in pages:
+            ocr(page)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(ocr, pages))
+    return len(pages) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default="data/samples")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    pages = load_pages(args.samples, args.pages)
+    if not pages:
+        sys.exit(f"No page images in {args.samples}")
+    print(f"{len(pages)} pages from {args.samples}\n")
+
+    backends = [
+        ("subprocess", subprocess_backend, 1), ("tesserocr pool", pool_backend, 1),
+        (f"subprocess x{args.threads}", subprocess_backend, args.threads),
+        (f"tesserocr pool x{args.threads}", pool_backend, args.threads),
+    ]
+    for label, make, threads in backends:
+        try:
+            ocr = make(threads)
+        except Exception as e:
+            print(f"{label:<26}unavailable ({type(e).__name__}: {e})")
+            continue
+        print(f"{label:<26}{pages_per_second(ocr, pages, threads):>8.2f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
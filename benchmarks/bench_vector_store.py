@@ -0,0 +1,78 @@
+"""
+Vector store benchmark: Chroma vs the in-process NumpyVectorStore.
+
+Reports build time and mean query latency at several index sizes. Vectors are
+random unit vectors from a fixed-seed embedder, so the numbers measure the
+stores themselves rather than an embedding model.
+
+Usage:
+    python benchmarks/bench_vector_store.py [--sizes 10,1000,100000] [--dim 384]
+                                            [--queries 50] [--k 3] [--stores numpy,chroma]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from langchain_core.embeddings import Embeddings  # noqa: E402
+from langchain_community.vectorstores import Chroma  # noqa: E402
+from rag_indexer import NumpyVectorStore  # noqa: E402
+
+
+class RandomEmbeddings(Embeddings):
+    """Deterministic random vectors, cheap enough not to skew the timings."""
+
+    def __init__(self, dim, seed=0):
+        self.dim = dim
+        self.rng = np.random.default_rng(seed)
+
+    def embed_documents(self, texts):
+        return self.rng.standard_normal((len(texts), self.dim), dtype=np.float32).tolist()
+
+    def embed_query(self, text):
+        return self.rng.standard_normal(self.dim, dtype=np.float32).tolist()
+
+
+def build(store, texts, embedding):
+    ids = [str(i) for i in range(len(texts))]
+    if store == "numpy":
+        return NumpyVectorStore.from_texts(texts, embedding, ids=ids)
+    return Chroma.from_texts(texts, embedding, ids=ids, collection_name=f"bench-{uuid.uuid4().hex}")
+
+
+def bench(store, n, dim, n_queries, k):
+    texts = [f"chunk {i}" for i in range(n)]
+    t0 = time.perf_counter()
+    index = build(store, texts, RandomEmbeddings(dim))
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(n_queries):
+        index.similarity_search(f"query {i}", k=k)
+    query_ms = (time.perf_counter() - t0) / n_queries * 1000
+    return build_s, query_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--stores", default="numpy,chroma")
+    args = parser.parse_args()
+
+    print(f"{'store':<8}{'chunks':>9}{'build (s)':>12}{'query (ms)':>13}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        for store in args.stores.split(","):
+            build_s, query_ms = bench(store, n, args.dim, args.queries, args.k)
+            print(f"{store:<8}{n:>9}{build_s:>12.3f}{query_ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
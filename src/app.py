@@ -1,12 +1,13 @@
 import streamlit as st
+import sys
 import tempfile
 import json
-from reader import load_document_text, _donut_answer, _donut_extract_form_data, HAS_DONUT
-from extractor import extract_fields
-from summarizer import summarize_doc
-from rag_indexer import build_index, retrieve_context
-from qa_agent import answer_with_rag
-from config import can_use_openai, OPENAI_API_KEY, PINECONE_API_KEY, GOOGLE_CREDS
+from reader import load_document_text, _donut_analyze, _donut_extract_form_data_batch, warmup, model_status
+from page_image import PageImage
+from preprocess import preprocess_page
+# extractor / summarizer / rag_indexer / qa_agent pull in openai and langchain;
+# they are imported inside the tab that uses them so the page renders first.
+from config import can_use_openai, OPENAI_API_KEY, PINECONE_API_KEY, GOOGLE_CREDS, WARMUP_MODELS
 
 # -----------------------------------
 # Page setup
@@ -45,6 +46,52 @@ st.markdown(
 st.title("Intelligent Form Agent (Hybrid Cloud + Local)")
 st.caption("Autonomize-style document agent • OCR → Fields → RAG → QA → Visual Reasoning → Summary")
 
+# -----------------------------------
+# Model warmup (once per server process)
+# -----------------------------------
+@st.cache_resource
+def _start_model_warmup():
+    return warmup(WARMUP_MODELS)
+
+
+_start_model_warmup()
+
+
+def _donut_ready():
+    # Never block a query on a model that is still loading; Donut joins in once ready
+    return model_status().get("donut") == "ready"
+
+
+@st.fragment(run_every="2s")
+def _model_status_panel():
+    status = {m: model_status().get(m, "not_loaded") for m in WARMUP_MODELS}
+    if not status:
+        return
+    settled = [m for m, state in status.items() if state not in ("loading", "not_loaded")]
+    st.markdown("**Model status**")
+    st.progress(len(settled) / len(status), text=f"{len(settled)}/{len(status)} models loaded")
+    for name, state in status.items():
+        st.caption(f"{name}: {state}")
+
+
+def _answer_cache_panel():
+    # Only once a QA tab has imported qa_agent; importing it here would slow the first render
+    qa_agent = sys.modules.get("qa_agent")
+    if qa_agent is None:
+        return
+    stats = qa_agent.answer_cache_stats()
+    if stats["hits"] + stats["misses"]:
+        st.markdown("**Answer cache**")
+        st.caption(
+            f"hit rate {stats['hit_rate']:.0%} • saved {stats['tokens_saved']} tokens "
+            f"(${stats['cost_saved_usd']:.4f}, {stats['seconds_saved']:.1f}s)"
+        )
+
+
+with st.sidebar:
+    _model_status_panel()
+    _answer_cache_panel()
+
 # -----------------------------------
 # Tabs
 # -----------------------------------
@@ -67,33 +114,42 @@ with tab1:
     if st.button("Analyze") and f and q:
         with tempfile.NamedTemporaryFile(delete=False) as tmp:
             tmp.write(f.read())
-            doc_id, text = load_document_text(tmp.name)
+        # OCR and Donut below read the same decoded pixels
+        page = PageImage(tmp.name)
+        doc_id, text = load_document_text(page)
 
         # --- Donut Vision Reasoning: Extract checkbox/visual data FIRST ---
         enhanced_text = text
         visual_answer = ""
         donut_data = {}
         
-        if HAS_DONUT:
+        if _donut_ready():
             with st.spinner("Extracting checkbox and visual form data (Donut)..."):
-                # Extract structured checkbox data and add to text for RAG
-                donut_data = _donut_extract_form_data(tmp.name)
+                # One encoder pass serves both the structured extraction and the question
+                # (on the same preprocessed page the OCR cascade read)
+                donut_data, visual_answers = _donut_analyze(preprocess_page(page), [q])
                 if donut_data:
                     # Convert Donut extracted data to text format for RAG
                     donut_text = "\n\n=== VISUAL/CHECKBOX DATA (Donut Extraction) ===\n"
                     donut_text += json.dumps(donut_data, indent=2)
                     enhanced_text = text + "\n\n" + donut_text
-                    
-            with st.spinner("Performing vision-language reasoning (Donut)..."):
-                visual_answer = _donut_answer(tmp.name, q)
+
+                visual_answer = visual_answers.get(q, "")
                 if visual_answer:
                     st.info(f"**Donut visual answer:** {visual_answer}")
 
         # --- RAG-based QA (now includes checkbox data in context) ---
         with st.spinner("Retrieving relevant context and generating response..."):
+            from rag_indexer import build_index
+            from qa_agent import answer_with_rag
+            from field_lookup import parse_key_values
+
             build_index([{"doc_id": doc_id, "text": enhanced_text}])  # Use enhanced text with checkbox data
-            ctx = retrieve_context(q)
-            ans = answer_with_rag(q, ctx)
+            # Plain field lookups are answered from the form's key/values; RAG only runs otherwise
+            fields = {**parse_key_values(text), **donut_data}
+            ans, provenance = answer_with_rag(q, fields=fields, with_provenance=True)
+            if provenance["source"] == "fields":
+                st.caption(f"Answered from field **{provenance['field']}** (match {provenance['score']:.2f})")
 
         # --- Combine: Prioritize Donut answer for checkbox/visual questions ---
         checkbox_keywords = ["checkbox", "marked", "checked", "selected", "urgent", "routine", "option"]
@@ -119,6 +175,9 @@ with tab2:
             doc_id, text = load_document_text(tmp.name)
 
         with st.spinner("Extracting structured fields..."):
+            from extractor import extract_fields
+            from summarizer import summarize_doc
+
             fields = extract_fields(text)
             st.json(fields)
 
@@ -138,24 +197,30 @@ with tab3:
 
     if st.button("Get Insights") and files and q2:
         docs = []
-        
+        pages = []
+
         for f3 in files:
             with tempfile.NamedTemporaryFile(delete=False) as tmp:
                 tmp.write(f3.read())
-                doc_id, text = load_document_text(tmp.name)
-                
-                # Enhance text with Donut checkbox/visual data
-                enhanced_text = text
-                if HAS_DONUT:
-                    donut_data = _donut_extract_form_data(tmp.name)
+            # One decode per upload: OCR and Donut read the same preprocessed page
+            page = PageImage(tmp.name)
+            doc_id, text = load_document_text(page)
+            docs.append({"doc_id": doc_id, "text": text})
+            pages.append(preprocess_page(page))
+
+        # Enhance text with Donut checkbox/visual data (one batched pass over all forms)
+        if _donut_ready():
+            with st.spinner("Extracting checkbox and visual form data (Donut)..."):
+                for doc, donut_data in zip(docs, _donut_extract_form_data_batch(pages)):
                     if donut_data:
                         donut_text = "\n\n=== VISUAL/CHECKBOX DATA (Donut Extraction) ===\n"
                         donut_text += json.dumps(donut_data, indent=2)
-                        enhanced_text = text + "\n\n" + donut_text
-                
-                docs.append({"doc_id": doc_id, "text": enhanced_text})
+                        doc["text"] = doc["text"] + "\n\n" + donut_text
 
         with st.spinner("Building knowledge base and retrieving answers..."):
+            from rag_indexer import build_index, retrieve_context
+            from qa_agent import answer_with_rag
+
             build_index(docs)
             ctx = retrieve_context(q2)
             final_ans = answer_with_rag(q2, ctx)
@@ -13,5 +13,101 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY", "")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "")
 GOOGLE_CREDS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
 
+# Shared OpenAI client: one pooled, keep-alive HTTP connection pool for every call
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# Concurrent requests in flight; further calls wait for a free connection
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "10"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+# LLM calls the async batch pipeline keeps in flight at once
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# OCR result cache (keyed by file bytes + engine settings)
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "form-agent")
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "256"))
+
+# OCR cascade: engines in order, the quality score (ocr_quality, 0-1) that ends it early,
+# and whether the first two engines run at the same time (first acceptable result wins)
+OCR_ENGINES = [e.strip() for e in os.getenv("OCR_ENGINES", "easyocr,tesseract,google_vision,donut").split(",") if e.strip()]
+OCR_MIN_QUALITY = float(os.getenv("OCR_MIN_QUALITY", "0.6"))
+OCR_RACE_ENGINES = os.getenv("OCR_RACE_ENGINES", "false").lower() == "true"
+# Reorder OCR_ENGINES per page from a cheap image classifier (printed / fax / photo / handwritten / blank)
+OCR_ROUTING = os.getenv("OCR_ROUTING", "true").lower() == "true"
+
+# Page preprocessing shared by all OCR engines (comma-separated, run in a fixed order:
+# downscale,deskew,denoise,crop,threshold; empty disables) and the DPI large scans are reduced to
+OCR_PREPROCESS = [s.strip() for s in os.getenv("OCR_PREPROCESS", "downscale,deskew,crop").split(",") if s.strip()]
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "200"))
+
+# Tesseract backend: "auto" (tesserocr's persistent in-process engines when installed, else
+# pytesseract), "tesserocr" or "subprocess"; engines kept per process (default: CPU count, max 4)
+TESSERACT_BACKEND = os.getenv("TESSERACT_BACKEND", "auto").lower()
+TESSERACT_WORKERS = int(os.getenv("TESSERACT_WORKERS") or min(os.cpu_count() or 1, 4))
+
+# Scanned-PDF OCR: rasterization DPI and worker processes
+PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS") or os.cpu_count() or 1)
+
+# Models pre-loaded in the background when the app starts (comma-separated; empty disables)
+WARMUP_MODELS = [m.strip() for m in os.getenv("WARMUP_MODELS", "easyocr,donut").split(",") if m.strip()]
+
+# Pages per Donut generate() call for multi-form uploads
+DONUT_BATCH_SIZE = int(os.getenv("DONUT_BATCH_SIZE", "8"))
+# Encoded form images kept in memory so follow-up questions skip the vision encoder
+DONUT_ENCODER_CACHE_SIZE = int(os.getenv("DONUT_ENCODER_CACHE_SIZE", "4"))
+
+# Local embedding backend: texts per forward pass and CPU threads (0 = torch default)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+
+# Embedding cache (keyed by model name + text hash); entries unused for MAX_AGE_DAYS are dropped
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR") or OCR_CACHE_DIR
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+EMBEDDING_CACHE_MAX_AGE_DAYS = float(os.getenv("EMBEDDING_CACHE_MAX_AGE_DAYS", "30"))
+
+# RAG vector store: "chroma" or "numpy" (in-process float32 matrix, cheap for small per-session indexes)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+
+# Retrieval: "hybrid" (BM25 + vectors with reciprocal-rank fusion), "vector" or "bm25".
+# With BM25_FAST_PATH, queries whose terms all appear in the best lexical hit skip the vector search.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+BM25_FAST_PATH = os.getenv("BM25_FAST_PATH", "true").lower() == "true"
+
+# Field labels the rule-based extractor must resolve before extract_fields skips the LLM
+EXTRACT_REQUIRED_FIELDS = [
+    f.strip() for f in os.getenv(
+        "EXTRACT_REQUIRED_FIELDS", "Patient Name,DOB,Provider,NPI #,ICD10,Diagnosis,Urgency"
+    ).split(",") if f.strip()
+]
+# Targeted refinement call when an extraction has fewer fields than this; rounds = max extra calls (0 disables)
+EXTRACT_REFINE_MIN_FIELDS = int(os.getenv("EXTRACT_REFINE_MIN_FIELDS", "3"))
+EXTRACT_MAX_REFINE_ROUNDS = int(os.getenv("EXTRACT_MAX_REFINE_ROUNDS", "1"))
+# Request response_format={"type": "json_object"}; disable for OpenAI-compatible servers without JSON mode
+OPENAI_JSON_MODE = os.getenv("OPENAI_JSON_MODE", "true").lower() == "true"
+
+# Prompt budgets in tokens (instructions included); content is fitted highest-value first
+SUMMARY_PROMPT_TOKENS = int(os.getenv("SUMMARY_PROMPT_TOKENS", "700"))
+EXTRACT_PROMPT_TOKENS = int(os.getenv("EXTRACT_PROMPT_TOKENS", "3000"))
+QA_PROMPT_TOKENS = int(os.getenv("QA_PROMPT_TOKENS", "2500"))
+
+# Answer field-lookup questions ("Who is the patient?") from extracted fields when the match scores at least this
+FIELD_LOOKUP_MIN_SCORE = float(os.getenv("FIELD_LOOKUP_MIN_SCORE", "0.8"))
+
+# QA answer cache: entries, lifetime in seconds, and question-embedding similarity for
+# semantic hits (0 = exact normalized question only)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("ANSWER_CACHE_SEMANTIC_THRESHOLD", "0"))
+# USD per 1M tokens, used to report what cache hits saved (defaults: gpt-4o-mini)
+OPENAI_PRICE_INPUT_PER_1M = float(os.getenv("OPENAI_PRICE_INPUT_PER_1M", "0.15"))
+OPENAI_PRICE_OUTPUT_PER_1M = float(os.getenv("OPENAI_PRICE_OUTPUT_PER_1M", "0.60"))
+
+# RAG chunking: "tokens" (fixed windows with overlap), "sections" (form blocks) or "none"
+CHUNK_MODE = os.getenv("CHUNK_MODE", "sections")
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "40"))
+
 def can_use_openai():
     return (not FORCE_LOCAL_ONLY) and bool(OPENAI_API_KEY)
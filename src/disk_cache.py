@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def make_key(*parts):
+    """Stable cache key from any JSON-serializable parts (digests, engine names, settings)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes, or None if it cannot be read."""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+# Other processes (e.g. scanned-PDF OCR workers) may write the same file, so the
+# running size total is re-read from the table this often instead of trusted forever
+_RESYNC_WRITES = 256
+
+
+class DiskCache:
+    """
+    Persistent key → bytes cache backed by a single SQLite file.
+    Entries are evicted least-recently-used first once the stored
+    values exceed `max_bytes`, and entries not read for `max_age`
+    seconds are dropped (None keeps them indefinitely). Safe to share
+    across threads.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, max_age=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+        # Running total of stored value sizes, so a write does not have to SUM the whole table
+        self._total = self._stored_bytes()
+        self._writes = 0
+
+    def _stored_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        return self.get_many([key])[key]
+
+    def get_many(self, keys):
+        """{key: bytes or None} for `keys`, looked up in one transaction."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, value, accessed in self._conn.execute(
+                    f"SELECT key, value, accessed FROM entries WHERE key IN ({placeholders})", batch
+                ):
+                    if self.max_age is None or now - accessed <= self.max_age:
+                        found[key] = bytes(value)
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", [(now, k) for k in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {k: found.get(k) for k in keys}
+
+    def put(self, key, value: bytes):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        """Store every (key, bytes) pair of the `items` mapping in one transaction."""
+        now = time.time()
+        rows = [
+            (key, sqlite3.Binary(value), len(value), now)
+            for key, value in items.items()
+            if len(value) <= self.max_bytes
+        ]
+        if not rows:
+            return
+        with self._lock:
+            # Replaced entries no longer count (primary-key lookups, not a table scan)
+            replaced = 0
+            for i in range(0, len(rows), 500):
+                batch = [row[0] for row in rows[i:i + 500]]
+                placeholders = ",".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)", rows
+            )
+            self._total += sum(row[2] for row in rows) - replaced
+            self._writes += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            self._total -= self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries WHERE accessed < ?", (cutoff,)
+            ).fetchone()[0]
+            self._conn.execute("DELETE FROM entries WHERE accessed < ?", (cutoff,))
+        # Confirm against the table before evicting anything, and now and then regardless
+        if self._total > self.max_bytes or self._writes >= _RESYNC_WRITES:
+            self._total, self._writes = self._stored_bytes(), 0
+        if self._total <= self.max_bytes:
+            return
+        # Walk oldest-first and drop entries until we are back under the limit
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            if self._total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._total = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,23 +1,178 @@
+import re
 import json
-from openai import OpenAI
-from config import can_use_openai, OPENAI_MODEL
+import time
+from llm_client import get_openai_client, get_async_openai_client
+from field_lookup import field_concept
+from prompt_budget import count_tokens, fit_sections
+from config import (
+    can_use_openai, OPENAI_MODEL, OPENAI_JSON_MODE, EXTRACT_PROMPT_TOKENS,
+    EXTRACT_REQUIRED_FIELDS, EXTRACT_REFINE_MIN_FIELDS, EXTRACT_MAX_REFINE_ROUNDS,
+)
 
 
-# Ollama has been removed — extractor uses OpenAI when available, otherwise a deterministic fallback
+# Ollama has been removed — the rule-based extractor below is the local path;
+# OpenAI is only asked for the fields it could not resolve
 
 
 # ------------------------
-# Adaptive Field Extractor
+# Rule-based Local Extractor
 # ------------------------
-def extract_fields(form_text: str):
+_CHECKED = r"(?:\[\s*[xX✓✔]\s*\]|\(\s*[xX✓✔]\s*\)|[☒☑✔✓])"
+_UNCHECKED = r"(?:\[\s*\]|\(\s*\)|[☐□○])"
+_CHECKED_RE = re.compile(_CHECKED)
+_CHECKBOX = re.compile(
+    rf"({_CHECKED}|{_UNCHECKED})\s*(.+?)(?=\s*(?:{_CHECKED}|{_UNCHECKED})|\s{{2,}}|$)"
+)
+# Columns on one OCR line are separated by runs of spaces, tabs or " | "
+_COLUMNS = re.compile(r"\s{3,}|\t+|\s\|\s")
+# List bullets in front of a label ("● Member ID: 12345")
+_BULLET = re.compile(r"^[•●■▪◦*-]+\s*")
+_LABEL_VALUE = re.compile(r"^([A-Za-z][^:\n]{0,60}?)\s*:(?!//)\s*(\S.*?)\s*$")
+_NPI = re.compile(r"\bNPI\b[^\d\n]{0,15}(\d{10})\b", re.IGNORECASE)
+_ICD_LINE = re.compile(r"\bICD[\s-]*10\b", re.IGNORECASE)
+_ICD_CODE = re.compile(r"\b[A-TV-Z][0-9][0-9A-Z](?:\.[0-9A-Z]{1,4})?\b")
+_DOB_LINE = re.compile(r"\b(?:DOB|D\.O\.B\.?|date of birth|birth ?date)\b", re.IGNORECASE)
+_DATE = re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b")
+_URGENCY_WORDS = re.compile(r"\b(urgent|non[- ]?urgent|expedited|routine|standard|emergent|stat)\b", re.IGNORECASE)
+_FORM_TITLES = [
+    (re.compile(r"prior\s+auth", re.IGNORECASE), "Prior Authorization"),
+    (re.compile(r"\bclaim\b", re.IGNORECASE), "Claim Form"),
+    (re.compile(r"\breferral\b", re.IGNORECASE), "Referral"),
+    (re.compile(r"\bprescription\b", re.IGNORECASE), "Prescription"),
+]
+
+
+def _add_field(fields, label, value):
+    """Store value under label; a second, different value turns it into a list."""
+    value = value.strip(" \t:;,.") if isinstance(value, str) else value
+    if not value:
+        return
+    existing = fields.get(label)
+    if existing is None:
+        fields[label] = value
+    elif isinstance(existing, list):
+        if value not in existing:
+            existing.append(value)
+    elif existing != value:
+        fields[label] = [existing, value]
+
+
+def _checkbox_fields(line, pending_label):
+    """(label, [checked options]) for a column of checkbox markers, or None if it has none."""
+    boxes = list(_CHECKBOX.finditer(line))
+    if not boxes:
+        return None
+    checked = [m.group(2).strip(" :.-") for m in boxes if _CHECKED_RE.fullmatch(m.group(1))]
+    label = line[:boxes[0].start()].strip().rstrip(":").strip() or pending_label
+    if not label:
+        label = "Urgency" if any(_URGENCY_WORDS.search(c) for c in checked) else "Checked Options"
+    return label, checked
+
+
+def _local_pass(form_text):
     """
-    Extract fields adaptively from healthcare or administrative forms.
-    1️⃣ Try with local Ollama model (for offline/local extraction)
-    2️⃣ If extraction confidence is low, fallback to OpenAI GPT-4o-mini
+    One pass over the lines of OCR text. Returns (form_type, fields, unparsed)
+    where unparsed are the non-empty lines no rule consumed.
+    """
+    fields, unparsed = {}, []
+    form_type = None
+    pending_label = None  # "Urgency:" on its own line labels the checkboxes below it
+
+    for raw in (form_text or "").splitlines():
+        line = raw.strip()
+        if not line:
+            pending_label = None
+            continue
+        consumed = False
+
+        # Columns first, so "Name: John Doe   Sex: [x] M" keeps the name; unlabeled box columns
+        # take the label of the box column before them ("Sex: [ ] M   [x] F")
+        box_label = pending_label
+        for column in _COLUMNS.split(line):
+            column = _BULLET.sub("", column)
+            boxes = _checkbox_fields(column, box_label)
+            if boxes:
+                label, checked = boxes
+                if not _CHECKBOX.match(column):
+                    box_label = label
+                for option in checked:
+                    _add_field(fields, label, option)
+                consumed = True
+                continue
+            m = _LABEL_VALUE.match(column)
+            if m:
+                label = m.group(1).strip()
+                if label.lower() in ("form type", "form"):
+                    form_type = form_type or m.group(2).strip()
+                else:
+                    _add_field(fields, label, m.group(2))
+                consumed = True
+
+        # Known prior-auth values that do not follow the "Label: value" layout
+        if _NPI.search(line) and not any(field_concept(l) == "npi" for l in fields):
+            _add_field(fields, "NPI #", _NPI.search(line).group(1))
+            consumed = True
+        icd = _ICD_LINE.search(line)
+        if icd and not any(field_concept(l) == "icd10" for l in fields):
+            for code in _ICD_CODE.findall(line[icd.end():]):
+                _add_field(fields, "ICD10", code)
+                consumed = True
+        if _DOB_LINE.search(line) and _DATE.search(line) and not any(field_concept(l) == "dob" for l in fields):
+            _add_field(fields, "DOB", _DATE.search(line).group(0))
+            consumed = True
+
+        if form_type is None:
+            form_type = next((name for pattern, name in _FORM_TITLES if pattern.search(line)), None)
+        pending_label = line.rstrip(":").strip() if line.endswith(":") else None
+        if not consumed and not pending_label:
+            unparsed.append(line)
+
+    return form_type or "Unknown", fields, unparsed
+
+
+def extract_fields_local(form_text: str):
+    """
+    Deterministic, offline field extraction in one linear pass over the text:
+    "Label: value" lines (several per line when OCR keeps columns), checked
+    checkbox options ("[x] Urgent", "☒ Routine") and known prior-auth values
+    that appear without a colon (NPI, ICD-10 codes, DOB). Same output shape
+    as extract_fields.
     """
+    form_type, fields, _ = _local_pass(form_text)
+    return {"form_type": form_type, "fields": fields}
 
-    # --- Adaptive prompt (your full original logic preserved) ---
-    adaptive_prompt = f"""
+
+def _missing_required(result):
+    """EXTRACT_REQUIRED_FIELDS labels whose concept the extraction has not covered."""
+    covered = {field_concept(label) or label.lower() for label in result["fields"]}
+    return [f for f in EXTRACT_REQUIRED_FIELDS if (field_concept(f) or f.lower()) not in covered]
+
+
+def _merge(local, data):
+    """LLM output added under the local result; local values win for fields both found."""
+    data = _ensure_fields_shape(data if isinstance(data, dict) else {})
+    # A reply with "fields": null or a list adds nothing; the local result stands
+    llm_fields = data["fields"] if isinstance(data.get("fields"), dict) else {}
+    covered = {field_concept(label) for label in local["fields"]} - {None}
+    fields = dict(local["fields"])
+    for label, value in llm_fields.items():
+        if label in fields or field_concept(label) in covered:
+            continue
+        fields[label] = value
+    merged = {
+        "form_type": local["form_type"] if local["form_type"] != "Unknown" else data.get("form_type", "Unknown"),
+        "fields": fields,
+    }
+    if "raw_text" in data:
+        merged["raw_text"] = data["raw_text"]
+    return merged
+
+
+# ------------------------
+# Adaptive Field Extractor
+# ------------------------
+# --- Adaptive prompt (your full original logic preserved) ---
+_EXTRACTION_PROMPT = """
 You are an intelligent medical document parser.
 
 Your task:
@@ -52,74 +207,121 @@ Expected output:
   }}
 }}
 
-Now extract all fields from this text:
+{note}Now extract all fields from this text:
 <<<FORM TEXT>>>
 {form_text}
 <<<END FORM TEXT>>>
 """
 
-    # 1) OpenAI path (preferred)
-    data = {}
-    if can_use_openai():
-        try:
-            client = OpenAI()
-            r = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a precise medical form parser."},
-                    {"role": "user", "content": adaptive_prompt}
-                ],
-                temperature=0.1
-            )
-            text = r.choices[0].message.content.strip()
-            start, end = text.find("{"), text.rfind("}")
-            if start != -1:
-                try:
-                    data = json.loads(text[start:end+1])
-                except json.JSONDecodeError:
-                    data = {"form_type": "Unknown", "fields": {}, "raw_text": text}
-        except Exception as e:
-            print(f"⚠️ OpenAI extraction failed: {e}")
-            data = {}
-
-    # 2) Refinement with OpenAI if extraction was weak
-    if (not data or len(data.get("fields", {})) < 3) and can_use_openai():
-        print("🔁 Refining extraction with OpenAI GPT...")
-        try:
-            client = OpenAI()
+_REFINE_PROMPT = """
+Some fields of a medical form are still missing. Read only the unresolved lines below
+and return a JSON object {{"fields": {{"<field_label>": "<field_value>"}}}} with values for: {wanted}.
+Include a field only if its value is explicitly stated; do not repeat these already extracted fields:
+{{{known}}}
 
-            refine_prompt = f"""
-Refine and complete this adaptive JSON extraction.
-Ensure valid JSON structure and infer missing values only if explicitly stated.
+Unresolved lines:
+{lines}
+"""
 
-Form Text:
-{form_text[:4000]}
 
-Partial JSON (if any):
-{json.dumps(data, indent=2)}
-"""
-            r = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a precise medical form parser."},
-                    {"role": "user", "content": refine_prompt}
-                ],
-                temperature=0.1
-            )
-            text = r.choices[0].message.content.strip()
-            start, end = text.find("{"), text.rfind("}")
-            if start != -1:
-                try:
-                    data = json.loads(text[start:end+1])
-                except json.JSONDecodeError:
-                    data = {"form_type": "Unknown", "fields": {}, "raw_text": text}
-        except Exception as e:
-            print(f"⚠️ OpenAI refinement failed: {e}")
-            # Keep existing data or set minimal structure
-            if not data:
-                data = {"form_type": "Unknown", "fields": {}}
-
-    # 3) Guarantee “fields” shape; if no OpenAI, return minimal structure
+def _json_items(fields):
+    """'"label": value' JSON members, one per field, so a budget can drop whole fields."""
+    return [f"{json.dumps(label)}: {json.dumps(value)}" for label, value in (fields or {}).items()]
+
+
+def _extraction_prompt(form_text, known=None, missing=None):
+    # The form text is what the model reads; the known-fields note only saves repeats,
+    # so it gets what the text leaves of the EXTRACT_PROMPT_TOKENS budget
+    items = _json_items(known)
+    overhead = count_tokens(_EXTRACTION_PROMPT.format(note=_known_fields_note(items[:1], missing), form_text=""))
+    fitted = fit_sections([("text", form_text, 0.85), ("known", items, 0.15)], EXTRACT_PROMPT_TOKENS - overhead)
+    return _EXTRACTION_PROMPT.format(note=_known_fields_note(fitted["known"], missing), form_text=fitted["text"])
+
+
+def _known_fields_note(items, missing):
+    if not items:
+        return ""
+    note = (
+        "These fields were already extracted by a local parser; do not repeat them:\n"
+        "{\n  " + ",\n  ".join(items) + "\n}\n"
+    )
+    if missing:
+        note += f"Return only the remaining fields, in particular: {', '.join(missing)}.\n"
+    return note + "\n"
+
+
+def _refine_prompt(lines, missing, data):
+    wanted = ", ".join(missing) if missing else "any clearly labeled field"
+    items = _json_items(data.get("fields"))
+    overhead = count_tokens(_REFINE_PROMPT.format(wanted=wanted, known="", lines=""))
+    fitted = fit_sections([("lines", lines, 0.8), ("known", items, 0.2)], EXTRACT_PROMPT_TOKENS - overhead)
+    return _REFINE_PROMPT.format(wanted=wanted, known=",".join(fitted["known"]), lines="\n".join(fitted["lines"]))
+
+
+def _request(prompt):
+    request = dict(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a precise medical form parser. Reply with a JSON object."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1
+    )
+    if OPENAI_JSON_MODE:
+        request["response_format"] = {"type": "json_object"}
+    return request
+
+
+def _parse_reply(r):
+    """JSON object in the model reply; None if the reply has no JSON at all."""
+    text = r.choices[0].message.content.strip()
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1:
+        return None
+    try:
+        return json.loads(text[start:end+1])
+    except json.JSONDecodeError:
+        return {"form_type": "Unknown", "fields": {}, "raw_text": text}
+
+
+def _needs_refinement(data):
+    return not data or len(data.get("fields", {})) < EXTRACT_REFINE_MIN_FIELDS
+
+
+def _unresolved_lines(unparsed, data):
+    """Lines the local pass could not parse whose text holds none of the extracted values."""
+    values = []
+    for value in data.get("fields", {}).values():
+        values.extend(str(v).lower() for v in (value if isinstance(value, list) else [value]) if str(v).strip())
+    return [line for line in unparsed if not any(v in line.lower() for v in values)]
+
+
+def _refine_target(unparsed, data):
+    """(lines, missing labels) for a refinement round, or None when it would not help."""
+    if not _needs_refinement(data):
+        return None
+    lines = _unresolved_lines(unparsed, data)
+    if not lines:
+        return None
+    return lines, _missing_required(data)
+
+
+def _record(stats, stage, started, reply=None, calls=0):
+    """Add elapsed seconds, call count and token usage of one stage to the caller's stats dict."""
+    if stats is None:
+        return
+    entry = stats.setdefault(stage, {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0})
+    entry["calls"] += calls
+    entry["seconds"] += time.perf_counter() - started
+    usage = getattr(reply, "usage", None)
+    for key in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, key, None)
+        if isinstance(value, int):
+            entry[key] += value
+
+
+def _ensure_fields_shape(data):
+    # Guarantee “fields” shape; if no OpenAI, return minimal structure
     if "fields" not in data:
         # flatten nested if necessary
         flat_fields = {}
@@ -136,3 +338,101 @@ Partial JSON (if any):
         }
 
     return data
+
+
+def _local_stage(form_text, stats):
+    started = time.perf_counter()
+    form_type, fields, unparsed = _local_pass(form_text)
+    local = {"form_type": form_type, "fields": fields}
+    _record(stats, "local", started)
+    return local, unparsed, _missing_required(local)
+
+
+def _reply_data(reply, stage):
+    """Parsed JSON of an OpenAI reply, or None when the call failed (`reply` is the exception) or had no JSON."""
+    if isinstance(reply, Exception):
+        print(f"⚠️ OpenAI {stage} failed: {reply}")
+        return None
+    try:
+        return _parse_reply(reply)
+    except Exception as e:
+        print(f"⚠️ OpenAI {stage} failed: {e}")
+        return None
+
+
+def _extraction_steps(form_text, stats):
+    """
+    The stage sequence shared by extract_fields and extract_fields_async, as a
+    generator: it yields each OpenAI request (chat.completions.create kwargs),
+    is sent back the reply — or the exception the call raised — and returns
+    the extracted fields. Only the client call differs between the two callers.
+    """
+    local, unparsed, missing = _local_stage(form_text, stats)
+    if not can_use_openai() or (not missing and local["form_type"] != "Unknown"):
+        return local
+
+    # 1) OpenAI path for what the local pass missed
+    started = time.perf_counter()
+    r = yield _request(_extraction_prompt(form_text, local["fields"], missing))
+    data = _reply_data(r, "extraction") or {}
+    _record(stats, "extract", started, None if isinstance(r, Exception) else r, calls=1)
+    data = _merge(local, data)
+
+    # 2) Targeted refinement with OpenAI if extraction was weak
+    for _ in range(EXTRACT_MAX_REFINE_ROUNDS):
+        target = _refine_target(unparsed, data)
+        if target is None:
+            break
+        print("🔁 Refining extraction with OpenAI GPT...")
+        started = time.perf_counter()
+        r = yield _request(_refine_prompt(*target, data))
+        refined = _reply_data(r, "refinement")
+        _record(stats, "refine", started, None if isinstance(r, Exception) else r, calls=1)
+        if refined is None:
+            break
+        before = len(data["fields"])
+        data = _merge(data, refined)
+        if len(data["fields"]) == before:
+            break
+
+    # 3) Guarantee “fields” shape
+    return _ensure_fields_shape(data)
+
+
+def extract_fields(form_text: str, stats=None):
+    """
+    Extract fields adaptively from healthcare or administrative forms.
+    1️⃣ Rule-based local extraction (offline, linear time)
+    2️⃣ OpenAI GPT-4o-mini only for required fields the local pass could not
+       resolve, told which fields are already known
+    3️⃣ Up to EXTRACT_MAX_REFINE_ROUNDS targeted refinements while fewer than
+       EXTRACT_REFINE_MIN_FIELDS fields are found, sending only the lines no
+       stage resolved and the labels still missing
+    Without OpenAI the local result is returned as-is. Pass a dict as `stats`
+    to receive per-stage {"calls", "seconds", "prompt_tokens", "completion_tokens"}
+    under "local", "extract" and "refine".
+    """
+    steps, reply = _extraction_steps(form_text, stats), None
+    try:
+        while True:
+            request = steps.send(reply)
+            try:
+                reply = get_openai_client().chat.completions.create(**request)
+            except Exception as e:
+                reply = e
+    except StopIteration as done:
+        return done.value
+
+
+async def extract_fields_async(form_text: str, stats=None):
+    """extract_fields for asyncio callers: same steps, over the shared AsyncOpenAI client."""
+    steps, reply = _extraction_steps(form_text, stats), None
+    try:
+        while True:
+            request = steps.send(reply)
+            try:
+                reply = await get_async_openai_client().chat.completions.create(**request)
+            except Exception as e:
+                reply = e
+    except StopIteration as done:
+        return done.value
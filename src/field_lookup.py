@@ -0,0 +1,157 @@
+import re
+from difflib import SequenceMatcher
+from config import FIELD_LOOKUP_MIN_SCORE
+
+# Label aliases per concept. A question naming any alias matches a field
+# whose label is (or fuzzily resembles) any alias of the same concept.
+FIELD_SYNONYMS = {
+    "patient": ["patient", "patient name", "member name", "beneficiary", "enrollee", "name patient"],
+    "dob": ["dob", "date birth", "birth date", "birthday", "patient dob"],
+    "member_id": ["member id", "subscriber id", "insurance id", "policy number", "member number"],
+    "provider": ["provider", "provider name", "physician", "doctor", "prescriber",
+                 "requesting provider", "ordering provider", "prescribing provider"],
+    "npi": ["npi", "npi number", "provider npi", "npi provider"],
+    "diagnosis": ["diagnosis", "dx", "condition", "diagnosis description"],
+    "icd10": ["icd10", "icd 10", "icd code", "icd10 code", "diagnosis code"],
+    "urgency": ["urgency", "priority", "request type", "review type"],
+    "service_type": ["service type", "requested service", "service requested", "type service"],
+    "form_type": ["form type", "type form", "kind form"],
+    "phone": ["phone", "phone number", "telephone", "contact number"],
+    "fax": ["fax", "fax number"],
+}
+
+# Dropped from questions and labels before matching
+_FILLER = frozenset(
+    "what who whom whose which when where s is are was were the a an of for on in this that "
+    "please tell me give listed given provided".split()
+)
+# Questions that ask for reasoning, comparison or yes/no rather than a field value
+_NON_LOOKUP = frozenset(
+    "why how explain summarize summarise describe compare list is are was were does do did can could should".split()
+)
+
+_POSSESSIVE = re.compile(r"\b\w+['’]s\b")
+_KEY_VALUE = re.compile(r"^\s*([A-Za-z][^:\n]{0,60}?)\s*:(?!//)\s*(\S[^\n]*?)\s*$", re.MULTILINE)
+
+
+def _normalize(text):
+    text = text.lower()
+    return " ".join(w for w in re.findall(r"[a-z0-9]+", text) if w not in _FILLER)
+
+
+_ALIASES = {concept: [_normalize(a) for a in aliases] for concept, aliases in FIELD_SYNONYMS.items()}
+
+
+def _concept_of(label):
+    """Concept whose alias matches the normalized label exactly or nearly."""
+    best, best_ratio = None, 0.0
+    for concept, aliases in _ALIASES.items():
+        for alias in aliases:
+            ratio = 1.0 if alias == label else SequenceMatcher(None, alias, label).ratio()
+            if ratio > best_ratio:
+                best, best_ratio = concept, ratio
+    return best if best_ratio >= 0.85 else None
+
+
+def field_concept(label):
+    """FIELD_SYNONYMS concept a field label refers to ("NPI #" → "npi"), or None."""
+    return _concept_of(_normalize(label))
+
+
+def _phrase_score(question, name):
+    """
+    1.0 when `name` covers the whole question; partial coverage scores lower
+    (0.6 + 0.4 * coverage), and names that only fuzzily resemble the question
+    score their similarity ratio scaled below an exact match.
+    """
+    q_words, n_words = question.split(), name.split()
+    if not n_words:
+        return 0.0
+    if f" {name} " in f" {question} ":
+        return 0.6 + 0.4 * len(n_words) / len(q_words)
+    return 0.9 * SequenceMatcher(None, question, name).ratio()
+
+
+def _covers(question, names):
+    """
+    True when every word of the question appears (exactly or nearly, for typos)
+    in the label or one of its aliases. "patient address" is not covered by
+    "Patient Name": the question asks for something the field is not.
+    """
+    vocabulary = {w for n in names for w in n.split()}
+    return all(
+        w in vocabulary or any(SequenceMatcher(None, w, v).ratio() >= 0.8 for v in vocabulary)
+        for w in question.split()
+    )
+
+
+def flatten_fields(fields):
+    """
+    [(label, value)] from extractor output ({"form_type": ..., "fields": {...}}),
+    a flat {label: value} dict (e.g. Donut data), or nested dicts of those.
+    Lists are joined with ", "; empty values are skipped.
+    """
+    if not isinstance(fields, dict):
+        return []
+    flat = []
+    if "fields" in fields and isinstance(fields["fields"], dict):
+        flat.extend(flatten_fields(fields["fields"]))
+        fields = {k: v for k, v in fields.items() if k != "fields"}
+    for label, value in fields.items():
+        if isinstance(value, dict):
+            flat.extend((f"{label} {sub}", v) for sub, v in flatten_fields(value))
+        elif isinstance(value, (list, tuple)):
+            joined = ", ".join(str(v) for v in value if v not in (None, ""))
+            if joined:
+                flat.append((str(label), joined))
+        elif value not in (None, "") and str(value).strip():
+            flat.append((str(label), str(value).strip()))
+    return flat
+
+
+def parse_key_values(text):
+    """{label: value} for every "Label: value" line of plain form text (first occurrence wins)."""
+    fields = {}
+    for label, value in _KEY_VALUE.findall(text or ""):
+        fields.setdefault(label.strip(), value)
+    return fields
+
+
+def lookup_field(question, fields, min_score=None):
+    """
+    Answer `question` straight from extracted key/value `fields` when it is a
+    plain field lookup ("Who is the patient?", "What is the NPI #?").
+
+    Returns {"answer", "field", "score"} for the best-matching field, or None
+    when the question is not a lookup, nothing scores at least `min_score`
+    (default FIELD_LOOKUP_MIN_SCORE), or two fields tie for the match.
+    """
+    min_score = FIELD_LOOKUP_MIN_SCORE if min_score is None else min_score
+    words = re.findall(r"[a-z]+", question.lower())
+    if not words or words[0] in _NON_LOOKUP:
+        return None
+    # "the patient's diagnosis" asks for the diagnosis: also score the question without possessive owners
+    variants = {_normalize(question), _normalize(_POSSESSIVE.sub(" ", question))} - {""}
+    if not variants:
+        return None
+
+    scored = []
+    for label, value in flatten_fields(fields):
+        name = _normalize(label)
+        concept = _concept_of(name)
+        names = {name, *(_ALIASES[concept] if concept else [])}
+        # Only question variants the field fully covers count; a leftover word asks for something else
+        covered = [q for q in variants if _covers(q, names)]
+        score = max((_phrase_score(q, n) for q in covered for n in names), default=0.0)
+        scored.append((score, label, value))
+    if not scored:
+        return None
+
+    scored.sort(key=lambda s: s[0], reverse=True)
+    score, label, value = scored[0]
+    if score < min_score:
+        return None
+    # Two different fields matching equally well (e.g. "provider NPI" vs "provider") is ambiguous
+    if len(scored) > 1 and scored[1][0] > score - 0.05 and scored[1][2] != value:
+        return None
+    return {"answer": value, "field": label, "score": round(score, 3)}
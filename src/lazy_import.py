@@ -0,0 +1,27 @@
+import importlib
+
+
+class LazyModule:
+    """
+    Placeholder for a heavy module that is only imported on first attribute access.
+
+        torch = LazyModule("torch")   # nothing imported yet
+        torch.no_grad()               # torch is imported here
+
+    Attributes set on the placeholder (e.g. by `unittest.mock.patch`) shadow the
+    real module's attributes until they are deleted again.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found on the placeholder itself
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
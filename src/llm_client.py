@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_TIMEOUT, OPENAI_CONNECT_TIMEOUT,
+    OPENAI_MAX_RETRIES, OPENAI_MAX_CONNECTIONS, OPENAI_KEEPALIVE_EXPIRY,
+)
+
+_client = None
+_client_lock = threading.Lock()
+# httpx async connections belong to the event loop that opened them: one client per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _timeout():
+    # The pool timeout bounds how long a call waits for one of the OPENAI_MAX_CONNECTIONS slots
+    return httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT, pool=OPENAI_TIMEOUT)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+
+def create_openai_client(api_key=None, base_url=None, verify=True):
+    """
+    New OpenAI client over its own pooled keep-alive httpx connection pool.
+    Prefer get_openai_client(); this is for callers that need a separate
+    endpoint (tests against a stub server, benchmarks). `verify` is passed to
+    httpx (False, or a CA bundle path for a private endpoint).
+    """
+    return OpenAI(
+        api_key=api_key or OPENAI_API_KEY or None,
+        base_url=base_url or OPENAI_BASE_URL or None,
+        max_retries=OPENAI_MAX_RETRIES,
+        timeout=_timeout(),
+        http_client=httpx.Client(limits=_limits(), timeout=_timeout(), verify=verify),
+    )
+
+
+def get_openai_client():
+    """
+    Process-wide OpenAI client shared by extractor, summarizer and qa_agent.
+    Created on first use, so importing those modules needs no API key, and
+    reused so every call after the first skips the TCP + TLS handshake.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_openai_client()
+    return _client
+
+
+def reset_openai_client():
+    """Close the shared client's connections; the next get_openai_client() builds a new one."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+def get_async_openai_client():
+    """
+    AsyncOpenAI counterpart of get_openai_client() for the running event loop,
+    with the same pool limits and timeouts. Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncOpenAI(
+            api_key=OPENAI_API_KEY or None,
+            base_url=OPENAI_BASE_URL or None,
+            max_retries=OPENAI_MAX_RETRIES,
+            timeout=_timeout(),
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        )
+    return client
@@ -0,0 +1,66 @@
+import re
+from field_lookup import FIELD_SYNONYMS
+
+# Words common in English prose and on healthcare forms. Good OCR of a form
+# hits a fair share of them; garbage output ("l|I;,rn") hits almost none.
+_COMMON_WORDS = frozenset("""
+a an and are as at be by date for from has have if in is it no not of on or per the this to was were
+which will with yes you your
+address authorization authorize birth care city claim clinical code codes contact day days diagnosis
+doctor dose drug email facility fax first form health history home hospital information insurance
+last medical medication member middle months name number office outpatient patient phone physician
+plan please policy prescriber prior provider reason referral request requested review service
+services signature state street therapy treatment type urgent week weeks zip
+""".split()) | frozenset(w for aliases in FIELD_SYNONYMS.values() for a in aliases for w in a.split())
+
+_TOKEN = re.compile(r"\S+")
+# Real words (optionally capitalized or all caps), numbers, dates, IDs and ICD-10 style codes,
+# allowing trailing punctuation such as "Name:" or "Doe,"
+_WORDLIKE = re.compile(
+    r"^[(\"'#]?(?:[A-Za-z][a-z]+|[A-Z]{2,}|[A-Za-z]|\d+(?:[.,/-]\d+)*|[A-Z]\d[\dA-Z](?:\.[\dA-Z]{1,4})?)"
+    r"[)\"'.,:;!?%]*$"
+)
+_ALPHA = re.compile(r"[a-z]{2,}")
+# A form that shows this many distinct field labels counts as fully covered
+_LABEL_TARGET = 3
+
+
+def ocr_quality(text, confidence=None):
+    """
+    Heuristic 0-1 quality of OCR output, so a cascade can tell usable text from
+    noise without ground truth. Combines:
+
+    - word_rate: share of tokens shaped like words, numbers, dates or codes
+    - dictionary_rate: share of alphabetic tokens that are common English /
+      form words (scaled so ~40% hits, typical for clean text, counts as full)
+    - label_coverage: distinct FIELD_SYNONYMS labels found, up to 3
+    - confidence: the engine's own mean word confidence (0-1), when it has one
+
+    Returns {"score", "word_rate", "dictionary_rate", "label_coverage", "confidence"}.
+    """
+    tokens = _TOKEN.findall(text or "")
+    if not tokens:
+        return {"score": 0.0, "word_rate": 0.0, "dictionary_rate": 0.0, "label_coverage": 0.0,
+                "confidence": confidence}
+
+    word_rate = sum(bool(_WORDLIKE.match(t)) for t in tokens) / len(tokens)
+    words = [w for t in tokens for w in _ALPHA.findall(t.lower())]
+    dictionary_rate = sum(w in _COMMON_WORDS for w in words) / len(words) if words else 0.0
+
+    lowered = " " + " ".join(_ALPHA.findall(text.lower())) + " "
+    labels = sum(
+        any(f" {alias} " in lowered for alias in aliases) for aliases in FIELD_SYNONYMS.values()
+    )
+    label_coverage = min(labels / _LABEL_TARGET, 1.0)
+
+    text_score = 0.5 * word_rate + 0.3 * min(dictionary_rate / 0.4, 1.0) + 0.2 * label_coverage
+    # Very short output (a stray "|" or a single word) is not a page of text
+    text_score *= min(len(tokens) / 5, 1.0)
+    score = text_score if confidence is None else 0.5 * confidence + 0.5 * text_score
+    return {
+        "score": round(score, 3),
+        "word_rate": round(word_rate, 3),
+        "dictionary_rate": round(dictionary_rate, 3),
+        "label_coverage": round(label_coverage, 3),
+        "confidence": confidence,
+    }
@@ -0,0 +1,133 @@
+import io
+import os
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+from lazy_import import LazyModule
+
+cv2 = LazyModule("cv2")
+
+
+class PageImage:
+    """
+    One page image, decoded at most once and shared by every engine.
+
+        page = PageImage("form.png")        # nothing read yet
+        page.gray                           # Tesseract: file read + decoded here
+        page.rgb                            # EasyOCR: same decoded buffer
+        page.pil                            # Donut
+        page.encoded                        # Google Vision: the original file bytes
+
+    `source` is a file path, encoded image bytes, a PIL image or an RGB (or
+    grayscale) uint8 array; `digest` identifies a page derived from another
+    (e.g. preprocessed) for caching. Every view is built lazily on first access and then
+    cached: `rgb` is the decoded HxWx3 buffer; `gray`, `pil` and (for in-memory
+    sources) PNG-`encoded` bytes are derived from it once. Arrays are
+    read-only, so one engine cannot corrupt another's input, and building a
+    view is locked so engines running in parallel threads still decode once.
+    """
+
+    def __init__(self, source, name=None, digest=None):
+        self.path = source if isinstance(source, (str, os.PathLike)) else None
+        self.name = name or (os.path.basename(self.path) if self.path else "")
+        self._bytes = bytes(source) if isinstance(source, (bytes, bytearray, memoryview)) else None
+        self._in_memory = self.path is None and self._bytes is None
+        self._rgb = self._gray = self._pil = None
+        self._digest = digest
+        self._lock = threading.RLock()
+        # Pages derived from this one (e.g. by preprocess_page), keyed by their settings
+        self.variants = {}
+        if isinstance(source, Image.Image):
+            self._pil = source if source.mode == "RGB" else source.convert("RGB")
+        elif isinstance(source, np.ndarray):
+            self._rgb = self._freeze(source if source.ndim == 3 else np.stack([source] * 3, axis=-1))
+
+    @staticmethod
+    def _freeze(array):
+        array = np.ascontiguousarray(array, dtype=np.uint8)
+        array.flags.writeable = False
+        return array
+
+    @property
+    def encoded(self):
+        """Encoded image bytes: the file as stored, or a PNG of an in-memory page (encoded once)."""
+        with self._lock:
+            if self._bytes is None:
+                if self.path is not None:
+                    with open(self.path, "rb") as f:
+                        self._bytes = f.read()
+                else:
+                    buffer = io.BytesIO()
+                    self.pil.save(buffer, format="PNG")
+                    self._bytes = buffer.getvalue()
+            return self._bytes
+
+    @property
+    def digest(self):
+        """SHA-256 of the source file/bytes (same as disk_cache.file_digest); None for in-memory pages or unreadable files."""
+        if self._digest is None and not self._in_memory:
+            try:
+                self._digest = hashlib.sha256(self.encoded).hexdigest()
+            except OSError:
+                return None
+        return self._digest
+
+    @property
+    def rgb(self):
+        """Decoded HxWx3 uint8 RGB buffer shared by all views."""
+        with self._lock:
+            if self._rgb is None:
+                if self._pil is not None:
+                    self._rgb = self._freeze(np.asarray(self._pil))
+                else:
+                    self._rgb = self._freeze(self._decode(self.encoded))
+            return self._rgb
+
+    @property
+    def gray(self):
+        """HxW uint8 grayscale, converted from `rgb` once."""
+        with self._lock:
+            if self._gray is None:
+                self._gray = self._freeze(cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY))
+            return self._gray
+
+    @property
+    def pil(self):
+        """RGB PIL image of the decoded buffer."""
+        with self._lock:
+            if self._pil is None:
+                self._pil = Image.fromarray(self.rgb)
+            return self._pil
+
+    @property
+    def shape(self):
+        return self.rgb.shape
+
+    @staticmethod
+    def _decode(data):
+        # OpenCV decodes PNG/JPEG faster than PIL; PIL covers the formats it cannot read
+        try:
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        except Exception:
+            image = None
+        if image is not None:
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+        return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+
+    def release(self):
+        """Drop the decoded views of a file/bytes page (the encoded bytes and digest stay) to free memory."""
+        with self._lock:
+            self._gray = None
+            self.variants = {}
+            if not self._in_memory:
+                self._rgb = self._pil = None
+
+    def __repr__(self):
+        state = "decoded" if self._rgb is not None else "not decoded"
+        return f"<PageImage {self.name or 'in-memory'!r} ({state})>"
+
+
+def as_page(image):
+    """`image` as a PageImage; a path, bytes or PIL image is wrapped, a PageImage is returned as-is."""
+    return image if isinstance(image, PageImage) else PageImage(image)
@@ -0,0 +1,63 @@
+import asyncio
+from extractor import extract_fields_async
+from summarizer import summarize_doc_async
+from qa_agent import answer_with_rag_async
+from config import LLM_MAX_CONCURRENCY
+
+
+def _normalize_docs(docs):
+    normalized = []
+    for d in docs:
+        if isinstance(d, tuple):
+            normalized.append({"doc_id": d[0], "text": d[1]})
+        elif isinstance(d, dict):
+            normalized.append(d)
+        else:
+            raise TypeError(f"Unsupported doc format: {type(d)}")
+    return normalized
+
+
+async def process_forms_async(docs, questions=(), summarize=True, max_concurrency=None):
+    """
+    Extract fields, summarize and answer `questions` for many forms at once.
+    docs: [("doc_id", "text")] or [{"doc_id": ..., "text": ...}].
+
+    Every form runs as its own task; a semaphore caps how many LLM calls are
+    in flight (default LLM_MAX_CONCURRENCY), so a batch takes about as long as
+    its slowest few calls instead of the sum of all of them. Within a form,
+    the summary and the answers wait for the extracted fields (both use
+    them) and then run concurrently. Each question is answered against its
+    own form's text.
+
+    Returns one dict per form, in input order:
+      {"doc_id", "fields", "summary", "answers": {question: answer}, "error"}
+    A failing form gets its exception message in "error"; the rest still finish.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or LLM_MAX_CONCURRENCY)
+
+    async def limited(coro_fn, *args, **kwargs):
+        async with semaphore:
+            return await coro_fn(*args, **kwargs)
+
+    async def process(doc):
+        result = {"doc_id": doc["doc_id"], "fields": None, "summary": None, "answers": {}, "error": None}
+        try:
+            result["fields"] = await limited(extract_fields_async, doc["text"])
+            tasks = [limited(answer_with_rag_async, q, [doc["text"]], fields=result["fields"]) for q in questions]
+            if summarize:
+                tasks.append(limited(summarize_doc_async, result["fields"], doc["text"]))
+            outputs = await asyncio.gather(*tasks)
+            result["answers"] = dict(zip(questions, outputs))
+            if summarize:
+                result["summary"] = outputs[-1]
+        except Exception as e:
+            print(f"⚠️ Processing {doc['doc_id']} failed: {e}")
+            result["error"] = str(e)
+        return result
+
+    return await asyncio.gather(*(process(d) for d in _normalize_docs(docs)))
+
+
+def process_forms(docs, questions=(), summarize=True, max_concurrency=None):
+    """Synchronous entry point for process_forms_async (runs its own event loop)."""
+    return asyncio.run(process_forms_async(docs, questions, summarize, max_concurrency))
@@ -0,0 +1,158 @@
+import numpy as np
+from lazy_import import LazyModule
+from config import OCR_PREPROCESS, OCR_TARGET_DPI
+from disk_cache import make_key
+from page_image import PageImage, as_page
+
+cv2 = LazyModule("cv2")
+
+PREPROCESS_STEPS = ("downscale", "deskew", "denoise", "crop", "threshold")
+# Skew beyond this is more likely a rotated photo or a vertical rule than a tilted scan
+MAX_SKEW_DEGREES = 5.0
+# Corrections below this are not worth a resample
+MIN_SKEW_DEGREES = 0.2
+# Long side the skew and crop estimates run at, and the margin (at that size) kept around content
+_ANALYSIS_SIZE = 1000
+_CROP_MARGIN = 20
+
+
+def estimate_dpi(shape):
+    """Scan resolution of an HxW page, assuming a letter/A4-sized sheet (short side ~8.5 in)."""
+    return min(shape[:2]) / 8.5
+
+
+def _analysis_ink(gray):
+    """(ink mask at ~_ANALYSIS_SIZE px, scale) — Otsu, ink = 255."""
+    scale = min(1.0, _ANALYSIS_SIZE / max(gray.shape))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    return ink, scale
+
+
+def estimate_skew(gray):
+    """
+    Page skew in degrees (positive = text runs uphill, counter-clockwise), from
+    the median angle of long near-horizontal segments: form rules and text
+    lines smeared into bars. 0.0 when there are none or the angle exceeds
+    MAX_SKEW_DEGREES.
+    """
+    ink, _ = _analysis_ink(gray)
+    width = ink.shape[1]
+    bars = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 1)))
+    # Only the top edge of each bar: Hough cost grows with pixel count. The angle comes from segment
+    # endpoints, so coarse 0.5° bins still give a sub-0.1° estimate
+    edges = cv2.subtract(bars, cv2.erode(bars, np.ones((3, 1), np.uint8)))
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 360, threshold=80, minLineLength=width // 6, maxLineGap=4)
+    if lines is None:
+        return 0.0
+    x1, y1, x2, y2 = lines.reshape(-1, 4).T.astype(np.float64)
+    angles = -np.degrees(np.arctan2(y2 - y1, x2 - x1))
+    angles = angles[np.abs(angles) <= MAX_SKEW_DEGREES]
+    return float(np.median(angles)) if angles.size else 0.0
+
+
+def _rotate(rgb, degrees):
+    h, w = rgb.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), -degrees, 1.0)
+    return cv2.warpAffine(rgb, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT,
+                          borderValue=(255, 255, 255))
+
+
+def _content_box(gray, margin):
+    """(top, bottom, left, right) of the page content: solid dark scanner edges and blank margins removed."""
+    ink, scale = _analysis_ink(gray)
+    ink = ink > 0
+
+    def edge_bands(profile):
+        # Solid dark bands along an edge (scanner lid, fax header bars)
+        start, end = 0, len(profile)
+        while start < end and profile[start] > 0.9:
+            start += 1
+        while end > start and profile[end - 1] > 0.9:
+            end -= 1
+        return start, end
+
+    top, bottom = edge_bands(ink.mean(axis=1))
+    left, right = edge_bands(ink.mean(axis=0))
+    inner = ink[top:bottom, left:right]
+
+    def content(profile, start, end):
+        # First and last line with real ink (more than a couple of specks), plus the margin
+        lines = np.flatnonzero(profile > 2)
+        if not lines.size:
+            return start, end
+        return max(start + lines[0] - margin, start), min(start + lines[-1] + 1 + margin, end)
+
+    top, bottom = content(inner.sum(axis=1), top, bottom)
+    left, right = content(inner.sum(axis=0), left, right)
+    return tuple(int(round(v / scale)) for v in (top, bottom, left, right))
+
+
+def preprocess_page(image, steps=None, target_dpi=None):
+    """
+    Normalized copy of a page for OCR, built once and shared by every engine.
+
+    Steps run in a fixed order, each only if listed in `steps` (default
+    OCR_PREPROCESS):
+
+    - downscale: resample to `target_dpi` (default OCR_TARGET_DPI) when the
+      scan is larger; never upscales
+    - deskew: rotate by `estimate_skew` when the page is tilted
+    - denoise: 3x3 median filter (fax speckle)
+    - crop: drop dark scanner edges and blank margins
+    - threshold: adaptive (local) binarization, for uneven lighting
+
+    Returns a PageImage whose digest is derived from the source digest and the
+    settings (so OCR cache keys follow the preprocessing), or `image` itself
+    when no step applies or it cannot be decoded (the engines then report the
+    error). Results are memoized on the source page, so the
+    cascade and Donut get the same processed page.
+    """
+    page = as_page(image)
+    steps = [s for s in (OCR_PREPROCESS if steps is None else steps) if s in PREPROCESS_STEPS]
+    target_dpi = target_dpi or OCR_TARGET_DPI
+    if not steps:
+        return page
+    settings = {"steps": steps, "dpi": target_dpi}
+    key = make_key("preprocess", settings)
+    with page._lock:
+        if key in page.variants:
+            return page.variants[key]
+
+        try:
+            rgb = page.rgb
+        except Exception:
+            return page
+        dpi = estimate_dpi(rgb.shape)
+        changed = False
+        if "downscale" in steps and target_dpi / dpi < 0.95:
+            scale = target_dpi / dpi
+            rgb = cv2.resize(rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            dpi, changed = target_dpi, True
+        if "deskew" in steps:
+            gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+            skew = estimate_skew(gray)
+            if abs(skew) >= MIN_SKEW_DEGREES:
+                rgb, changed = _rotate(rgb, skew), True
+        if "denoise" in steps:
+            rgb, changed = cv2.medianBlur(rgb, 3), True
+        if "crop" in steps:
+            gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+            top, bottom, left, right = _content_box(gray, _CROP_MARGIN)
+            if (bottom - top, right - left) != rgb.shape[:2]:
+                rgb, changed = rgb[top:bottom, left:right], True
+        if "threshold" in steps:
+            gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+            # ~1/7 inch neighbourhood: wider than a stroke, narrower than a shadow
+            block = max(int(dpi / 7) | 1, 3)
+            binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block, 15)
+            rgb, changed = np.stack([binary] * 3, axis=-1), True
+
+        if not changed:
+            processed = page
+        else:
+            digest = page.digest
+            processed = PageImage(rgb, name=page.name, digest=make_key(digest, settings) if digest else None)
+            processed.variants[key] = processed
+        page.variants[key] = processed
+        return processed
@@ -0,0 +1,88 @@
+from field_lookup import flatten_fields
+
+# Shared tokenizer for prompt budgets and chunking (cl100k_base matches the
+# gpt-4o-mini family closely enough for sizing)
+_encoding = None
+
+
+def get_encoding():
+    """tiktoken encoding, or None when it is unavailable (e.g. offline without a cached vocab)."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text):
+    """Token count of `text`; ~4 characters per token when tiktoken is unavailable."""
+    if not text:
+        return 0
+    enc = get_encoding()
+    if enc is None:
+        return -(-len(text) // 4)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, max_tokens):
+    """The longest prefix of `text` that fits in `max_tokens`, cut at a token (or word) boundary."""
+    if max_tokens <= 0 or not text:
+        return ""
+    enc = get_encoding()
+    if enc is None:
+        if len(text) <= max_tokens * 4:
+            return text
+        clipped = text[:max_tokens * 4]
+        cut = max(clipped.rfind(" "), clipped.rfind("\n"))
+        return clipped[:cut] if cut > 0 else clipped
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
+
+
+def fit_sections(sections, max_tokens):
+    """
+    Fit prompt sections into `max_tokens`.
+
+    sections: [(name, content, share)] in priority order. `content` is a
+    string (truncated to fit) or a list of strings ordered highest-value
+    first (whole items kept while they fit, then the rest dropped; a lone
+    first item that is too long is truncated). Each section may use `share`
+    of the budget plus whatever earlier sections left unused.
+
+    Returns {name: fitted content} with the same types as the input; list
+    items are costed as if joined with newlines.
+    """
+    fitted, carry = {}, 0
+    for name, content, share in sections:
+        allowance = int(max_tokens * share) + carry
+        if isinstance(content, (list, tuple)):
+            kept, used = [], 0
+            for item in content:
+                cost = count_tokens(item) + (1 if kept else 0)  # "\n" separator
+                if used + cost > allowance:
+                    if not kept:
+                        item = truncate_tokens(item, allowance)
+                        if item:
+                            kept.append(item)
+                            used += count_tokens(item)
+                    break
+                kept.append(item)
+                used += cost
+            fitted[name] = kept
+        else:
+            kept = truncate_tokens(content or "", allowance)
+            used = count_tokens(kept)
+            fitted[name] = kept
+        carry = max(allowance - used, 0)
+    return fitted
+
+
+def field_lines(fields):
+    """["label: value"] for extracted fields (any shape flatten_fields accepts), in extraction order."""
+    return [f"{label}: {value}" for label, value in flatten_fields(fields)]
+
@@ -1,27 +1,146 @@
 import os, sys
-from openai import OpenAI
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 from dotenv import load_dotenv
-from rag_indexer import retrieve_context
+from rag_indexer import retrieve_context, get_embeddings
+from field_lookup import lookup_field
+from llm_client import get_openai_client, get_async_openai_client
+from prompt_budget import count_tokens, fit_sections, field_lines
+from config import (
+    QA_PROMPT_TOKENS, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SEMANTIC_THRESHOLD,
+    OPENAI_PRICE_INPUT_PER_1M, OPENAI_PRICE_OUTPUT_PER_1M,
+)
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def answer_with_rag(query: str, context_docs=None):
+QA_MODEL = "gpt-4o-mini"
+
+
+def _normalize_question(question):
+    return " ".join(re.findall(r"\w+", question.lower()))
+
+
+class AnswerCache:
     """
-    Generate an answer using RAG (Retrieval-Augmented Generation).
-    If no context_docs are provided, automatically retrieve relevant chunks.
+    LRU + TTL cache of LLM answers keyed by (normalized question, context hash,
+    model). With a `semantic_threshold` > 0, a differently worded question
+    whose embedding is at least that similar to a cached one, asked against
+    the same context and model, is also a hit. Tracks hits and what they saved.
     """
-    # ✅ Auto-retrieve context if not provided
-    if context_docs is None:
-        context_docs = retrieve_context(query)
 
-    # Prepare context
-    if isinstance(context_docs, list):
-        context_text = "\n\n".join(context_docs)
-    else:
-        context_text = str(context_docs)
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL,
+                 semantic_threshold=ANSWER_CACHE_SEMANTIC_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.semantic_hits = self.misses = 0
+            self.tokens_saved = 0
+            self.cost_saved = 0.0
+            self.seconds_saved = 0.0
+
+    def _embed(self, question):
+        vec = np.asarray(get_embeddings().embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _expire(self, now):
+        for key in [k for k, e in self._entries.items() if now - e["created"] > self.ttl]:
+            del self._entries[key]
 
-    prompt = f"""
+    def get(self, question, context_hash, model):
+        """Cached entry dict for this question/context/model, or None."""
+        key = (_normalize_question(question), context_hash, model)
+        with self._lock:
+            self._expire(time.time())
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._hit(key, entry)
+            wants_vector = self.semantic_threshold > 0 and any(
+                k[1:] == key[1:] and e.get("vector") is not None for k, e in self._entries.items()
+            )
+        # Embedding can be a model or network call: never hold the lock across it
+        query_vec = self._embed(question) if wants_vector else None
+
+        with self._lock:
+            entry = self._entries.get(key)  # another thread may have stored it meanwhile
+            if entry is not None:
+                return self._hit(key, entry)
+            if query_vec is not None:
+                candidates = [
+                    (k, e) for k, e in self._entries.items() if k[1:] == key[1:] and e.get("vector") is not None
+                ]
+                if candidates:
+                    k, e = max(candidates, key=lambda c: float(c[1]["vector"] @ query_vec))
+                    if float(e["vector"] @ query_vec) >= self.semantic_threshold:
+                        return self._hit(k, e, semantic=True)
+            self.misses += 1
+            return None
+
+    def _hit(self, key, entry, semantic=False):
+        # Caller holds the lock
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.semantic_hits += semantic
+        self.tokens_saved += entry["tokens"]
+        self.cost_saved += entry["cost"]
+        self.seconds_saved += entry["latency"]
+        return entry
+
+    def put(self, question, context_hash, model, answer, usage=None, latency=0.0):
+        prompt_tokens, completion_tokens = (
+            n if isinstance(n, int) else 0
+            for n in (getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
+        )
+        entry = {
+            "answer": answer,
+            "created": time.time(),
+            "latency": latency,
+            "tokens": prompt_tokens + completion_tokens,
+            "cost": (prompt_tokens * OPENAI_PRICE_INPUT_PER_1M + completion_tokens * OPENAI_PRICE_OUTPUT_PER_1M) / 1e6,
+            "vector": self._embed(question) if self.semantic_threshold > 0 else None,
+        }
+        with self._lock:
+            key = (_normalize_question(question), context_hash, model)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._entries),
+            "tokens_saved": self.tokens_saved,
+            "cost_saved_usd": round(self.cost_saved, 6),
+            "seconds_saved": round(self.seconds_saved, 3),
+        }
+
+
+answer_cache = AnswerCache()
+
+
+def answer_cache_stats():
+    """Hit rate and tokens / USD / seconds saved by the QA answer cache."""
+    return answer_cache.stats()
+
+
+def _qa_prompt(query, context_text):
+    return f"""
     You are an intelligent healthcare form QA agent.
     Use the provided context to answer accurately and clearly.
 
@@ -34,8 +153,27 @@ def answer_with_rag(query: str, context_docs=None):
     Please provide a concise factual answer.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
+
+def _qa_context(query, context_docs, fields):
+    """
+    (kept docs, context text) within QA_PROMPT_TOKENS. Extracted fields come
+    first with a small share; retrieved chunks, already ranked by relevance,
+    fill the rest and lower-ranked chunks are dropped first.
+    """
+    docs = context_docs if isinstance(context_docs, list) else [str(context_docs)]
+    lines = field_lines(fields) if fields else []
+    overhead = count_tokens(_qa_prompt(query, "Extracted fields:\n\n" if lines else ""))
+    fitted = fit_sections([("fields", lines, 0.25), ("docs", docs, 0.75)], QA_PROMPT_TOKENS - overhead)
+    context_text = "\n\n".join(fitted["docs"])
+    if fitted["fields"]:
+        context_text = "Extracted fields:\n" + "\n".join(fitted["fields"]) + "\n\n" + context_text
+    return (fitted["docs"] if isinstance(context_docs, list) else context_docs), context_text
+
+
+def _qa_request(query, context_text):
+    prompt = _qa_prompt(query, context_text)
+    return dict(
+        model=QA_MODEL,
         messages=[
             {"role": "system", "content": "You are an expert in healthcare document QA."},
             {"role": "user", "content": prompt}
@@ -43,4 +181,77 @@ def answer_with_rag(query: str, context_docs=None):
         temperature=0.2
     )
 
-    return response.choices[0].message.content.strip()
+
+def _prepare(query, context_docs, fields):
+    """
+    Everything before the LLM call. Returns ("done", answer, provenance) when a
+    field lookup or the answer cache already has the answer, otherwise
+    ("ask", context_docs, context_text, context_hash, use_cache).
+    """
+    # ✅ Fast path: the answer is an extracted field value
+    if fields:
+        match = lookup_field(query, fields)
+        if match:
+            return "done", match["answer"], {"source": "fields", "field": match["field"], "score": match["score"]}
+
+    # ✅ Auto-retrieve context if not provided
+    if context_docs is None:
+        context_docs = retrieve_context(query)
+
+    # Prepare context within the prompt budget
+    context_docs, context_text = _qa_context(query, context_docs, fields)
+
+    use_cache = os.getenv("DISABLE_ANSWER_CACHE", "false").lower() != "true"
+    context_hash = hashlib.sha256(context_text.encode("utf-8")).hexdigest()
+    cached = answer_cache.get(query, context_hash, QA_MODEL) if use_cache else None
+    if cached is not None:
+        return "done", cached["answer"], {"source": "rag", "context": context_docs, "cached": True}
+    return "ask", context_docs, context_text, context_hash, use_cache
+
+
+def _finish(query, response, started, context_docs, context_hash, use_cache):
+    answer = response.choices[0].message.content.strip()
+    if use_cache:
+        answer_cache.put(query, context_hash, QA_MODEL, answer, getattr(response, "usage", None),
+                         time.perf_counter() - started)
+    return answer, {"source": "rag", "context": context_docs, "cached": False}
+
+
+def answer_with_rag(query: str, context_docs=None, fields=None, with_provenance=False):
+    """
+    Generate an answer using RAG (Retrieval-Augmented Generation).
+    If no context_docs are provided, automatically retrieve relevant chunks.
+
+    fields: extracted key/values (extract_fields output, Donut data or a flat
+    dict). Plain field lookups ("Who is the patient?") are answered from them
+    directly, without retrieval or an LLM call; otherwise they are added to
+    the LLM context ahead of the retrieved chunks.
+    with_provenance: return (answer, provenance) where provenance is
+    {"source": "fields", "field", "score"} or {"source": "rag", "context", "cached"}.
+
+    The prompt is kept within QA_PROMPT_TOKENS, dropping the lowest-ranked
+    chunks first. LLM answers are cached per (question, context, model); see AnswerCache.
+    Set DISABLE_ANSWER_CACHE=true to always call the model.
+    """
+    prepared = _prepare(query, context_docs, fields)
+    if prepared[0] == "done":
+        _, answer, provenance = prepared
+    else:
+        _, context_docs, context_text, context_hash, use_cache = prepared
+        started = time.perf_counter()
+        response = get_openai_client().chat.completions.create(**_qa_request(query, context_text))
+        answer, provenance = _finish(query, response, started, context_docs, context_hash, use_cache)
+    return (answer, provenance) if with_provenance else answer
+
+
+async def answer_with_rag_async(query: str, context_docs=None, fields=None, with_provenance=False):
+    """answer_with_rag for asyncio callers: same fast paths and cache, over the shared AsyncOpenAI client."""
+    prepared = _prepare(query, context_docs, fields)
+    if prepared[0] == "done":
+        _, answer, provenance = prepared
+    else:
+        _, context_docs, context_text, context_hash, use_cache = prepared
+        started = time.perf_counter()
+        response = await get_async_openai_client().chat.completions.create(**_qa_request(query, context_text))
+        answer, provenance = _finish(query, response, started, context_docs, context_hash, use_cache)
+    return (answer, provenance) if with_provenance else answer
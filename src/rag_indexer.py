@@ -1,13 +1,552 @@
+import os
+import re
+import json
+import math
+import weakref
+import hashlib
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
+from config import (
+    CHUNK_MODE, CHUNK_SIZE, CHUNK_OVERLAP,
+    EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_THREADS,
+    EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_MAX_MB, EMBEDDING_CACHE_MAX_AGE_DAYS,
+    VECTOR_STORE, RETRIEVAL_MODE, BM25_FAST_PATH,
+)
+from disk_cache import DiskCache, make_key
+from prompt_budget import get_encoding as _get_encoding
 
 GLOBAL_INDEX = None
 
+
+def _content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -------------------------------
+# Embedding backends
+# -------------------------------
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic feature-hashing embedder: word unigrams and bigrams hashed
+    into a fixed-size signed vector, L2-normalized. No model, no network;
+    used for offline runs and tests.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        words = re.findall(r"\w+", text.lower())
+        for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if h >> 63 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers model on CPU with batched inference."""
+
+    def __init__(self, model_name, batch_size=EMBEDDING_BATCH_SIZE, num_threads=EMBEDDING_THREADS):
+        from sentence_transformers import SentenceTransformer
+        import torch
+
+        if num_threads:
+            # Process-wide setting; caps intra-op threads used by the encoder
+            torch.set_num_threads(num_threads)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings backend with a persistent cache keyed by model name
+    and text hash. Only texts never seen before reach the backend, in a
+    single embed_documents call; vectors are stored as float32 bytes.
+    """
+
+    def __init__(self, backend, model_name, cache):
+        self.backend = backend
+        self.model_name = model_name
+        self.cache = cache
+
+    def _key(self, kind, text):
+        return make_key("embedding", kind, self.model_name, _content_hash(text))
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [self._key("document", t) for t in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if cached[key] is None:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.backend.embed_documents(list(missing.values()))
+            fresh = {k: np.asarray(v, dtype=np.float32).tobytes() for k, v in zip(missing, vectors)}
+            self.cache.put_many(fresh)
+            cached.update(fresh)
+
+        return [np.frombuffer(cached[k], dtype=np.float32).tolist() for k in keys]
+
+    def embed_query(self, text):
+        key = self._key("query", text)
+        hit = self.cache.get(key)
+        if hit is not None:
+            return np.frombuffer(hit, dtype=np.float32).tolist()
+        vector = self.backend.embed_query(text)
+        self.cache.put(key, np.asarray(vector, dtype=np.float32).tobytes())
+        return vector
+
+
+_embedding_cache = None
+
+
+def _get_embedding_cache():
+    global _embedding_cache
+    if os.getenv("DISABLE_EMBEDDING_CACHE", "false").lower() == "true":
+        return None
+    if _embedding_cache is None:
+        try:
+            _embedding_cache = DiskCache(
+                os.path.join(EMBEDDING_CACHE_DIR, "embedding_cache.sqlite"),
+                max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+                max_age=EMBEDDING_CACHE_MAX_AGE_DAYS * 24 * 3600 if EMBEDDING_CACHE_MAX_AGE_DAYS > 0 else None,
+            )
+        except Exception as e:
+            print(f"⚠️ Embedding cache unavailable: {e}")
+            return None
+    return _embedding_cache
+
+
+def embedding_cache_stats():
+    """Hit/miss counters and size of the embedding cache (None when disabled)."""
+    cache = _get_embedding_cache()
+    return cache.stats() if cache is not None else None
+
+
+_embedders = {}
+
+
+def get_embeddings(model_name=None):
+    """
+    Embeddings backend for `model_name` (default: EMBEDDING_MODEL).
+      "hashing"                         → HashingEmbeddings (offline, deterministic)
+      "openai" / "text-embedding-*"     → OpenAIEmbeddings
+      anything else                     → local sentence-transformers model on CPU
+    A local model that cannot be loaded falls back to HashingEmbeddings.
+    Model-backed embedders are wrapped in CachedEmbeddings unless
+    DISABLE_EMBEDDING_CACHE is set; hashing is cheaper than a cache lookup.
+    Backends are created once per model name and reused.
+    """
+    name = model_name or EMBEDDING_MODEL
+    if name in _embedders:
+        return _embedders[name]
+
+    if name.startswith("hashing"):
+        backend = HashingEmbeddings()
+    elif name == "openai" or name.startswith("text-embedding"):
+        backend = OpenAIEmbeddings() if name == "openai" else OpenAIEmbeddings(model=name)
+    else:
+        try:
+            backend = LocalEmbeddings(name)
+        except Exception as e:
+            print(f"⚠️ Could not load local embedding model {name}, using hashing embeddings: {e}")
+            backend = HashingEmbeddings()
+
+    cache = None if isinstance(backend, HashingEmbeddings) else _get_embedding_cache()
+    if cache is not None:
+        backend = CachedEmbeddings(backend, name, cache)
+
+    _embedders[name] = backend
+    return backend
+
+
+# -------------------------------
+# In-process vector store
+# -------------------------------
+class NumpyVectorStore:
+    """
+    Vector store over a contiguous float32 matrix of L2-normalized rows, so
+    cosine similarity is one matrix-vector product and top-k an argpartition.
+    Mirrors the parts of Chroma that build_index/retrieve_context use:
+    `from_texts`, `similarity_search`, and collection-style `get`/`add`.
+    """
+
+    def __init__(self, embedding, dim=None):
+        self.embedding = embedding
+        self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        self._size = 0
+        self.ids, self.texts, self.metadatas = [], [], []
+        self._rows = {}
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None):
+        store = cls(embedding)
+        store.add(
+            ids=ids or [str(i) for i in range(len(texts))],
+            documents=list(texts),
+            embeddings=embedding.embed_documents(list(texts)),
+            metadatas=metadatas,
+        )
+        return store
+
+    @property
+    def vectors(self):
+        return self._vectors[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _reserve(self, n_new, dim):
+        """Grow the backing matrix geometrically so repeated adds stay amortized O(1) per row."""
+        needed = self._size + n_new
+        if self._vectors.shape[1] != dim and self._size:
+            raise ValueError(f"Embedding dimension {dim} does not match index dimension {self._vectors.shape[1]}")
+        if needed <= len(self._vectors) and self._vectors.flags.writeable:
+            return
+        grown = np.empty((max(needed, 2 * len(self._vectors), 16), dim), dtype=np.float32)
+        if self._size:
+            grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def add(self, ids, documents, embeddings, metadatas=None):
+        """Insert or replace rows; same keyword surface as a Chroma collection."""
+        metadatas = metadatas or [{} for _ in ids]
+        matrix = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        self._reserve(len(ids), matrix.shape[1])
+        rows = []
+        for doc_id, text, meta in zip(ids, documents, metadatas):
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._rows[doc_id] = self._size
+                self._size += 1
+                self.ids.append(doc_id)
+                self.texts.append(text)
+                self.metadatas.append(meta)
+            else:
+                self.texts[row], self.metadatas[row] = text, meta
+            rows.append(row)
+        self._vectors[rows] = matrix
+
+    def get(self, ids=None, include=None):
+        """Chroma-collection-style lookup: {"ids": [...]} of the requested ids that exist."""
+        found = self.ids if ids is None else [i for i in ids if i in self._rows]
+        return {"ids": list(found)}
+
+    def similarity_search_by_vector_with_score(self, vector, k=4):
+        if not self._size:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self.vectors @ (query / norm if norm else query)
+        k = min(k, self._size)
+        # argpartition is O(n); only the k winners get sorted
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(page_content=self.texts[i], metadata=self.metadatas[i]), float(scores[i]))
+            for i in top
+        ]
+
+    def similarity_search_with_score(self, query, k=4):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k=k)
+
+    def similarity_search(self, query, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def save(self, path):
+        """Write vectors.npy plus a JSON sidecar with ids, texts and metadata into directory `path`."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        with open(os.path.join(path, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas}, f)
+
+    @classmethod
+    def load(cls, path, embedding, mmap=True):
+        """Load a saved store; with `mmap` the vectors stay on disk until touched (copied on first add)."""
+        vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r" if mmap else None)
+        with open(os.path.join(path, "docs.json"), encoding="utf-8") as f:
+            docs = json.load(f)
+        store = cls(embedding)
+        store._vectors, store._size = vectors, len(vectors)
+        store.ids, store.texts, store.metadatas = docs["ids"], docs["texts"], docs["metadatas"]
+        store._rows = {doc_id: row for row, doc_id in enumerate(store.ids)}
+        return store
+
+
+# -------------------------------
+# Lexical (BM25) index
+# -------------------------------
+# Keeps codes like "E11.9", "02/14/1980" and "S52.501A" as single tokens
+_TERM = re.compile(r"[a-z0-9]+(?:[./-][a-z0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have how in is it of on or the this to was what "
+    "when where which who whom whose why with".split()
+)
+
+
+def _terms(text):
+    return [t for t in _TERM.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring. Exact-token lookups ("NPI #",
+    "ICD10") that embeddings blur are what it is for; it sits alongside the
+    vector store and is kept in sync by build_index.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids, self.texts, self._lengths = [], [], []
+        self._rows = {}
+        self._postings = {}  # term -> ([rows], [term frequencies])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids, texts):
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self._rows:
+                continue
+            row = self._rows[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.texts.append(text)
+            terms = _terms(text)
+            self._lengths.append(len(terms))
+            counts = {}
+            for t in terms:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                rows, tfs = self._postings.setdefault(t, ([], []))
+                rows.append(row)
+                tfs.append(tf)
+
+    def search(self, query, k=4):
+        """[(row, score, coverage)] best first; coverage is the share of query terms the row contains."""
+        terms = list(dict.fromkeys(_terms(query)))
+        n = len(self.ids)
+        if not terms or not n:
+            return []
+
+        lengths = np.asarray(self._lengths, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1.0))
+        scores = np.zeros(n, dtype=np.float32)
+        matched = np.zeros(n, dtype=np.int32)
+        for t in terms:
+            if t not in self._postings:
+                continue
+            rows, tfs = (np.asarray(x) for x in self._postings[t])
+            idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm[rows])
+            matched[rows] += 1
+
+        hits = np.flatnonzero(matched)
+        if not len(hits):
+            return []
+        k = min(k, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i]), matched[i] / len(terms)) for i in top]
+
+
+# BM25 index per vector store, so a store swapped in by a caller never sees stale lexical hits
+_lexical_indexes = weakref.WeakKeyDictionary()
+
+
+def lexical_index(index):
+    """The BM25Index maintained alongside vector store `index`, or None."""
+    try:
+        return _lexical_indexes.get(index)
+    except TypeError:
+        return None
+
+
+def _reciprocal_rank_fusion(rankings, k=60):
+    """Merge ranked lists of texts; each list contributes 1 / (k + rank) per item."""
+    scores = {}
+    for ranking in rankings:
+        for rank, text in enumerate(ranking):
+            scores[text] = scores.get(text, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+# -------------------------------
+# Chunking
+# -------------------------------
+def _token_spans(text):
+    """(start, end) character span of every token in `text`."""
+    enc = _get_encoding()
+    if enc is None:
+        # Whitespace tokens are a close enough proxy when tiktoken is unavailable
+        return [m.span() for m in re.finditer(r"\S+", text)]
+
+    decoded, offsets = enc.decode_with_offsets(enc.encode(text))
+    if decoded != text:
+        return [m.span() for m in re.finditer(r"\S+", text)]
+    ends = offsets[1:] + [len(text)]
+    return [(start, end) for start, end in zip(offsets, ends) if text[start:end].strip()]
+
+
+def _chunk_by_tokens(text, size, overlap):
+    """Fixed windows of `size` tokens, each overlapping the previous by `overlap` tokens."""
+    spans = _token_spans(text)
+    step = max(1, size - overlap)
+    chunks = []
+    for i in range(0, len(spans), step):
+        window = spans[i:i + size]
+        chunks.append((window[0][0], window[-1][1]))
+        if i + size >= len(spans):
+            break
+    return chunks
+
+
+_HEADING = re.compile(r"^\s*(section|part|step)\s+[\w\d]+\b", re.IGNORECASE)
+_FIELD_LINE = re.compile(r"^\s*[^:\n]{1,60}:\s*\S")
+
+
+def _is_heading(line):
+    stripped = line.strip()
+    if not stripped:
+        return False
+    if _HEADING.match(stripped):
+        return True
+    words = stripped.split()
+    # "PATIENT INFORMATION" or a bare "Provider Information:" label line
+    return (stripped.isupper() and len(words) <= 8) or (stripped.endswith(":") and len(words) <= 6)
+
+
+def _section_blocks(text):
+    """
+    Split form text into (start, end) blocks: a new block starts at blank lines,
+    headings, and wherever a run of `Label: value` lines begins or ends.
+    """
+    blocks = []
+    start = None
+    prev_is_field = None
+    pos = 0
+    for line in text.splitlines(keepends=True):
+        line_start, pos = pos, pos + len(line)
+        if not line.strip():
+            if start is not None:
+                blocks.append((start, line_start))
+                start = None
+            prev_is_field = None
+            continue
+
+        heading = _is_heading(line)
+        is_field = bool(_FIELD_LINE.match(line))
+        boundary = heading or (prev_is_field is not None and is_field != prev_is_field)
+        if start is not None and boundary:
+            blocks.append((start, line_start))
+            start = None
+        if start is None:
+            start = line_start
+        # A heading stays attached to whatever follows it
+        prev_is_field = None if heading else is_field
+
+    if start is not None:
+        blocks.append((start, len(text)))
+    return [(a, len(text[a:b].rstrip()) + a) for a, b in blocks]
+
+
+def _chunk_by_sections(text, size, overlap):
+    """Pack whole sections / field blocks into chunks of up to `size` tokens."""
+    chunks = []
+    current, current_tokens = None, 0
+    for start, end in _section_blocks(text):
+        n_tokens = len(_token_spans(text[start:end]))
+        if n_tokens > size:
+            # Oversized section: flush what we have, then window through it by tokens
+            if current:
+                chunks.append(current)
+                current, current_tokens = None, 0
+            chunks.extend((start + a, start + b) for a, b in _chunk_by_tokens(text[start:end], size, overlap))
+            continue
+        if current and current_tokens + n_tokens > size:
+            chunks.append(current)
+            current, current_tokens = None, 0
+        current = (current[0], end) if current else (start, end)
+        current_tokens += n_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_document(doc_id, text, mode=None, size=None, overlap=None):
+    """
+    Split a document into chunks for indexing.
+    mode: "tokens" (fixed windows with overlap), "sections" (form sections and
+    field blocks packed up to `size` tokens) or "none" (whole document).
+    Returns dicts with the chunk text, parent doc_id, chunk_index and the
+    chunk's start/end character offsets in the original text.
+    """
+    mode = mode or CHUNK_MODE
+    size = size or CHUNK_SIZE
+    overlap = CHUNK_OVERLAP if overlap is None else overlap
+
+    if not text or not text.strip():
+        return []
+    if mode == "tokens":
+        spans = _chunk_by_tokens(text, size, overlap)
+    elif mode == "sections":
+        spans = _chunk_by_sections(text, size, overlap)
+    elif mode == "none":
+        spans = [(0, len(text))]
+    else:
+        raise ValueError(f"Unknown chunk mode: {mode}")
+
+    return [
+        {"text": text[start:end], "doc_id": doc_id, "chunk_index": i, "start": start, "end": end}
+        for i, (start, end) in enumerate(spans)
+    ]
+
+
 def build_index(docs):
     """
-    Build a Chroma vector index from documents.
+    Build a vector index (Chroma, or NumpyVectorStore when VECTOR_STORE=numpy) from documents.
     Supports both:
       [("doc_id", "text")] and [{"doc_id": ..., "text": ...}]
+
+    Each document is split with `chunk_document` (see CHUNK_MODE/CHUNK_SIZE);
+    chunks carry the parent doc_id and their character offsets as metadata.
+
+    Indexing is incremental: chunks are stored under the document's content
+    hash, so a document that is already in the collection (or repeated within
+    `docs`) is skipped, and new chunks are embedded exactly once, in one batch.
     """
     global GLOBAL_INDEX
 
@@ -21,31 +560,63 @@ def build_index(docs):
         else:
             raise TypeError(f"Unsupported doc format: {type(d)}")
 
-    texts = [d["text"] for d in normalized]
-    metadatas = [{"doc_id": d["doc_id"]} for d in normalized]
+    texts, metadatas, ids, seen = [], [], [], set()
+    for d in normalized:
+        h = _content_hash(d["text"])
+        if h in seen:
+            continue
+        seen.add(h)
+        for chunk in chunk_document(d["doc_id"], d["text"]):
+            texts.append(chunk.pop("text"))
+            metadatas.append({**chunk, "content_hash": h})
+            ids.append(f"{h}:{chunk['chunk_index']}")
+
+    if not texts:
+        return GLOBAL_INDEX
 
-    embeddings = OpenAIEmbeddings()
+    embeddings = get_embeddings()
 
     if GLOBAL_INDEX is None:
-        GLOBAL_INDEX = Chroma.from_texts(texts, embeddings, metadatas=metadatas)
-    else:
-        new_index = Chroma.from_texts(texts, embeddings, metadatas=metadatas)
-        for i, t in enumerate(texts):
-            GLOBAL_INDEX._collection.add(
-               ids=[metadatas[i]["doc_id"]],
-               documents=[t],
-               embeddings=[embeddings.embed_query(t)],
-               metadatas=[metadatas[i]],
-            )
+        store_cls = NumpyVectorStore if VECTOR_STORE == "numpy" else Chroma
+        GLOBAL_INDEX = store_cls.from_texts(texts, embeddings, metadatas=metadatas, ids=ids)
+        bm25 = BM25Index()
+        bm25.add(ids, texts)
+        _lexical_indexes[GLOBAL_INDEX] = bm25
+        return GLOBAL_INDEX
+
+    # Both stores take collection-style get/add; Chroma keeps them on its collection
+    collection = GLOBAL_INDEX if isinstance(GLOBAL_INDEX, NumpyVectorStore) else GLOBAL_INDEX._collection
+
+    # A document is already indexed if its first chunk is
+    first_chunk_ids = [i for i in ids if i.endswith(":0")]
+    indexed = {i.split(":")[0] for i in collection.get(ids=first_chunk_ids, include=[])["ids"]}
+    new = [i for i, m in enumerate(metadatas) if m["content_hash"] not in indexed]
+    if new:
+        new_texts = [texts[i] for i in new]
+        collection.add(
+            ids=[ids[i] for i in new],
+            documents=new_texts,
+            embeddings=embeddings.embed_documents(new_texts),
+            metadatas=[metadatas[i] for i in new],
+        )
+        bm25 = lexical_index(GLOBAL_INDEX)
+        if bm25 is not None:
+            bm25.add([ids[i] for i in new], new_texts)
     return GLOBAL_INDEX
 
 
-def retrieve_context(arg1, arg2=None, k=3):
+def retrieve_context(arg1, arg2=None, k=3, mode=None):
     """
     Retrieve top-k most relevant chunks.
     Supports:
       retrieve_context("query")
       retrieve_context(index, "query")
+
+    mode (default RETRIEVAL_MODE): "vector", "bm25" or "hybrid". Hybrid fuses
+    BM25 and vector rankings with reciprocal-rank fusion; when BM25_FAST_PATH
+    is on and the best lexical hit contains every query term, the lexical hits
+    are returned without running the vector search. Indexes without a BM25
+    companion (e.g. ones not built by build_index) use vector search only.
     """
     global GLOBAL_INDEX
 
@@ -59,5 +630,17 @@ def retrieve_context(arg1, arg2=None, k=3):
     if index is None:
         raise ValueError("❌ No index available. Build index first.")
 
-    results = index.similarity_search(query, k=k)
-    return [r.page_content for r in results]
+    mode = mode or RETRIEVAL_MODE
+    bm25 = lexical_index(index)
+    if mode == "vector" or not bm25:
+        results = index.similarity_search(query, k=k)
+        return [r.page_content for r in results]
+
+    fetch_k = max(k * 4, 20)
+    lexical = bm25.search(query, k=fetch_k)
+    lexical_texts = [bm25.texts[row] for row, _, _ in lexical]
+    if mode == "bm25" or (BM25_FAST_PATH and lexical and lexical[0][2] == 1.0):
+        return lexical_texts[:k]
+
+    vector_texts = [r.page_content for r in index.similarity_search(query, k=fetch_k)]
+    return _reciprocal_rank_fusion([lexical_texts, vector_texts])[:k]
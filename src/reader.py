@@ -1,23 +1,44 @@
-import os, uuid, cv2, numpy as np
-from PIL import Image
-import pytesseract
+import os, re, json, time, uuid, atexit, threading, multiprocessing, importlib.util
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pypdf import PdfReader
-from google.cloud import vision
-import torch
-from transformers import AutoProcessor, VisionEncoderDecoderModel
+from lazy_import import LazyModule
+from config import (
+    OCR_CACHE_DIR, OCR_CACHE_MAX_MB, DONUT_BATCH_SIZE, DONUT_ENCODER_CACHE_SIZE,
+    OCR_MAX_WORKERS, PDF_OCR_DPI, OCR_ENGINES, OCR_MIN_QUALITY, OCR_RACE_ENGINES, OCR_ROUTING,
+    TESSERACT_BACKEND, TESSERACT_WORKERS, OCR_PREPROCESS, OCR_TARGET_DPI,
+)
+from disk_cache import DiskCache, file_digest, make_key
+from page_image import PageImage, as_page
+from preprocess import preprocess_page
+from ocr_quality import ocr_quality
+from tesseract_pool import TesseractPool, TesseractUnavailable
+
+# Heavy engine dependencies are imported on first use, so importing this module
+# (and starting the app) stays cheap when an engine is disabled or never needed
+cv2 = LazyModule("cv2")
+pytesseract = LazyModule("pytesseract")
+vision = LazyModule("google.cloud.vision")
+torch = LazyModule("torch")
+transformers = LazyModule("transformers")
+easyocr = LazyModule("easyocr")
 
 # -------------------------------
 # OCR Layer: EasyOCR, Tesseract, Google Vision
 # -------------------------------
 
-try:
-    # Lazy-load the EasyOCR Reader on first use to avoid startup downloads
-    import easyocr
-    _easy_reader = None
-    HAS_EASYOCR = True
-except Exception:
-    _easy_reader = None
-    HAS_EASYOCR = False
+# Engines take a PageImage (or a path, wrapped on the spot) and read the view they
+# need from it, so one upload is decoded once however many engines run. They
+# return the text, or (text, mean word confidence 0-1) when the engine reports one.
+
+# Lazy-load the EasyOCR Reader on first use to avoid startup downloads
+_easy_reader = None
+HAS_EASYOCR = importlib.util.find_spec("easyocr") is not None
+HAS_TESSEROCR = importlib.util.find_spec("tesserocr") is not None
+# Persistent Tesseract engines; False once they turned out to be unusable
+_tesseract_pool = None
+_tesseract_pool_lock = threading.Lock()
 
 
 def _read_pdf_text(path):
@@ -28,33 +49,92 @@ def _read_pdf_text(path):
         return ""
 
 
-def _ocr_easyocr(img_path):
+# -------------------------------
+# Model readiness (shared by lazy loading and startup warmup)
+# -------------------------------
+# Per model: "not_loaded" | "loading" | "ready" | "failed" | "disabled" | "unavailable"
+_model_status = {"easyocr": "not_loaded", "donut": "not_loaded"}
+_easyocr_lock = threading.Lock()
+_donut_lock = threading.Lock()
+
+
+def _ensure_easyocr_loaded():
     global _easy_reader
     # Allow disabling via environment to speed startup or avoid large downloads
     if os.getenv("DISABLE_EASYOCR", "false").lower() == "true":
-        return ""
+        _model_status["easyocr"] = "disabled"
+        return False
     if not HAS_EASYOCR:
-        return ""
-    if _easy_reader is None:
-        # Instantiate on first use
-        _easy_reader = easyocr.Reader(["en"], gpu=False)
-    return "\n".join(_easy_reader.readtext(img_path, detail=0, paragraph=True))
-
-
-def _ocr_tesseract(img_path):
-    img = cv2.imread(img_path)
-    if img is None:
-        img = cv2.cvtColor(np.array(Image.open(img_path)), cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_OTSU | cv2.THRESH_BINARY)
-    return pytesseract.image_to_string(thresh)
+        _model_status["easyocr"] = "unavailable"
+        return False
+    with _easyocr_lock:
+        if _easy_reader is None:
+            # Instantiate on first use (or in the warmup thread)
+            _model_status["easyocr"] = "loading"
+            try:
+                _easy_reader = easyocr.Reader(["en"], gpu=False)
+            except Exception:
+                _model_status["easyocr"] = "failed"
+                raise
+        _model_status["easyocr"] = "ready"
+    return True
 
 
-def _ocr_google_vision(img_path):
+def _ocr_easyocr(image):
+    if not _ensure_easyocr_loaded():
+        return ""
+    return "\n".join(_easy_reader.readtext(as_page(image).rgb, detail=0, paragraph=True))
+
+
+def _get_tesseract_pool():
+    """The shared TesseractPool, or None when the subprocess backend is used."""
+    global _tesseract_pool
+    if TESSERACT_BACKEND == "subprocess" or not HAS_TESSEROCR:
+        if TESSERACT_BACKEND == "tesserocr" and _tesseract_pool is None:
+            print("⚠️ TESSERACT_BACKEND=tesserocr but tesserocr is not installed; using pytesseract")
+            _tesseract_pool = False
+        return None
+    with _tesseract_pool_lock:
+        if _tesseract_pool is None:
+            _tesseract_pool = TesseractPool(size=TESSERACT_WORKERS)
+    return _tesseract_pool or None
+
+
+def _tesseract_data(image):
+    """image_to_data for an HxW uint8 image: persistent engines when available, one tesseract process otherwise."""
+    global _tesseract_pool
+    pool = _get_tesseract_pool()
+    if pool is not None:
+        try:
+            return pool.image_to_data(image)
+        except TesseractUnavailable as e:
+            print(f"⚠️ tesserocr unavailable ({e}); using pytesseract")
+            _tesseract_pool = False
+        except Exception as e:
+            # One bad page: keep the engines for the next one
+            print(f"⚠️ tesserocr failed on this page ({e}); using pytesseract")
+    return pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+
+
+def _ocr_tesseract(image):
+    _, thresh = cv2.threshold(as_page(image).gray, 0, 255, cv2.THRESH_OTSU | cv2.THRESH_BINARY)
+    # image_to_data gives per-word confidences along with the text, in one pass
+    data = _tesseract_data(thresh)
+    lines, confidences = {}, []
+    for i, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        if float(data["conf"][i]) >= 0:
+            confidences.append(float(data["conf"][i]) / 100)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return text, (sum(confidences) / len(confidences) if confidences else None)
+
+
+def _ocr_google_vision(image):
     try:
         client = vision.ImageAnnotatorClient()
-        with open(img_path, "rb") as f:
-            image = vision.Image(content=f.read())
+        image = vision.Image(content=as_page(image).encoded)
         response = client.text_detection(image=image)
         if response.error.message:
             raise Exception(response.error.message)
@@ -64,6 +144,85 @@ def _ocr_google_vision(img_path):
         return ""
 
 
+# -------------------------------
+# OCR result cache
+# -------------------------------
+
+# Bump when engine output handling changes so stale entries are ignored
+OCR_CACHE_VERSION = 3
+
+# Settings that change an engine's output; they are part of every cache key
+OCR_ENGINE_SETTINGS = {
+    "easyocr": {"langs": ["en"], "paragraph": True},
+    "tesseract": {"threshold": "otsu", "output": "data"},
+    "google_vision": {"feature": "text_detection"},
+    "donut": {"model": "naver-clova-ix/donut-base-finetuned-docvqa", "max_new_tokens": 64, "num_beams": 3},
+}
+
+
+
+def _cascade_settings():
+    """Settings that change what the whole cascade returns for a page; part of whole-page cache keys."""
+    return {
+        "engines": OCR_ENGINES, "engine_settings": OCR_ENGINE_SETTINGS, "routing": OCR_ROUTING,
+        "min_quality": OCR_MIN_QUALITY, "preprocess": OCR_PREPROCESS, "target_dpi": OCR_TARGET_DPI,
+    }
+
+
+_ocr_cache = None
+
+
+def _get_ocr_cache():
+    global _ocr_cache
+    if os.getenv("DISABLE_OCR_CACHE", "false").lower() == "true":
+        return None
+    if _ocr_cache is None:
+        try:
+            _ocr_cache = DiskCache(
+                os.path.join(OCR_CACHE_DIR, "ocr_cache.sqlite"),
+                max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024,
+            )
+        except Exception as e:
+            print(f"⚠️ OCR cache unavailable: {e}")
+            return None
+    return _ocr_cache
+
+
+def _engine_result(result):
+    """(text, confidence) from an engine's text or (text, confidence) return value."""
+    return tuple(result) if isinstance(result, (tuple, list)) else (result, None)
+
+
+def _cached_ocr(engine, ocr_fn, page, *args):
+    """
+    (text, confidence) of `ocr_fn(page, *args)`, unless a result for these exact
+    bytes and settings is cached. In-memory pages (no source bytes, so no
+    digest) are never cached.
+    """
+    cache = _get_ocr_cache()
+    digest = page.digest if cache is not None else None
+    if digest is None:
+        return _engine_result(ocr_fn(page, *args))
+
+    key = make_key(OCR_CACHE_VERSION, digest, engine, OCR_ENGINE_SETTINGS.get(engine), args)
+    hit = cache.get(key)
+    if hit is not None:
+        cached = json.loads(hit.decode("utf-8"))
+        return cached["text"], cached["confidence"]
+
+    text, confidence = _engine_result(ocr_fn(page, *args))
+    # Empty output usually means the engine failed; let the next upload retry it
+    if text and text.strip():
+        cache.put(key, json.dumps({"text": text, "confidence": confidence}).encode("utf-8"))
+    return text, confidence
+
+
+def ocr_cache_stats():
+    """Hit/miss counters and size of the OCR cache (None when disabled)."""
+    cache = _get_ocr_cache()
+    return cache.stats() if cache is not None else None
+
+
 # -------------------------------
 # Donut (HF Vision-Language Model)
 # -------------------------------
@@ -76,30 +235,145 @@ def _ensure_donut_loaded():
     if HAS_DONUT:
         return True
     if os.getenv("DISABLE_DONUT", "false").lower() == "true":
+        _model_status["donut"] = "disabled"
         return False
-    try:
-        _donut_processor = AutoProcessor.from_pretrained("naver-clova-ix/donut-base-finetuned-docvqa")
-        _donut_model = VisionEncoderDecoderModel.from_pretrained("naver-clova-ix/donut-base-finetuned-docvqa")
-        HAS_DONUT = True
-        return True
-    except Exception as e:
-        print("⚠️ Could not load Donut model:", e)
-        _donut_processor, _donut_model, HAS_DONUT = None, None, False
-        return False
+    # A request arriving during warmup waits for that load instead of starting a second one
+    with _donut_lock:
+        if HAS_DONUT:
+            return True
+        _model_status["donut"] = "loading"
+        try:
+            _donut_processor = transformers.AutoProcessor.from_pretrained("naver-clova-ix/donut-base-finetuned-docvqa")
+            _donut_model = transformers.VisionEncoderDecoderModel.from_pretrained("naver-clova-ix/donut-base-finetuned-docvqa")
+            _donut_model.eval()
+            HAS_DONUT = True
+            _model_status["donut"] = "ready"
+            return True
+        except Exception as e:
+            print("⚠️ Could not load Donut model:", e)
+            _donut_processor, _donut_model, HAS_DONUT = None, None, False
+            _model_status["donut"] = "failed"
+            return False
+
+
+# -------------------------------
+# Startup warmup
+# -------------------------------
+_WARMUP_LOADERS = {
+    "easyocr": _ensure_easyocr_loaded,
+    "donut": _ensure_donut_loaded,
+}
+_warmup_thread = None
+
+
+def warmup(models=("easyocr", "donut"), background=True):
+    """
+    Pre-load OCR/VLM models so the first request after a deploy does not pay
+    for model construction. With `background=True` loading happens in a daemon
+    thread and this returns immediately; poll `model_status()` for progress.
+    """
+    global _warmup_thread
+
+    def _load_all():
+        for name in models:
+            try:
+                _WARMUP_LOADERS[name]()
+            except Exception as e:
+                print(f"⚠️ Warmup of {name} failed: {e}")
+
+    if not background:
+        _load_all()
+        return None
+    if _warmup_thread is None or not _warmup_thread.is_alive():
+        _warmup_thread = threading.Thread(target=_load_all, name="model-warmup", daemon=True)
+        _warmup_thread.start()
+    return _warmup_thread
+
+
+def model_status():
+    """Snapshot of each model's load state."""
+    return dict(_model_status)
+
+
+def models_ready(models=("easyocr", "donut")):
+    """True once every requested model is settled: loaded, failed, disabled or unavailable."""
+    return all(_model_status.get(m) in ("ready", "disabled", "unavailable", "failed") for m in models)
+
+
+# -------------------------------
+# Donut encoder reuse: one vision-encoder pass per image, many prompts
+# -------------------------------
+
+_donut_encodings = OrderedDict()
+# Racing engines and pool threads share the LRU
+_donut_encodings_lock = threading.Lock()
+
+
+def _donut_encode(form_image):
+    """
+    Run the Donut vision encoder once for an image (path or PageImage) and keep
+    the hidden states. Encodings are kept in a small in-process LRU keyed by
+    file digest, so follow-up questions on the same form skip the encoder entirely.
+    """
+    page = as_page(form_image)
+    digest = page.digest
+    if digest is not None:
+        with _donut_encodings_lock:
+            if digest in _donut_encodings:
+                _donut_encodings.move_to_end(digest)
+                return _donut_encodings[digest]
+
+    # Encode outside the lock: other pages' lookups do not wait for an encoder pass
+    pixel_values = _donut_processor(images=page.pil, return_tensors="pt").pixel_values
+    with torch.no_grad():
+        encoder_outputs = _donut_model.encoder(pixel_values=pixel_values)
+
+    if digest is not None and DONUT_ENCODER_CACHE_SIZE > 0:
+        with _donut_encodings_lock:
+            _donut_encodings[digest] = encoder_outputs
+            while len(_donut_encodings) > DONUT_ENCODER_CACHE_SIZE:
+                _donut_encodings.popitem(last=False)
+    return encoder_outputs
+
+
+def _donut_generate(encoder_outputs, prompt: str, max_new_tokens: int):
+    """Decode one prompt against precomputed encoder outputs; returns only the generated text."""
+    from transformers.modeling_outputs import BaseModelOutput
+
+    decoder_input_ids = _donut_processor.tokenizer(
+        prompt, add_special_tokens=False, return_tensors="pt"
+    ).input_ids
+
+    with torch.no_grad():
+        output_ids = _donut_model.generate(
+            # generate() expands encoder outputs for beam search in place, so pass a fresh wrapper
+            encoder_outputs=BaseModelOutput(last_hidden_state=encoder_outputs.last_hidden_state),
+            decoder_input_ids=decoder_input_ids,
+            max_new_tokens=max_new_tokens,
+            pad_token_id=_donut_processor.tokenizer.pad_token_id,
+            num_beams=3,
+            early_stopping=True,
+        )
+
+    return _donut_processor.batch_decode(
+        output_ids[:, decoder_input_ids.shape[1]:], skip_special_tokens=True
+    )[0]
 
 
 # ===============================================================
 # 1️⃣ Donut-based Visual QA — answers a specific question visually
 # ===============================================================
-def _donut_answer(form_image_path: str, question: str):
+def _donut_answer(form_image, question: str, encoder_outputs=None):
     """
     Donut-based visual reasoning for healthcare forms.
     Optimized for checkbox and handwritten detection.
+    Pass `encoder_outputs` from `_donut_encode` to reuse an existing image encoding.
     """
     if not _ensure_donut_loaded():
         return ""
 
-    image = Image.open(form_image_path).convert("RGB")
+    if encoder_outputs is None:
+        encoder_outputs = _donut_encode(form_image)
 
     prompt = (
         f"<s_docvqa><s_question>{question.strip()}? "
@@ -107,18 +381,7 @@ def _donut_answer(form_image_path: str, question: str):
         "Do not repeat the question or include any unrelated text.</s_question><s_answer>"
     )
 
-    inputs = _donut_processor(images=image, text=prompt, return_tensors="pt").to("cpu")
-
-    with torch.no_grad():
-        output_ids = _donut_model.generate(
-            **inputs,
-            max_new_tokens=64,
-            pad_token_id=_donut_processor.tokenizer.pad_token_id,
-            num_beams=3,
-            early_stopping=True,
-        )
-
-    result = _donut_processor.batch_decode(output_ids, skip_special_tokens=True)[0]
+    result = _donut_generate(encoder_outputs, prompt, max_new_tokens=64)
     result = result.replace("<s_docvqa>", "").replace("<s_question>", "").replace("</s_question>", "")
     result = result.replace("<s_answer>", "").replace("</s_answer>", "").strip()
 
@@ -143,49 +406,30 @@ def _donut_answer(form_image_path: str, question: str):
 # ===============================================================
 # 2️⃣ Donut-based Structured Field Extraction — returns JSON
 # ===============================================================
-def _donut_extract_form_data(form_image_path: str):
-    """
-    Use Donut to extract structured key-value and checkbox data from a healthcare form.
-    Returns a JSON-like dictionary of recognized fields.
-    """
-    if not _ensure_donut_loaded():
-        return {}
-
-    image = Image.open(form_image_path).convert("RGB")
-
-    prompt = (
-        "<s_docvqa><s_question>"
-        "You are an intelligent form-understanding AI agent trained to interpret medical and administrative documents. "
-        "Your goal is to extract all structured information visible on the form, including both printed text and handwritten or checkbox inputs. "
-        "For every field label (like 'Therapy Type', 'Diagnosis', 'Provider', etc.), identify its corresponding value. "
-        "If a checkbox or handwritten tick mark is visibly selected next to an option, treat that option as the field’s value. "
-        "Do not ignore handwritten or ticked responses — they are the true answers for that field. "
-        "Ignore empty boxes or unchecked fields. "
-        "Return your output as a valid JSON object using clear key–value pairs, where keys are the field names and values are the detected answers. "
-        "If a field has multiple checked boxes, return them as a list of selected values. "
-        "Example output:\n"
-        "{\n"
-        '  \"Form Type\": \"Prior Authorization\",\n'
-        '  \"Patient Name\": \"Jane Doe\",\n'
-        '  \"Therapy Type\": \"Occupational Therapy\",\n'
-        '  \"Diagnosis\": \"Salter-Harris Type\",\n'
-        '  \"Services\": [\"Outpatient\", \"Home Health\"]\n'
-        "}\n"
-        "Now analyze the uploaded form carefully and return only the extracted JSON, nothing else."
-        "</s_question><s_answer>"
-    )
-
-    inputs = _donut_processor(images=image, text=prompt, return_tensors="pt").to("cpu")
-    with torch.no_grad():
-        output_ids = _donut_model.generate(
-            **inputs,
-            max_new_tokens=256,
-            pad_token_id=_donut_processor.tokenizer.pad_token_id,
-            num_beams=3,
-            early_stopping=True,
-        )
-
-    result = _donut_processor.batch_decode(output_ids, skip_special_tokens=True)[0]
+_DONUT_EXTRACT_PROMPT = (
+    "<s_docvqa><s_question>"
+    "You are an intelligent form-understanding AI agent trained to interpret medical and administrative documents. "
+    "Your goal is to extract all structured information visible on the form, including both printed text and handwritten or checkbox inputs. "
+    "For every field label (like 'Therapy Type', 'Diagnosis', 'Provider', etc.), identify its corresponding value. "
+    "If a checkbox or handwritten tick mark is visibly selected next to an option, treat that option as the field’s value. "
+    "Do not ignore handwritten or ticked responses — they are the true answers for that field. "
+    "Ignore empty boxes or unchecked fields. "
+    "Return your output as a valid JSON object using clear key–value pairs, where keys are the field names and values are the detected answers. "
+    "If a field has multiple checked boxes, return them as a list of selected values. "
+    "Example output:\n"
+    "{\n"
+    '  \"Form Type\": \"Prior Authorization\",\n'
+    '  \"Patient Name\": \"Jane Doe\",\n'
+    '  \"Therapy Type\": \"Occupational Therapy\",\n'
+    '  \"Diagnosis\": \"Salter-Harris Type\",\n'
+    '  \"Services\": [\"Outpatient\", \"Home Health\"]\n'
+    "}\n"
+    "Now analyze the uploaded form carefully and return only the extracted JSON, nothing else."
+    "</s_question><s_answer>"
+)
+
+
+def _parse_donut_json(result: str):
     result = (
         result.replace("<s_docvqa>", "")
         .replace("<s_question>", "")
@@ -196,7 +440,6 @@ def _donut_extract_form_data(form_image_path: str):
     )
 
     # Parse JSON-like text
-    import re, json
     try:
         json_text = re.search(r"\{.*\}", result, re.DOTALL)
         if json_text:
@@ -207,44 +450,485 @@ def _donut_extract_form_data(form_image_path: str):
     return {"raw_text": result}
 
 
+def _donut_extract_form_data(form_image, encoder_outputs=None):
+    """
+    Use Donut to extract structured key-value and checkbox data from a healthcare form.
+    Returns a JSON-like dictionary of recognized fields.
+    Pass `encoder_outputs` from `_donut_encode` to reuse an existing image encoding.
+    """
+    if not _ensure_donut_loaded():
+        return {}
+
+    if encoder_outputs is None:
+        encoder_outputs = _donut_encode(form_image)
+
+    return _parse_donut_json(_donut_generate(encoder_outputs, _DONUT_EXTRACT_PROMPT, max_new_tokens=256))
+
+
+def _donut_analyze(form_image, questions=()):
+    """
+    Structured extraction plus answers to any number of questions from a single
+    encoder pass. Returns (fields_dict, {question: answer}).
+    """
+    if not _ensure_donut_loaded():
+        return {}, {q: "" for q in questions}
+
+    page = as_page(form_image)
+    encoder_outputs = _donut_encode(page)
+    data = _donut_extract_form_data(page, encoder_outputs=encoder_outputs)
+    answers = {q: _donut_answer(page, q, encoder_outputs=encoder_outputs) for q in questions}
+    return data, answers
+
+
+def _donut_extract_form_data_batch(form_images, batch_size=None):
+    """
+    Batched variant of `_donut_extract_form_data` for multi-form uploads.
+    The processor resizes and pads every page to the same input size, so up to
+    `batch_size` pages are stacked into one tensor and decoded by a single
+    `generate()` call. Takes paths or PageImages; returns one dict per input,
+    in input order. Inputs that cannot be decoded as images get an empty dict.
+    """
+    results = [{} for _ in form_images]
+    if not form_images or not _ensure_donut_loaded():
+        return results
+
+    batch_size = max(1, batch_size or DONUT_BATCH_SIZE)
+    prompt_ids = _donut_processor.tokenizer(
+        _DONUT_EXTRACT_PROMPT, add_special_tokens=False, return_tensors="pt"
+    ).input_ids
+
+    # Only real images go into the batch; keep their original positions
+    images, positions = [], []
+    for i, form_image in enumerate(form_images):
+        page = as_page(form_image)
+        try:
+            images.append(page.pil)
+            positions.append(i)
+        except Exception as e:
+            print(f"⚠️ Donut skipped {page.name}: {e}")
+
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        pixel_values = _donut_processor(images=batch, return_tensors="pt").pixel_values
+        decoder_input_ids = prompt_ids.repeat(len(batch), 1)
+
+        with torch.no_grad():
+            output_ids = _donut_model.generate(
+                pixel_values=pixel_values,
+                decoder_input_ids=decoder_input_ids,
+                max_new_tokens=256,
+                pad_token_id=_donut_processor.tokenizer.pad_token_id,
+                num_beams=3,
+                early_stopping=True,
+            )
+
+        # Drop the echoed prompt so only the generated answer is parsed
+        decoded = _donut_processor.batch_decode(
+            output_ids[:, decoder_input_ids.shape[1]:], skip_special_tokens=True
+        )
+        for pos, text in zip(positions[start:start + batch_size], decoded):
+            results[pos] = _parse_donut_json(text)
+
+    return results
+
+
 # ===============================================================
-# 3️⃣ Combined Document Loader — integrates OCR + Donut fallback
+# 3️⃣ Page classifier — picks the engine order per page
 # ===============================================================
-def load_document_text(path):
-    doc_id = os.path.basename(path) + "-" + str(uuid.uuid4())[:8]
-    ext = os.path.splitext(path)[1].lower()
+# Cheapest engine likely to succeed first. Tesseract is fast and accurate on clean
+# print; EasyOCR copes better with fax noise, uneven lighting and handwriting;
+# Google Vision is the paid fallback; Donut reads checkboxes.
+PAGE_ROUTES = {
+    "printed": ("tesseract", "easyocr", "google_vision", "donut"),
+    "fax": ("easyocr", "tesseract", "google_vision", "donut"),
+    "photo": ("easyocr", "google_vision", "tesseract", "donut"),
+    "handwritten": ("easyocr", "google_vision", "donut", "tesseract"),
+    "blank": ("tesseract",),
+}
+
+
+def classify_page(image):
+    """
+    Classify a page image from cheap statistics (~25 ms on a 300 dpi page):
+
+    - ink_ratio: share of dark pixels after Otsu binarization (blank pages)
+    - noise: isolated pixels that differ sharply from their 3x3 median, in a
+      full-resolution center crop (fax speckle)
+    - background_std: spread of the paper background once ink is dilated
+      away (photos, uneven lighting)
+    - handwriting: share of glyph-sized ink in tall, loopy components
+      (cursive strokes rather than printed characters)
+    - checkboxes: small hollow squares (enables the Donut fallback)
+
+    Returns {"kind", "engines", <features>}; `engines` is the PAGE_ROUTES order.
+    """
+    gray = as_page(image).gray
+    h, w = gray.shape
+    cy, cx = h // 2, w // 2
+    crop = gray[max(cy - 512, 0):cy + 512, max(cx - 512, 0):cx + 512]
+    noise = float((cv2.absdiff(crop, cv2.medianBlur(crop, 3)) > 96).mean())
+
+    scale = min(1.0, 1000 / max(h, w))
+    small = cv2.resize(gray, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_AREA)
+    background = cv2.dilate(cv2.resize(small, (200, max(int(200 * h / w), 1)), interpolation=cv2.INTER_AREA),
+                            np.ones((9, 9), np.uint8))
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    ink_ratio = float(np.count_nonzero(ink)) / ink.size
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    area, bw, bh = (stats[1:, c] for c in (cv2.CC_STAT_AREA, cv2.CC_STAT_WIDTH, cv2.CC_STAT_HEIGHT))
+    fill = area / np.maximum(bw * bh, 1)
+    sh, sw = small.shape
+    glyph = (bh >= 4) & (bh <= sh * 0.05) & (bw <= sw * 0.05)
+    median_height = float(np.median(bh[glyph])) if glyph.any() else 0.0
+    loopy = glyph & (bh > 2.5 * median_height) & (fill < 0.3)
+    handwriting = float(area[loopy].sum()) / max(float(area[glyph].sum()), 1.0)
+    square = (np.abs(bw - bh) <= 0.2 * np.maximum(bw, bh)) & (bw >= 6) & (bw <= 25) & (fill < 0.5)
+
+    features = {
+        "ink_ratio": round(ink_ratio, 4),
+        "noise": round(noise, 4),
+        "background_std": round(float(background.std()), 1),
+        "handwriting": round(handwriting, 3),
+        "checkboxes": int(square.sum()),
+    }
+    if ink_ratio < 0.003:
+        kind = "blank"
+    elif features["background_std"] > 8:
+        kind = "photo"
+    elif noise > 0.015:
+        kind = "fax"
+    elif handwriting > 0.15:
+        kind = "handwritten"
+    else:
+        kind = "printed"
+    return {"kind": kind, "engines": PAGE_ROUTES[kind], **features}
+
+
+def _route(page, timings=None):
+    """(engine order, checkbox count) for `page`; OCR_ENGINES order when routing is off or fails."""
+    if not OCR_ROUTING:
+        return list(OCR_ENGINES), 0
+    t0 = time.perf_counter()
+    try:
+        decision = classify_page(page)
+    except Exception:
+        # Undecodable input: let the engines report their own errors in the usual order
+        return list(OCR_ENGINES), 0
+    if timings is not None:
+        timings["classify"] = time.perf_counter() - t0
+        timings["page_class"] = decision["kind"]
+    # Routes only reorder the configured engines; engines a route omits stay available last
+    order = [e for e in decision["engines"] if e in OCR_ENGINES]
+    if decision["kind"] != "blank":
+        order += [e for e in OCR_ENGINES if e not in order]
+    return order, decision["checkboxes"]
+
+
+# ===============================================================
+# 4️⃣ Image OCR cascade — scored, early exit, optional racing
+# ===============================================================
+# Looked up at call time so each engine's function can be swapped (e.g. patched)
+_OCR_ENGINES = {
+    "easyocr": lambda page: _cached_ocr("easyocr", _ocr_easyocr, page),
+    "tesseract": lambda page: _cached_ocr("tesseract", _ocr_tesseract, page),
+    "google_vision": lambda page: _cached_ocr("google_vision", _ocr_google_vision, page),
+    "donut": lambda page: _cached_ocr("donut", _donut_answer, page, "Extract all filled fields or marked options."),
+}
+_race_pool = None
+
+
+def _get_race_pool():
+    global _race_pool
+    if _race_pool is None:
+        _race_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ocr-race")
+    return _race_pool
+
+
+def _engine_ready(name, page, checkboxes=0):
+    if name == "easyocr":
+        # While EasyOCR is still warming up, go straight to the next engine instead of waiting
+        return HAS_EASYOCR and _model_status["easyocr"] != "loading"
+    if name == "donut":
+        # Visual fallback, only for pages with checkboxes or uploads named like forms / checkbox sheets
+        named = "checkbox" in page.name.lower() or "form" in page.name.lower()
+        if named:
+            return _ensure_donut_loaded()
+        # Most form pages have checkboxes: only use Donut for them once warmup has loaded it, never load it here
+        return checkboxes >= 4 and _model_status["donut"] == "ready"
+    return True
+
+
+def _run_engine(name, page):
+    """(name, text, quality, seconds) for one engine; a failing engine yields empty text."""
+    t0 = time.perf_counter()
+    try:
+        text, confidence = _OCR_ENGINES[name](page)
+    except Exception as e:
+        if name == "donut":
+            print(f"⚠️ Donut fallback failed: {e}")
+        text, confidence = "", None
+    return name, text or "", ocr_quality(text, confidence), time.perf_counter() - t0
+
+
+def _race_engines(names, page):
+    """
+    Run `names` at the same time; return as soon as one result is acceptable
+    (the other engine finishes in the background and still fills the OCR cache),
+    otherwise once all are done. Returns the results collected, fastest first.
+    """
+    futures = [_get_race_pool().submit(_run_engine, name, page) for name in names]
+    results = []
+    for future in as_completed(futures):
+        results.append(future.result())
+        if results[-1][2]["score"] >= OCR_MIN_QUALITY:
+            break
+    return results
+
+
+def _ocr_image(image, timings=None, engines=None):
+    """
+    Run the OCR engines in order — `engines` if given, otherwise the order
+    `classify_page` picks for this page (OCR_ROUTING), recorded in `timings`
+    as "page_class" — on the `preprocess_page` copy of the page, scoring each
+    result with `ocr_quality`, and stop at the first one scoring at least
+    OCR_MIN_QUALITY. With OCR_RACE_ENGINES the first two engines run at the
+    same time. When nothing is good enough the best-scoring text is returned.
+    `image` is a path or a PageImage; every engine reads the same decoded page.
+    Per-engine seconds and the chosen score are added to `timings` if given.
+    Returns (text, engine_name); engine_name is None when nothing worked.
+    """
+    page = as_page(image)
+    checkboxes = 0
+    if engines is None:
+        engines, checkboxes = _route(page, timings)
+    t0 = time.perf_counter()
+    page = preprocess_page(page)
+    if timings is not None:
+        timings["preprocess"] = time.perf_counter() - t0
+    pending = [name for name in engines if name in _OCR_ENGINES]
+    best = ("", None, -1.0)
+
+    while pending:
+        name = pending.pop(0)
+        if not _engine_ready(name, page, checkboxes):
+            continue
+        partner = None
+        if OCR_RACE_ENGINES and name != "donut":
+            partner = next((p for p in pending if p != "donut" and _engine_ready(p, page, checkboxes)), None)
+        if partner:
+            pending.remove(partner)
+            results = _race_engines([name, partner], page)
+        else:
+            results = [_run_engine(name, page)]
+
+        for engine, text, quality, seconds in results:
+            if timings is not None:
+                timings[f"ocr_{engine}"] = seconds
+            if text.strip() and quality["score"] > best[2]:
+                best = (text, engine, quality["score"])
+        if best[2] >= OCR_MIN_QUALITY:
+            break
+
+    if timings is not None and best[1] is not None:
+        timings["ocr_score"] = best[2]
+    return best[0], best[1]
+
+
+# ===============================================================
+# 5️⃣ Scanned PDFs — rasterize page by page, OCR across processes
+# ===============================================================
+_ocr_pool = None
+
+
+def _init_ocr_worker():
+    # One process per core already; keep each worker's math libraries single-threaded.
+    # torch is not imported yet in a fresh worker, so the env var is enough for it.
+    os.environ["OMP_NUM_THREADS"] = "1"
+    cv2.setNumThreads(1)
 
-    if ext == ".pdf":
-        text = _read_pdf_text(path)
+
+def _get_ocr_pool():
+    """Long-lived process pool so OCR workers keep their models loaded between uploads."""
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ProcessPoolExecutor(
+            max_workers=OCR_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_ocr_worker,
+        )
+        atexit.register(_ocr_pool.shutdown, wait=False, cancel_futures=True)
+    return _ocr_pool
+
+
+def _pdf_page_count(path):
+    try:
+        return len(PdfReader(path).pages)
+    except Exception:
+        return 0
+
+
+def _rasterize_pdf_page(path, page_no, dpi):
+    from pdf2image import convert_from_path
+
+    return convert_from_path(path, dpi=dpi, first_page=page_no, last_page=page_no)[0]
+
+
+def _ocr_pdf_page(path, page_no, dpi, pdf_digest=None):
+    """
+    Rasterize one PDF page and OCR it. Runs inside pool workers, so it never raises.
+    Returns (page_no, text, engine_name, timings).
+    """
+    timings = {}
+    cache = _get_ocr_cache()
+    key = None
+    if cache is not None and pdf_digest is not None:
+        key = make_key(OCR_CACHE_VERSION, pdf_digest, "pdf_page", page_no, dpi, _cascade_settings())
+        hit = cache.get(key)
+        if hit is not None:
+            cached = json.loads(hit.decode("utf-8"))
+            return page_no, cached["text"], cached["engine"], {"cached": True}
+
+    try:
+        t0 = time.perf_counter()
+        # The rasterized pixels go to the engines directly; no PNG round trip through disk
+        page = PageImage(_rasterize_pdf_page(path, page_no, dpi))
+        timings["rasterize"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        text, engine = _ocr_image(page, timings)
+        timings["ocr"] = time.perf_counter() - t0
+    except Exception as e:
+        print(f"⚠️ OCR failed for page {page_no} of {os.path.basename(path)}: {e}")
+        return page_no, "", None, timings
+
+    if key is not None and text.strip():
+        cache.put(key, json.dumps({"text": text, "engine": engine}).encode("utf-8"))
+    return page_no, text, engine, timings
+
+
+def _iter_scanned_pdf_pages(path, max_workers=None, dpi=None, pages=None):
+    """
+    OCR a PDF without a text layer, one page per task across a process pool.
+    Pages (all of them, or the 1-based `pages` given) are yielded in page order
+    as soon as every earlier page has finished, so callers can start on page 1
+    while later pages are still running. Yields (page_no, text, engine, timings).
+    """
+    if pages is None:
+        pages = list(range(1, _pdf_page_count(path) + 1))
+    pages = sorted(pages)
+    if not pages:
+        return
+
+    dpi = dpi or PDF_OCR_DPI
+    pdf_digest = file_digest(path)
+    workers = min(max_workers or OCR_MAX_WORKERS, len(pages))
+
+    if workers <= 1:
+        for page_no in pages:
+            yield _ocr_pdf_page(path, page_no, dpi, pdf_digest)
+        return
+
+    pool = _get_ocr_pool()
+    futures = [pool.submit(_ocr_pdf_page, path, page_no, dpi, pdf_digest) for page_no in pages]
+    finished, next_index = {}, 0
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            finished[result[0]] = result
+            # Release every page that is now contiguous with what was already yielded
+            while next_index < len(pages) and pages[next_index] in finished:
+                yield finished.pop(pages[next_index])
+                next_index += 1
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _ocr_scanned_pdf(path, max_workers=None, dpi=None):
+    return "\n".join(page[1] for page in _iter_scanned_pdf_pages(path, max_workers, dpi))
+
+
+# ===============================================================
+# 6️⃣ Page-level streaming API
+# ===============================================================
+def _pdf_page_text(reader, page_no):
+    try:
+        return reader.pages[page_no - 1].extract_text() or ""
+    except Exception:
+        return ""
+
+
+def _iter_pdf_pages(path):
+    try:
+        reader = PdfReader(path)
+        page_count = len(reader.pages)
+    except Exception:
+        return
+
+    for page_no in range(1, page_count + 1):
+        t0 = time.perf_counter()
+        text = _pdf_page_text(reader, page_no)
         if text.strip():
-            return doc_id, text
-        # TODO: fallback to pdf2image if necessary
+            yield page_no, text, "pypdf", {"extract": time.perf_counter() - t0, "page_class": "text_layer"}
+            continue
+
+        # First page without a text layer: read the rest of the text layer now so
+        # every page that needs OCR can be submitted to the pool at once
+        remaining = {}
+        for later in range(page_no + 1, page_count + 1):
+            t0 = time.perf_counter()
+            remaining[later] = (_pdf_page_text(reader, later), time.perf_counter() - t0)
+        missing = [page_no] + [p for p, (t, _) in remaining.items() if not t.strip()]
+
+        ocr_pages = _iter_scanned_pdf_pages(path, pages=missing)
+        for later in range(page_no, page_count + 1):
+            if later in missing:
+                yield next(ocr_pages)
+            else:
+                later_text, elapsed = remaining[later]
+                yield later, later_text, "pypdf", {"extract": elapsed, "page_class": "text_layer"}
+        return
+
+
+def iter_document_pages(path):
+    """
+    Generator variant of `load_document_text`: yields (page_no, text, engine, timings)
+    for each page as soon as it is available. Images (a path or PageImage) are a single page 1.
+    `engine` is the source of the text ("pypdf", "easyocr", "tesseract", ...)
+    and `timings` holds per-stage seconds for that page.
+    """
+    page = as_page(path)
+    if page.path is not None and os.path.splitext(page.path)[1].lower() == ".pdf":
+        yield from _iter_pdf_pages(page.path)
+        return
 
-    else:
-        if HAS_EASYOCR:
-            try:
-                return doc_id, _ocr_easyocr(path)
-            except Exception:
-                pass
-        try:
-            t_text = _ocr_tesseract(path)
-            if t_text.strip():
-                return doc_id, t_text
-        except Exception:
-            pass
-
-        # final fallback: Google Vision OCR
-        g_text = _ocr_google_vision(path)
-        if g_text.strip():
-            return doc_id, g_text
-
-        # --- Visual fallback using Donut ---
-        if _ensure_donut_loaded() and ("checkbox" in path.lower() or "form" in path.lower()):
-            try:
-                donut_answer = _donut_answer(path, "Extract all filled fields or marked options.")
-                if donut_answer.strip():
-                    return doc_id, donut_answer
-            except Exception as e:
-                print(f"⚠️ Donut fallback failed: {e}")
+    timings = {}
+    t0 = time.perf_counter()
+    text, engine = _ocr_image(page, timings)
+    timings["ocr"] = time.perf_counter() - t0
+    yield 1, text, engine, timings
+
+
+def document_id(path, digest=None):
+    """Content-derived id so re-uploads of the same bytes map to the same document."""
+    digest = digest or file_digest(path)
+    return os.path.basename(path) + "-" + (digest[:8] if digest else str(uuid.uuid4())[:8])
 
-    return doc_id, ""
+
+# ===============================================================
+# 7️⃣ Combined Document Loader — integrates OCR + Donut fallback
+# ===============================================================
+def load_document_text(path):
+    """
+    (doc_id, text) for a PDF or image: the pages of `iter_document_pages`
+    joined, so PDF pages without a text layer are OCR'd here too. Pass a
+    PageImage instead of an image path to let later stages (e.g.
+    `_donut_analyze`) reuse its decoded pixels.
+    """
+    page = as_page(path)
+    path = page.path if page.path is not None else page.name
+    is_pdf = os.path.splitext(path)[1].lower() == ".pdf"
+    doc_id = document_id(path, file_digest(path) if is_pdf else page.digest)
+    text = "\n".join(page_text for _, page_text, _, _ in iter_document_pages(page))
+    return doc_id, text
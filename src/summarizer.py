@@ -1,30 +1,57 @@
-from config import can_use_openai, OPENAI_MODEL, USE_OPENAI_ONLY
-from openai import OpenAI
+from config import can_use_openai, OPENAI_MODEL, USE_OPENAI_ONLY, SUMMARY_PROMPT_TOKENS
+from llm_client import get_openai_client, get_async_openai_client
+from prompt_budget import count_tokens, fit_sections, field_lines
 
-def summarize_doc(fields, full_text):
-    # Limit input size for latency; fields usually carry the key signal
-    MAX_TEXT_CHARS = 1500
-    clipped_text = (full_text or "")[:MAX_TEXT_CHARS]
 
-    prompt = f"""
+def _summary_prompt(fields_text, text):
+    return f"""
     Summarize this medical form into 5 concise bullet points.
     Keep the answer under 120 words total.
-    Fields: {fields}
-    Text: {clipped_text}
+    Fields:
+    {fields_text}
+    Text: {text}
     """
+
+
+def _summary_request(fields, full_text):
+    # Limit input size for latency; fields usually carry the key signal, so they
+    # get first claim on the token budget and the raw text gets the rest
+    budget = SUMMARY_PROMPT_TOKENS - count_tokens(_summary_prompt("", ""))
+    fitted = fit_sections([("fields", field_lines(fields), 0.4), ("text", full_text or "", 0.6)], budget)
+    prompt = _summary_prompt("\n".join(fitted["fields"]), fitted["text"])
+    return dict(
+        model=OPENAI_MODEL,
+        messages=[{"role":"user","content":prompt}],
+        temperature=0.2,
+        max_tokens=220
+    )
+
+
+def summarize_doc(fields, full_text):
+    if can_use_openai():
+        try:
+            client = get_openai_client()
+            r = client.chat.completions.create(**_summary_request(fields, full_text))
+            return r.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"⚠️ OpenAI summarization failed: {e}")
+
+    return _fallback_summary(fields)
+
+
+async def summarize_doc_async(fields, full_text):
+    """summarize_doc for asyncio callers, over the shared AsyncOpenAI client."""
     if can_use_openai():
         try:
-            client = OpenAI()
-            r = client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[{"role":"user","content":prompt}],
-                temperature=0.2,
-                max_tokens=220
-            )
+            r = await get_async_openai_client().chat.completions.create(**_summary_request(fields, full_text))
             return r.choices[0].message.content.strip()
         except Exception as e:
             print(f"⚠️ OpenAI summarization failed: {e}")
 
+    return _fallback_summary(fields)
+
+
+def _fallback_summary(fields):
     # Prepare fast fallback summary (used when LLMs fail or unavailable)
     key_fields = []
     try:
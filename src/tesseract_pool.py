@@ -0,0 +1,96 @@
+import queue
+import threading
+import numpy as np
+from lazy_import import LazyModule
+
+tesserocr = LazyModule("tesserocr")
+
+# Columns of Tesseract's TSV output (the same table pytesseract.image_to_data parses)
+_TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                "left", "top", "width", "height", "conf", "text")
+
+
+def parse_tsv(tsv):
+    """Tesseract TSV rows as the column dict pytesseract.image_to_data(output_type=DICT) returns."""
+    data = {column: [] for column in _TSV_COLUMNS}
+    for row in (tsv or "").splitlines():
+        cells = row.split("\t", len(_TSV_COLUMNS) - 1)
+        if len(cells) < len(_TSV_COLUMNS) - 1 or cells[0] == "level":
+            continue  # header or truncated row
+        cells += [""] * (len(_TSV_COLUMNS) - len(cells))
+        for column, cell in zip(_TSV_COLUMNS, cells):
+            if column == "text":
+                data[column].append(cell)
+            else:
+                data[column].append(float(cell) if column == "conf" else int(cell))
+    return data
+
+
+class TesseractUnavailable(RuntimeError):
+    """tesserocr cannot be imported or an engine cannot be created (e.g. missing tessdata)."""
+
+
+class TesseractPool:
+    """
+    Long-lived in-process Tesseract engines (tesserocr's C API binding).
+
+        pool = TesseractPool(size=4)
+        data = pool.image_to_data(gray)     # same dict as pytesseract.image_to_data
+
+    pytesseract writes each image to a temp file and starts a `tesseract`
+    process per call, reloading the language model every time. Here each
+    engine is created once (on first demand, up to `size`) and reused; pages
+    are handed over as raw 8-bit buffers. One engine serves one caller at a
+    time, so up to `size` threads recognize in parallel (tesserocr releases
+    the GIL while recognizing) and further callers wait for a free engine.
+    """
+
+    def __init__(self, size=1, lang="eng"):
+        self.size = max(int(size), 1)
+        self.lang = lang
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                # Raises before it is counted, so callers can fall back
+                try:
+                    api = tesserocr.PyTessBaseAPI(lang=self.lang)
+                except Exception as e:
+                    raise TesseractUnavailable(str(e)) from e
+                self._created += 1
+                return api
+        return self._idle.get()
+
+    def image_to_data(self, gray):
+        """
+        Word boxes, confidences and layout numbers for an HxW uint8 image.
+        Raises TesseractUnavailable when no engine can be created.
+        """
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        height, width = gray.shape
+        api = self._acquire()
+        try:
+            api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+            tsv = api.GetTSVText(0)
+        finally:
+            api.Clear()
+            self._idle.put(api)
+        return parse_tsv(tsv)
+
+    def close(self):
+        """Free the idle engines (engines in use are freed when a later close finds them idle)."""
+        with self._lock:
+            while True:
+                try:
+                    api = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                api.End()
+                self._created -= 1
@@ -7,6 +7,23 @@ import tempfile
 from unittest.mock import Mock, MagicMock
 from pathlib import Path
 
+# Read by src/config.py at import: never load (or download) a real embedding model in tests
+os.environ.setdefault("EMBEDDING_MODEL", "hashing")
+
+
+@pytest.fixture(autouse=True)
+def disable_persistent_caches(monkeypatch):
+    """Keep tests from reading or writing the user's on-disk caches."""
+    monkeypatch.setenv("DISABLE_OCR_CACHE", "true")
+    monkeypatch.setenv("DISABLE_EMBEDDING_CACHE", "true")
+    monkeypatch.setenv("DISABLE_ANSWER_CACHE", "true")
+
+
+@pytest.fixture(autouse=True)
+def disable_donut_download(monkeypatch):
+    """Never load (or download) the Donut model; tests that need it patch the model in."""
+    monkeypatch.setenv("DISABLE_DONUT", "true")
+
 
 @pytest.fixture
 def sample_form_text():
@@ -0,0 +1,119 @@
+"""
+Tests for disk_cache.py - Persistent LRU cache used for OCR results and embeddings.
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.disk_cache import DiskCache, make_key, file_digest
+
+
+class TestDiskCache:
+    """Test the SQLite-backed cache."""
+
+    def test_put_and_get_roundtrip(self, tmp_path):
+        """Stored values come back unchanged."""
+        cache = DiskCache(str(tmp_path / "cache.sqlite"))
+        cache.put("k1", b"hello")
+
+        assert cache.get("k1") == b"hello"
+        assert cache.get("missing") is None
+
+    def test_hit_miss_counters(self, tmp_path):
+        """Lookups are counted as hits or misses."""
+        cache = DiskCache(str(tmp_path / "cache.sqlite"))
+        cache.put("k1", b"value")
+        cache.get("k1")
+        cache.get("k1")
+        cache.get("k2")
+
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_lru_eviction_by_size(self, tmp_path):
+        """Least recently used entries are dropped once the size limit is exceeded."""
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), max_bytes=25)
+        cache.put("a", b"x" * 10)
+        cache.put("b", b"x" * 10)
+        cache.get("a")  # "b" is now the least recently used
+        cache.put("c", b"x" * 10)
+
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.get("b") is None
+        assert cache.stats()["bytes"] <= 25
+
+    def test_writes_track_size_without_scanning(self, tmp_path):
+        """put keeps a running size total instead of summing the table on every write."""
+        cache = DiskCache(str(tmp_path / "c.sqlite"), max_bytes=100)
+        statements = []
+        cache._conn.set_trace_callback(statements.append)
+
+        for i in range(20):
+            cache.put(f"k{i % 5}", b"x" * (i % 7 + 1))
+
+        full_scans = [s for s in statements if "SUM(size)" in s and "WHERE" not in s]
+        assert full_scans == []
+        assert cache._total == cache.stats()["bytes"]
+
+    def test_running_total_drives_eviction(self, tmp_path):
+        cache = DiskCache(str(tmp_path / "c.sqlite"), max_bytes=30)
+        for i in range(5):
+            cache.put(f"k{i}", b"x" * 10)
+        cache.put("k4", b"y" * 10)  # replacing an entry does not grow the total
+
+        assert cache.stats()["bytes"] == cache._total <= 30
+        assert cache.get("k4") == b"y" * 10
+
+    def test_persists_across_instances(self, tmp_path):
+        """A new cache on the same file sees earlier entries."""
+        path = str(tmp_path / "cache.sqlite")
+        first = DiskCache(path)
+        first.put("k", b"persisted")
+        first.close()
+
+        assert DiskCache(path).get("k") == b"persisted"
+
+    def test_age_eviction(self, tmp_path):
+        """Entries not read within max_age are treated as missing and purged."""
+        from unittest.mock import patch
+        cache = DiskCache(str(tmp_path / "cache.sqlite"), max_age=60)
+        with patch('src.disk_cache.time.time', return_value=1000.0):
+            cache.put("old", b"x")
+        with patch('src.disk_cache.time.time', return_value=1100.0):
+            assert cache.get("old") is None
+            cache.put("new", b"y")
+
+        assert cache.stats()["entries"] == 1
+
+    def test_get_many_and_put_many(self, tmp_path):
+        """Batch operations return every requested key, None for misses."""
+        cache = DiskCache(str(tmp_path / "cache.sqlite"))
+        cache.put_many({"a": b"1", "b": b"2"})
+
+        assert cache.get_many(["a", "b", "c"]) == {"a": b"1", "b": b"2", "c": None}
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 1
+
+
+class TestKeys:
+    """Test key and digest helpers."""
+
+    def test_make_key_depends_on_settings(self):
+        """Different engine settings produce different keys."""
+        assert make_key("abc", "tesseract", {"psm": 3}) == make_key("abc", "tesseract", {"psm": 3})
+        assert make_key("abc", "tesseract", {"psm": 3}) != make_key("abc", "tesseract", {"psm": 6})
+
+    def test_file_digest(self, tmp_path):
+        """Identical bytes give identical digests; unreadable files give None."""
+        a, b = tmp_path / "a.png", tmp_path / "b.png"
+        a.write_bytes(b"same bytes")
+        b.write_bytes(b"same bytes")
+
+        assert file_digest(str(a)) == file_digest(str(b))
+        assert file_digest(str(tmp_path / "missing.png")) is None
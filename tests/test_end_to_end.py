@@ -25,9 +25,9 @@ class TestEndToEndPipeline:
         src.rag_indexer.GLOBAL_INDEX = None
     
     @patch('src.extractor.can_use_openai')
-    @patch('src.extractor.OpenAI')
+    @patch('src.extractor.get_openai_client')
     @patch('src.summarizer.can_use_openai')
-    @patch('src.summarizer.OpenAI')
+    @patch('src.summarizer.get_openai_client')
     def test_extract_and_summarize_workflow(self, mock_summary_openai, mock_summary_can_use,
                                              mock_extract_openai, mock_extract_can_use):
         """Test field extraction followed by summarization."""
@@ -66,14 +66,14 @@ class TestEndToEndPipeline:
         assert isinstance(summary, str)
         assert len(summary) > 0
     
-    @patch('src.rag_indexer.OpenAIEmbeddings')
+    @patch('src.rag_indexer.get_embeddings')
     @patch('src.rag_indexer.Chroma')
-    @patch('src.qa_agent.OpenAI')
-    def test_rag_qa_workflow(self, mock_qa_openai, mock_chroma, mock_embeddings):
+    @patch('src.qa_agent.get_openai_client')
+    def test_rag_qa_workflow(self, mock_qa_openai, mock_chroma, mock_get_embeddings):
         """Test RAG indexing and QA workflow."""
         # Setup mocks
         mock_emb = MagicMock()
-        mock_embeddings.return_value = mock_emb
+        mock_get_embeddings.return_value = mock_emb
         
         mock_index = MagicMock()
         mock_index.similarity_search.return_value = [
@@ -100,12 +100,12 @@ class TestEndToEndPipeline:
         assert isinstance(answer, str)
         assert len(answer) > 0
     
-    @patch('src.reader._read_pdf_text')
+    @patch('src.reader._iter_pdf_pages')
     @patch('src.extractor.can_use_openai')
-    @patch('src.extractor.OpenAI')
-    def test_pdf_extraction_workflow(self, mock_openai, mock_can_use, mock_pdf_read):
+    @patch('src.extractor.get_openai_client')
+    def test_pdf_extraction_workflow(self, mock_openai, mock_can_use, mock_pdf_pages):
         """Test PDF loading and field extraction workflow."""
-        mock_pdf_read.return_value = "Form Type: Prior Authorization\nPatient Name: John Doe"
+        mock_pdf_pages.return_value = iter([(1, "Form Type: Prior Authorization\nPatient Name: John Doe", "pypdf", {})])
         
         mock_can_use.return_value = True
         mock_client = MagicMock()
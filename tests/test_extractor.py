@@ -3,20 +3,20 @@ Tests for extractor.py - Field extraction functionality.
 """
 import pytest
 import json
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.extractor import extract_fields
+from src.extractor import extract_fields, extract_fields_async, extract_fields_local
 
 
 class TestFieldExtraction:
     """Test field extraction functionality."""
     
     @patch('src.extractor.can_use_openai')
-    @patch('src.extractor.OpenAI')
+    @patch('src.extractor.get_openai_client')
     def test_extract_fields_with_openai(self, mock_openai_class, mock_can_use, sample_form_text):
         """Test field extraction using OpenAI."""
         mock_can_use.return_value = True
@@ -56,7 +56,7 @@ class TestFieldExtraction:
         assert isinstance(result["fields"], dict)
     
     @patch('src.extractor.can_use_openai')
-    @patch('src.extractor.OpenAI')
+    @patch('src.extractor.get_openai_client')
     def test_extract_fields_handles_json_decode_error(self, mock_openai_class, mock_can_use, sample_form_text):
         """Test that extractor handles JSON decode errors gracefully."""
         mock_can_use.return_value = True
@@ -76,7 +76,7 @@ class TestFieldExtraction:
         assert isinstance(result, dict)
     
     @patch('src.extractor.can_use_openai')
-    @patch('src.extractor.OpenAI')
+    @patch('src.extractor.get_openai_client')
     def test_extract_fields_handles_api_error(self, mock_openai_class, mock_can_use, sample_form_text):
         """Test that extractor handles API errors gracefully."""
         mock_can_use.return_value = True
@@ -103,8 +103,8 @@ class TestFieldExtraction:
             assert isinstance(result["fields"], dict)
     
     @patch('src.extractor.can_use_openai')
-    @patch('src.extractor.OpenAI')
-    def test_extract_fields_refinement_when_weak(self, mock_openai_class, mock_can_use, sample_form_text):
+    @patch('src.extractor.get_openai_client')
+    def test_extract_fields_refinement_when_weak(self, mock_openai_class, mock_can_use):
         """Test that extractor refines extraction when result is weak."""
         mock_can_use.return_value = True
         
@@ -134,7 +134,218 @@ class TestFieldExtraction:
         
         mock_client.chat.completions.create.side_effect = [weak_response, refined_response]
         
-        result = extract_fields(sample_form_text)
+        result = extract_fields("Patient Name: John Doe\nSeen by Dr. Smith for hypertension, born 02/14/1980.")
         
         # Should have refined result
-        assert len(result.get("fields", {})) >= 3
\ No newline at end of file
+        assert len(result.get("fields", {})) >= 3
+        assert mock_client.chat.completions.create.call_count == 2
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_async_openai_client')
+    def test_extract_fields_async(self, mock_get_client, mock_can_use):
+        """The async variant awaits the async client and parses the same JSON."""
+        import asyncio
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = json.dumps({
+            "form_type": "Prior Authorization",
+            "fields": {"Patient Name": "John Doe", "DOB": "02/14/1980", "Provider": "Dr. Smith"}
+        })
+        mock_get_client.return_value.chat.completions.create = AsyncMock(return_value=response)
+
+        result = asyncio.run(extract_fields_async("Patient Name: John Doe\nSeen by Dr. Smith on 02/14/2024."))
+
+        assert result["fields"]["Patient Name"] == "John Doe"
+        assert result["fields"]["Provider"] == "Dr. Smith"
+        mock_get_client.return_value.chat.completions.create.assert_awaited_once()
+
+
+class TestLocalExtraction:
+    """Test the rule-based first stage."""
+
+    FORM = (
+        "TEXAS STANDARD PRIOR AUTHORIZATION REQUEST FORM\n"
+        "Patient Name: John Doe        DOB: 02/14/1980\n"
+        "Review Type:  [x] Urgent  [ ] Non-urgent\n"
+        "Provider Name: Dr. Smith      NPI 1234567890\n"
+        "ICD-10 Code(s) I10, E11.9\n"
+        "Service requested:\n"
+        "☒ Physical Therapy ☐ Home Health\n"
+    )
+
+    def test_labels_checkboxes_and_known_patterns(self):
+        """Columns, checked boxes and colon-less NPI / ICD-10 values are all picked up."""
+        result = extract_fields_local(self.FORM)
+        fields = result["fields"]
+
+        assert result["form_type"] == "Prior Authorization"
+        assert fields["Patient Name"] == "John Doe"
+        assert fields["DOB"] == "02/14/1980"
+        assert fields["Review Type"] == "Urgent"
+        assert fields["Provider Name"] == "Dr. Smith"
+        assert fields["NPI #"] == "1234567890"
+        assert fields["ICD10"] == ["I10", "E11.9"]
+        assert fields["Service requested"] == "Physical Therapy"
+
+    def test_checkbox_column_keeps_neighbouring_fields(self):
+        """Boxes are found per column, so a label in the column before them is not swallowed."""
+        fields = extract_fields_local("Patient Name: John Doe   Sex: [x] M [ ] F\n"
+                                      "Plan: [ ] HMO   [x] PPO")["fields"]
+
+        assert fields["Patient Name"] == "John Doe"
+        assert fields["Sex"] == "M"
+        assert fields["Plan"] == "PPO"
+
+    def test_bullets_are_not_checked_boxes(self):
+        fields = extract_fields_local("● Member ID: 12345\n■ Group: 778")["fields"]
+
+        assert fields == {"Member ID": "12345", "Group": "778"}
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_complete_local_result_skips_llm(self, mock_get_client, mock_can_use, sample_form_text):
+        """When every required field is resolved locally, no LLM call is made."""
+        result = extract_fields(sample_form_text)
+
+        assert result["form_type"] == "Prior Authorization"
+        assert result["fields"]["NPI #"] == "1234567890"
+        mock_get_client.return_value.chat.completions.create.assert_not_called()
+
+    @pytest.mark.parametrize("reply", [
+        {"form_type": "Prior Authorization", "fields": None},
+        {"form_type": "Prior Authorization", "fields": ["Provider", "Dr. Smith"]},
+        ["Provider", "Dr. Smith"],
+    ])
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_malformed_llm_fields_keep_local_result(self, mock_get_client, mock_can_use, reply):
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = json.dumps(reply)
+        mock_get_client.return_value.chat.completions.create.return_value = response
+
+        result = extract_fields("Prior Authorization\nPatient Name: John Doe\nDOB: 02/14/1980")
+
+        assert result["form_type"] == "Prior Authorization"
+        assert result["fields"]["Patient Name"] == "John Doe"
+        assert result["fields"]["DOB"] == "02/14/1980"
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_llm_asked_only_for_missing_fields(self, mock_get_client, mock_can_use):
+        """The prompt lists what is already known and what is missing; local values win on merge."""
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = json.dumps({
+            "form_type": "Prior Authorization",
+            "fields": {"Patient": "J. Doe", "Provider": "Dr. Smith", "Urgency": "Urgent", "Diagnosis": "Hypertension"}
+        })
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value = response
+
+        result = extract_fields("Prior Authorization\nPatient Name: John Doe\nDOB: 02/14/1980\nNPI: 1234567890")
+
+        prompt = create.call_args.kwargs["messages"][1]["content"]
+        assert '"Patient Name": "John Doe"' in prompt
+        assert "Provider" in prompt.split("in particular:")[1]
+        assert result["fields"]["Patient Name"] == "John Doe"
+        assert "Patient" not in result["fields"]
+        assert result["fields"]["Provider"] == "Dr. Smith"
+        create.assert_called_once()
+
+    @patch('src.extractor.can_use_openai', return_value=False)
+    def test_offline_mode_returns_local_fields(self, mock_can_use, sample_form_text):
+        """Without OpenAI the rule-based result is returned instead of an empty structure."""
+        result = extract_fields(sample_form_text)
+
+        assert result["fields"]["Patient Name"] == "John Doe"
+        assert result["fields"]["Urgency"] == "Urgent"
+
+
+def _reply(fields, prompt_tokens=100, completion_tokens=20):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = json.dumps({"fields": fields})
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    return response
+
+
+class TestTargetedRefinement:
+    """Test the refinement round after a weak extraction."""
+
+    FORM = (
+        "Patient Name: John Doe\n"
+        "Seen by Dr. Smith for hypertension.\n"
+        "Born 02/14/1980, follow-up requested.\n"
+    )
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_refine_sends_only_unresolved_lines_and_missing_labels(self, mock_get_client, mock_can_use):
+        """Lines already parsed or answered are left out; the still-missing labels are listed."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.side_effect = [_reply({"Provider": "Dr. Smith"}), _reply({"DOB": "02/14/1980"})]
+
+        result = extract_fields(self.FORM)
+
+        prompt = create.call_args_list[1].kwargs["messages"][1]["content"]
+        lines = prompt.split("Unresolved lines:")[1]
+        assert "Born 02/14/1980" in lines
+        assert "Dr. Smith" not in lines
+        assert "Patient Name: John Doe" not in lines
+        assert "DOB" in prompt and "Patient Name" not in prompt.split("values for:")[1].split("\n")[0]
+        assert result["fields"]["DOB"] == "02/14/1980"
+        assert result["fields"]["Provider"] == "Dr. Smith"
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_requests_use_json_mode(self, mock_get_client, mock_can_use):
+        """Every call asks for a JSON object response."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.side_effect = [_reply({}), _reply({})]
+
+        extract_fields(self.FORM)
+
+        assert create.call_count == 2
+        for call in create.call_args_list:
+            assert call.kwargs["response_format"] == {"type": "json_object"}
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.EXTRACT_MAX_REFINE_ROUNDS', 0)
+    @patch('src.extractor.get_openai_client')
+    def test_refine_budget_zero_disables_refinement(self, mock_get_client, mock_can_use):
+        """EXTRACT_MAX_REFINE_ROUNDS=0 keeps extraction to a single call."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value = _reply({})
+
+        extract_fields(self.FORM)
+
+        create.assert_called_once()
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_no_refine_when_nothing_left_to_read(self, mock_get_client, mock_can_use):
+        """A weak result with no unresolved lines is not sent back to the model."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value = _reply({})
+
+        extract_fields("Patient Name: John Doe\nDOB: 02/14/1980")
+
+        create.assert_called_once()
+
+    @patch('src.extractor.can_use_openai', return_value=True)
+    @patch('src.extractor.get_openai_client')
+    def test_stats_report_per_stage_time_and_tokens(self, mock_get_client, mock_can_use):
+        """The optional stats dict gets calls, seconds and token usage per stage."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.side_effect = [_reply({"Provider": "Dr. Smith"}, 300, 40), _reply({"DOB": "02/14/1980"}, 80, 10)]
+        stats = {}
+
+        extract_fields(self.FORM, stats=stats)
+
+        assert set(stats) == {"local", "extract", "refine"}
+        assert stats["local"]["calls"] == 0
+        assert stats["extract"] == {**stats["extract"], "calls": 1, "prompt_tokens": 300, "completion_tokens": 40}
+        assert stats["refine"] == {**stats["refine"], "calls": 1, "prompt_tokens": 80, "completion_tokens": 10}
+        assert all(stage["seconds"] >= 0 for stage in stats.values())
@@ -0,0 +1,68 @@
+"""
+Tests for field_lookup.py - Answering field questions from extracted key/values.
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.field_lookup import lookup_field, flatten_fields, parse_key_values
+
+
+class TestLookupField:
+    """Test question → field matching."""
+
+    def test_direct_and_synonym_matches(self, sample_extracted_fields):
+        """Labels are found by name and by synonym."""
+        assert lookup_field("Who is the patient?", sample_extracted_fields)["answer"] == "John Doe"
+        assert lookup_field("Who is the provider?", sample_extracted_fields)["answer"] == "Dr. Smith"
+        assert lookup_field("What is the NPI #?", sample_extracted_fields)["answer"] == "1234567890"
+        assert lookup_field("date of birth?", sample_extracted_fields)["field"] == "DOB"
+
+    def test_possessives_and_typos(self, sample_extracted_fields):
+        """The possessed noun is what is asked for; small typos still match."""
+        assert lookup_field("What is the patient's diagnosis?", sample_extracted_fields)["field"] == "Diagnosis"
+        assert lookup_field("What is the provider's NPI?", sample_extracted_fields)["field"] == "NPI #"
+        match = lookup_field("What is the provder name?", sample_extracted_fields)
+        assert match["answer"] == "Dr. Smith"
+        assert match["score"] < 1.0
+
+    def test_declines_non_lookups(self, sample_extracted_fields):
+        """Reasoning, yes/no and unknown-field questions are left to RAG."""
+        assert lookup_field("Why was the request denied?", sample_extracted_fields) is None
+        assert lookup_field("Is the request urgent?", sample_extracted_fields) is None
+        assert lookup_field("What medications were prescribed?", sample_extracted_fields) is None
+        assert lookup_field("Who is the patient?", {}) is None
+
+    def test_declines_related_but_different_fields(self, sample_extracted_fields):
+        """A label covering only part of the question is not an answer to it."""
+        for question in ("What is the patient's address?", "Patient age?", "Who is the patient's insurer?",
+                         "What medication for the patient?", "What is the provider fax?", "Provider specialty?"):
+            assert lookup_field(question, sample_extracted_fields) is None, question
+
+    def test_min_score(self, sample_extracted_fields):
+        """A stricter threshold rejects fuzzy matches."""
+        assert lookup_field("What is the provder name?", sample_extracted_fields, min_score=0.95) is None
+
+
+class TestFieldHelpers:
+    """Test field flattening and key/value parsing."""
+
+    def test_flatten_fields_shapes(self):
+        """Extractor output, nested dicts and lists flatten to (label, value) pairs."""
+        flat = flatten_fields({
+            "form_type": "Prior Authorization",
+            "fields": {"Provider": {"Name": "Dr. Smith"}, "ICD10": ["I10", "E11.9"], "Notes": ""},
+        })
+        assert ("Provider Name", "Dr. Smith") in flat
+        assert ("ICD10", "I10, E11.9") in flat
+        assert ("form_type", "Prior Authorization") in flat
+        assert all(label != "Notes" for label, _ in flat)
+
+    def test_parse_key_values(self, sample_form_text):
+        """Label: value lines become a dict; URLs are not mistaken for fields."""
+        fields = parse_key_values(sample_form_text + "\nSee https://example.com")
+        assert fields["Patient Name"] == "John Doe"
+        assert fields["NPI #"] == "1234567890"
+        assert "See https" not in fields
@@ -0,0 +1,107 @@
+"""
+Tests for llm_client.py - Shared pooled OpenAI client.
+"""
+import pytest
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.llm_client import create_openai_client, get_openai_client, get_async_openai_client, reset_openai_client
+
+
+class _StubOpenAI(BaseHTTPRequestHandler):
+    """Minimal chat-completions endpoint that counts TCP connections."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "stub answer"}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOpenAI)
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _ask(client):
+    r = client.chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}])
+    return r.choices[0].message.content
+
+
+class TestLLMClient:
+    """Test client pooling and reuse."""
+
+    def test_requests_reuse_one_connection(self, stub_server):
+        """Sequential calls on one client share a single keep-alive connection."""
+        base_url = f"http://127.0.0.1:{stub_server.server_address[1]}/v1"
+        client = create_openai_client(api_key="sk-test", base_url=base_url)
+
+        answers = [_ask(client) for _ in range(5)]
+        client.close()
+
+        assert answers == ["stub answer"] * 5
+        assert stub_server.connections == 1
+
+    def test_per_call_clients_reconnect(self, stub_server):
+        """Building a client per call (the old pattern) opens a connection every time."""
+        base_url = f"http://127.0.0.1:{stub_server.server_address[1]}/v1"
+        for _ in range(3):
+            client = create_openai_client(api_key="sk-test", base_url=base_url)
+            _ask(client)
+            client.close()
+
+        assert stub_server.connections == 3
+
+    def test_get_openai_client_is_shared(self):
+        """The factory returns one client until reset."""
+        reset_openai_client()
+        with patch('src.llm_client.OPENAI_API_KEY', 'sk-test'):
+            first = get_openai_client()
+            assert get_openai_client() is first
+            reset_openai_client()
+            assert get_openai_client() is not first
+        reset_openai_client()
+
+    def test_async_client_per_event_loop(self):
+        """Within a loop the async client is shared; a new loop gets its own."""
+        import asyncio
+
+        async def grab():
+            return get_async_openai_client(), get_async_openai_client()
+
+        with patch('src.llm_client.OPENAI_API_KEY', 'sk-test'):
+            a1, a2 = asyncio.run(grab())
+            b1, _ = asyncio.run(grab())
+
+        assert a1 is a2
+        assert b1 is not a1
@@ -0,0 +1,48 @@
+"""
+Tests for ocr_quality.py - Scoring OCR output without ground truth.
+"""
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ocr_quality import ocr_quality
+
+
+class TestOCRQuality:
+    """Test the quality heuristics."""
+
+    def test_clean_form_text_scores_high(self, sample_form_text):
+        """Readable form text with field labels is clearly acceptable."""
+        quality = ocr_quality(sample_form_text)
+
+        assert quality["score"] > 0.8
+        assert quality["label_coverage"] == 1.0
+        assert quality["word_rate"] > 0.9
+
+    def test_garbage_scores_low(self):
+        """Symbol soup from a failed engine scores near zero."""
+        quality = ocr_quality("l|I; ,rn ~ ]]Ir 1l1 ;:| ff.. ,,,, ##@ !l|")
+
+        assert quality["score"] < 0.2
+        assert quality["dictionary_rate"] == 0.0
+
+    def test_misread_characters_lower_the_score(self, sample_form_text):
+        """Typical OCR confusions (0/O, rn/m, 1/l) reduce dictionary and label hits."""
+        misread = "Patlent Narne: Jchn Doe D0B: O2/14/198O Prov1der: Dr Srnith NP1 l234567890"
+
+        assert ocr_quality(misread)["score"] < ocr_quality(sample_form_text)["score"] - 0.3
+
+    def test_empty_and_tiny_output(self):
+        assert ocr_quality("")["score"] == 0.0
+        assert ocr_quality("   \n")["score"] == 0.0
+        assert ocr_quality("Patient")["score"] < 0.3
+
+    def test_engine_confidence_is_blended_in(self, sample_form_text):
+        """A low engine confidence pulls down otherwise plausible text."""
+        confident = ocr_quality(sample_form_text, confidence=0.95)
+        unsure = ocr_quality(sample_form_text, confidence=0.2)
+
+        assert confident["score"] > unsure["score"]
+        assert unsure["confidence"] == 0.2
@@ -0,0 +1,84 @@
+"""
+Tests for page_image.py - Decode-once page images shared by OCR engines.
+"""
+import pytest
+import io
+import hashlib
+import numpy as np
+from unittest.mock import patch
+from PIL import Image
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.page_image import PageImage, as_page
+
+
+@pytest.fixture
+def png_path(tmp_path):
+    path = tmp_path / "form.png"
+    Image.new("RGB", (30, 20), (200, 10, 10)).save(path)
+    return str(path)
+
+
+class TestPageImage:
+    """Test lazy decoding and the shared views."""
+
+    def test_views_from_one_decode(self, png_path):
+        """rgb, gray and pil all come from a single decode of the file."""
+        with patch.object(PageImage, "_decode", side_effect=PageImage._decode) as decode:
+            page = PageImage(png_path)
+            assert "not decoded" in repr(page)
+
+            assert page.rgb.shape == (20, 30, 3)
+            assert tuple(page.rgb[0, 0]) == (200, 10, 10)
+            assert page.gray.shape == (20, 30)
+            assert page.pil.size == (30, 20)
+            assert page.rgb is page.rgb
+
+        assert decode.call_count == 1
+        assert page.name == "form.png"
+
+    def test_buffers_are_read_only(self, png_path):
+        """One engine cannot modify the pixels another engine reads."""
+        page = PageImage(png_path)
+
+        with pytest.raises(ValueError):
+            page.rgb[0, 0, 0] = 0
+        with pytest.raises(ValueError):
+            page.gray[0, 0] = 0
+
+    def test_encoded_bytes_and_digest_match_the_file(self, png_path):
+        """File pages hand out the stored bytes; the digest matches file_digest."""
+        with open(png_path, "rb") as f:
+            data = f.read()
+        page = PageImage(png_path)
+
+        assert page.encoded == data
+        assert page.digest == hashlib.sha256(data).hexdigest()
+        assert PageImage(data).digest == page.digest
+
+    def test_in_memory_page(self):
+        """PIL or array pages have no digest and encode to PNG only when asked."""
+        page = PageImage(Image.new("L", (5, 4)))
+
+        assert page.digest is None
+        assert page.rgb.shape == (4, 5, 3)
+        assert Image.open(io.BytesIO(page.encoded)).size == (5, 4)
+        assert PageImage(np.zeros((4, 5), dtype=np.uint8)).rgb.shape == (4, 5, 3)
+
+    def test_release_drops_decoded_views(self, png_path):
+        """release() frees pixels; the next access decodes again from the cached bytes."""
+        page = PageImage(png_path)
+        page.gray
+        page.release()
+
+        assert "not decoded" in repr(page)
+        assert page.rgb.shape == (20, 30, 3)
+
+    def test_as_page_passes_page_images_through(self, png_path):
+        page = PageImage(png_path)
+
+        assert as_page(page) is page
+        assert as_page(png_path).path == png_path
@@ -0,0 +1,91 @@
+"""
+Tests for pipeline.py - Concurrent multi-form extraction / summary / QA.
+"""
+import pytest
+import asyncio
+import time
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.pipeline import process_forms, process_forms_async
+
+
+class _FakeLLM:
+    """Async stand-ins for the three LLM functions that sleep like a round trip and track concurrency."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def _call(self, result):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return result
+
+    async def extract(self, text):
+        if "BROKEN" in text:
+            raise RuntimeError("bad form")
+        return await self._call({"form_type": "PA", "fields": {"Patient Name": text.split(":")[1].strip()}})
+
+    async def summarize(self, fields, text):
+        return await self._call(f"- {fields['fields']['Patient Name']}")
+
+    async def answer(self, query, context_docs=None, fields=None):
+        return await self._call(f"answer to {query}")
+
+
+@pytest.fixture
+def fake_llm():
+    fake = _FakeLLM()
+    with patch('src.pipeline.extract_fields_async', fake.extract), \
+            patch('src.pipeline.summarize_doc_async', fake.summarize), \
+            patch('src.pipeline.answer_with_rag_async', fake.answer):
+        yield fake
+
+
+class TestPipeline:
+    """Test the async batch coordinator."""
+
+    def test_results_in_input_order(self, fake_llm):
+        """Every form gets fields, a summary and answers, in input order."""
+        docs = [(f"doc{i}", f"Patient Name: P{i}") for i in range(5)]
+        results = process_forms(docs, questions=["Diagnosis?"])
+
+        assert [r["doc_id"] for r in results] == [f"doc{i}" for i in range(5)]
+        assert results[3]["fields"]["fields"]["Patient Name"] == "P3"
+        assert results[3]["summary"] == "- P3"
+        assert results[3]["answers"] == {"Diagnosis?": "answer to Diagnosis?"}
+        assert fake_llm.calls == 15
+
+    def test_batch_runs_concurrently(self, fake_llm):
+        """50 forms take about as long as a few calls, not the sum of all of them."""
+        docs = [{"doc_id": f"doc{i}", "text": f"Patient Name: P{i}"} for i in range(50)]
+        start = time.perf_counter()
+        process_forms(docs, questions=["Who?"], max_concurrency=50)
+        elapsed = time.perf_counter() - start
+
+        sequential = fake_llm.calls * fake_llm.delay  # 150 calls ≈ 7.5 s one after another
+        assert elapsed < sequential / 10
+
+    def test_semaphore_caps_in_flight_calls(self, fake_llm):
+        """No more than max_concurrency LLM calls run at once."""
+        docs = [(f"doc{i}", f"Patient Name: P{i}") for i in range(20)]
+        asyncio.run(process_forms_async(docs, questions=["Who?", "When?"], max_concurrency=4))
+
+        assert fake_llm.max_in_flight == 4
+
+    def test_failed_form_does_not_stop_batch(self, fake_llm):
+        """A form that raises reports its error; the others complete."""
+        results = process_forms([("ok", "Patient Name: A"), ("bad", "BROKEN"), ("ok2", "Patient Name: B")])
+
+        assert results[1]["error"] == "bad form"
+        assert results[0]["summary"] == "- A"
+        assert results[2]["summary"] == "- B"
@@ -0,0 +1,114 @@
+"""
+Tests for preprocess.py - Shared page preprocessing before OCR.
+"""
+import pytest
+import cv2
+import numpy as np
+from PIL import Image
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# The PageImage class preprocess.py itself uses (src.page_image is a separate module object)
+from src.preprocess import preprocess_page, estimate_skew, estimate_dpi, PageImage
+
+
+def form_page(width=1700, height=2200):
+    """A white letter page (200 dpi at 1700 px wide) with rules and text lines."""
+    page = np.full((height, width), 255, dtype=np.uint8)
+    for y in range(200, height - 200, 60):
+        cv2.putText(page, "Patient Name: John Doe   Member ID: 12345", (150, y), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+        cv2.line(page, (150, y + 12), (width - 150, y + 12), 0, 2)
+    return page
+
+
+def rotate(gray, degrees):
+    h, w = gray.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), degrees, 1.0)
+    return cv2.warpAffine(gray, matrix, (w, h), borderValue=255)
+
+
+class TestSteps:
+    """Test the individual preprocessing steps."""
+
+    def test_downscale_to_target_dpi(self):
+        page = cv2.resize(form_page(), None, fx=1.5, fy=1.5)  # 300 dpi
+
+        out = preprocess_page(page, steps=["downscale"], target_dpi=200)
+
+        assert estimate_dpi(out.shape) == pytest.approx(200, rel=0.01)
+
+    def test_never_upscales(self):
+        page = PageImage(form_page())
+
+        assert preprocess_page(page, steps=["downscale"], target_dpi=300) is page
+
+    @pytest.mark.parametrize("degrees", [-3.0, -0.8, 1.5, 4.0])
+    def test_estimate_skew(self, degrees):
+        assert estimate_skew(rotate(form_page(), degrees)) == pytest.approx(degrees, abs=0.25)
+
+    def test_deskew_straightens_page(self):
+        out = preprocess_page(rotate(form_page(), 2.5), steps=["deskew"])
+
+        assert abs(estimate_skew(out.gray)) < 0.25
+
+    def test_large_angles_are_left_alone(self):
+        assert estimate_skew(rotate(form_page(), 30)) == 0.0
+
+    def test_crop_removes_scanner_edge_and_margins(self):
+        page = form_page()
+        page[:, :40] = 0  # dark scanner lid along the left edge
+
+        out = preprocess_page(page, steps=["crop"])
+
+        assert out.gray[:, :5].mean() > 200
+        assert out.shape[1] < page.shape[1] - 150
+        assert out.shape[0] < page.shape[0]
+
+    def test_threshold_evens_out_shading(self):
+        shade = np.linspace(0, 150, 1700)[None, :]
+        page = np.clip(form_page().astype(float) - shade, 0, 255).astype(np.uint8)
+
+        out = preprocess_page(page, steps=["threshold"]).gray
+
+        assert set(np.unique(out)) <= {0, 255}
+        # The shaded right side is background (white) again, not ink
+        assert (out[:150, -150:] == 255).mean() > 0.95
+
+
+class TestSharing:
+    """Test memoization and cache identity of processed pages."""
+
+    def test_processed_page_is_shared(self):
+        page = PageImage(rotate(form_page(), 2.0))
+
+        first = preprocess_page(page, steps=["deskew", "crop"])
+        assert preprocess_page(page, steps=["deskew", "crop"]) is first
+        assert preprocess_page(first, steps=["deskew", "crop"]) is first
+
+    def test_digest_follows_source_and_settings(self, tmp_path):
+        path = tmp_path / "scan.png"
+        Image.fromarray(cv2.resize(form_page(), None, fx=1.5, fy=1.5)).save(path)
+        page = PageImage(str(path))
+
+        at_200 = preprocess_page(page, steps=["downscale"], target_dpi=200)
+        at_150 = preprocess_page(page, steps=["downscale"], target_dpi=150)
+
+        assert None not in (at_200.digest, at_150.digest)
+        assert len({page.digest, at_200.digest, at_150.digest}) == 3
+
+    def test_in_memory_source_has_no_digest(self):
+        out = preprocess_page(cv2.resize(form_page(), None, fx=1.5, fy=1.5), steps=["downscale"])
+
+        assert out.digest is None
+
+    def test_no_steps(self):
+        page = PageImage(form_page())
+
+        assert preprocess_page(page, steps=[]) is page
+
+    def test_undecodable_page_is_returned_as_is(self):
+        page = PageImage(b"%PDF-1.4 not an image")
+
+        assert preprocess_page(page, steps=["downscale", "crop"]) is page
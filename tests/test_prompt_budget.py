@@ -0,0 +1,73 @@
+"""
+Tests for prompt_budget.py - Token counting and prompt section budgets.
+"""
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.prompt_budget import count_tokens, truncate_tokens, fit_sections, field_lines
+
+
+@pytest.fixture(autouse=True)
+def no_tiktoken():
+    """Use the ~4 characters per token fallback so counts are deterministic offline."""
+    with patch('src.prompt_budget.get_encoding', return_value=None):
+        yield
+
+
+class TestTokenCounting:
+    """Test counting and truncation."""
+
+    def test_count_tokens(self):
+        """Empty text is free; the fallback rounds characters / 4 up."""
+        assert count_tokens("") == 0
+        assert count_tokens("abcd") == 1
+        assert count_tokens("abcde") == 2
+
+    def test_truncate_tokens_cuts_at_word_boundary(self):
+        """Truncated text fits the budget and does not end mid-word."""
+        text = "Patient Name John Doe and more words follow here"
+        clipped = truncate_tokens(text, 5)
+
+        assert count_tokens(clipped) <= 5
+        assert text.startswith(clipped)
+        assert text[len(clipped)] == " "
+        assert truncate_tokens(text, 100) == text
+        assert truncate_tokens(text, 0) == ""
+
+
+class TestFitSections:
+    """Test budget allocation across prompt sections."""
+
+    def test_lists_keep_whole_items_in_priority_order(self):
+        """Lower-ranked items are dropped first; kept items are never cut."""
+        chunks = ["a" * 40, "b" * 40, "c" * 40]  # 10 tokens each
+
+        fitted = fit_sections([("chunks", chunks, 1.0)], 25)
+
+        assert fitted["chunks"] == chunks[:2]
+
+    def test_lone_oversized_item_is_truncated(self):
+        """A first item larger than the budget is shortened rather than dropped."""
+        fitted = fit_sections([("chunks", ["word " * 100], 1.0)], 10)
+
+        assert len(fitted["chunks"]) == 1
+        assert count_tokens(fitted["chunks"][0]) <= 10
+
+    def test_unused_budget_carries_to_later_sections(self):
+        """A section that needs less than its share leaves the rest to the next one."""
+        fitted = fit_sections([("fields", ["DOB: 1/1/80"], 0.5), ("text", "x " * 200, 0.5)], 100)
+
+        assert fitted["fields"] == ["DOB: 1/1/80"]
+        assert count_tokens(fitted["text"]) > 50
+        assert count_tokens("\n".join(fitted["fields"])) + count_tokens(fitted["text"]) <= 100
+
+    def test_field_lines(self, sample_extracted_fields):
+        """Extractor output becomes one "label: value" line per field."""
+        lines = field_lines(sample_extracted_fields)
+
+        assert "Patient Name: John Doe" in lines
+        assert "form_type: Prior Authorization" in lines
@@ -2,19 +2,20 @@
 Tests for qa_agent.py - Question answering functionality.
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.qa_agent import answer_with_rag
+from src.qa_agent import answer_with_rag, answer_with_rag_async, AnswerCache
+from src.prompt_budget import count_tokens
 
 
 class TestQAAgent:
     """Test QA agent functionality."""
     
-    @patch('src.qa_agent.OpenAI')
+    @patch('src.qa_agent.get_openai_client')
     def test_answer_with_rag_with_context(self, mock_openai_class):
         """Test QA agent with provided context."""
         mock_client = MagicMock()
@@ -33,7 +34,7 @@ class TestQAAgent:
         mock_client.chat.completions.create.assert_called_once()
     
     @patch('src.qa_agent.retrieve_context')
-    @patch('src.qa_agent.OpenAI')
+    @patch('src.qa_agent.get_openai_client')
     def test_answer_with_rag_auto_retrieve(self, mock_openai_class, mock_retrieve):
         """Test QA agent with automatic context retrieval."""
         mock_retrieve.return_value = ["Patient Name: Jane Doe"]
@@ -52,7 +53,7 @@ class TestQAAgent:
         mock_retrieve.assert_called_once_with("Who is the patient?")
         mock_client.chat.completions.create.assert_called_once()
     
-    @patch('src.qa_agent.OpenAI')
+    @patch('src.qa_agent.get_openai_client')
     def test_answer_with_rag_with_list_context(self, mock_openai_class):
         """Test QA agent with list of context documents."""
         mock_client = MagicMock()
@@ -71,7 +72,7 @@ class TestQAAgent:
         call_args = mock_client.chat.completions.create.call_args
         assert "Doc 1" in str(call_args) or "Doc 2" in str(call_args)
     
-    @patch('src.qa_agent.OpenAI')
+    @patch('src.qa_agent.get_openai_client')
     def test_answer_with_rag_with_string_context(self, mock_openai_class):
         """Test QA agent with string context."""
         mock_client = MagicMock()
@@ -87,7 +88,7 @@ class TestQAAgent:
         
         assert isinstance(result, str)
     
-    @patch('src.qa_agent.OpenAI')
+    @patch('src.qa_agent.get_openai_client')
     def test_answer_with_rag_handles_api_error(self, mock_openai_class):
         """Test that QA agent handles API errors gracefully."""
         mock_client = MagicMock()
@@ -97,4 +98,157 @@ class TestQAAgent:
         context_docs = ["Test context"]
         
         with pytest.raises(Exception):
-            answer_with_rag("Test question?", context_docs)
\ No newline at end of file
+            answer_with_rag("Test question?", context_docs)
+
+    @patch('src.qa_agent.retrieve_context')
+    @patch('src.qa_agent.get_openai_client')
+    def test_answer_with_rag_field_fast_path(self, mock_get_client, mock_retrieve, sample_extracted_fields):
+        """Field lookups are answered from extracted fields without retrieval or an LLM call."""
+        mock_client = mock_get_client.return_value
+        answer, provenance = answer_with_rag(
+            "Who is the patient?", fields=sample_extracted_fields, with_provenance=True
+        )
+
+        assert answer == "John Doe"
+        assert provenance == {"source": "fields", "field": "Patient Name", "score": 1.0}
+        mock_retrieve.assert_not_called()
+        mock_client.chat.completions.create.assert_not_called()
+
+    @patch('src.qa_agent.get_openai_client')
+    def test_answer_with_rag_falls_back_to_rag(self, mock_get_client, sample_extracted_fields):
+        """Questions the fields cannot answer still go through the LLM."""
+        mock_client = mock_get_client.return_value
+        mock_client.chat.completions.create.return_value.choices = [MagicMock()]
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "Lisinopril"
+
+        answer, provenance = answer_with_rag(
+            "What medications were prescribed?", ["Rx: Lisinopril"],
+            fields=sample_extracted_fields, with_provenance=True,
+        )
+
+        assert answer == "Lisinopril"
+        assert provenance == {"source": "rag", "context": ["Rx: Lisinopril"], "cached": False}
+        mock_client.chat.completions.create.assert_called_once()
+
+    @patch('src.qa_agent.get_openai_client')
+    def test_context_fitted_to_token_budget(self, mock_get_client, sample_extracted_fields):
+        """Fields lead the context; the lowest-ranked chunks are dropped to stay within QA_PROMPT_TOKENS."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value.choices = [MagicMock()]
+        create.return_value.choices[0].message.content = "Lisinopril"
+        chunks = [f"Chunk {i}: " + "medication history " * 40 for i in range(10)]
+
+        with patch('src.qa_agent.QA_PROMPT_TOKENS', 800):
+            answer, provenance = answer_with_rag(
+                "What medications were prescribed?", chunks,
+                fields=sample_extracted_fields, with_provenance=True,
+            )
+
+        prompt = create.call_args.kwargs["messages"][1]["content"]
+        assert count_tokens(prompt) <= 800
+        assert "Patient Name: John Doe" in prompt
+        assert "Chunk 0:" in prompt and "Chunk 9:" not in prompt
+        assert provenance["context"] == chunks[:len(provenance["context"])]
+        assert 0 < len(provenance["context"]) < len(chunks)
+
+    @patch('src.qa_agent.get_async_openai_client')
+    def test_answer_with_rag_async(self, mock_get_client, sample_extracted_fields):
+        """The async variant keeps the field fast path and awaits the async client otherwise."""
+        import asyncio
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Lisinopril"
+        create = mock_get_client.return_value.chat.completions.create = AsyncMock(return_value=response)
+
+        assert asyncio.run(answer_with_rag_async("Who is the patient?", fields=sample_extracted_fields)) == "John Doe"
+        create.assert_not_awaited()
+        assert asyncio.run(answer_with_rag_async("What medications?", ["Rx: Lisinopril"])) == "Lisinopril"
+        create.assert_awaited_once()
+
+class TestAnswerCache:
+    """Test the QA answer cache."""
+
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, monkeypatch):
+        import src.qa_agent
+        monkeypatch.delenv("DISABLE_ANSWER_CACHE")
+        src.qa_agent.answer_cache.clear()
+        yield
+        src.qa_agent.answer_cache.clear()
+
+    @patch('src.qa_agent.get_openai_client')
+    def test_repeat_question_skips_llm(self, mock_get_client):
+        """The same question on the same context is answered once; hits report savings."""
+        mock_client = mock_get_client.return_value
+        from src.qa_agent import answer_cache_stats
+        response = mock_client.chat.completions.create.return_value
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "John Doe"
+        response.usage = MagicMock(prompt_tokens=900, completion_tokens=100)
+
+        first = answer_with_rag("Who is the patient?", ["Patient Name: John Doe"])
+        second, provenance = answer_with_rag("who is the patient", ["Patient Name: John Doe"], with_provenance=True)
+
+        assert first == second == "John Doe"
+        assert provenance["cached"] is True
+        mock_client.chat.completions.create.assert_called_once()
+        stats = answer_cache_stats()
+        assert stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["tokens_saved"] == 1000
+        assert stats["cost_saved_usd"] == pytest.approx((900 * 0.15 + 100 * 0.60) / 1e6)
+
+    @patch('src.qa_agent.get_openai_client')
+    def test_different_context_misses(self, mock_get_client):
+        """A changed context is a new cache key."""
+        mock_client = mock_get_client.return_value
+        mock_client.chat.completions.create.return_value.choices = [MagicMock()]
+        mock_client.chat.completions.create.return_value.choices[0].message.content = "A"
+
+        answer_with_rag("Who is the patient?", ["Patient Name: John Doe"])
+        answer_with_rag("Who is the patient?", ["Patient Name: Jane Roe"])
+
+        assert mock_client.chat.completions.create.call_count == 2
+
+    def test_ttl_and_lru_eviction(self):
+        """Entries expire after the TTL and the least recently used is evicted first."""
+        cache = AnswerCache(max_entries=2, ttl=60)
+        with patch('src.qa_agent.time.time', return_value=1000.0):
+            cache.put("q1", "ctx", "m", "a1")
+            cache.put("q2", "ctx", "m", "a2")
+            cache.get("q1", "ctx", "m")
+            cache.put("q3", "ctx", "m", "a3")
+            assert cache.get("q2", "ctx", "m") is None
+            assert cache.get("q1", "ctx", "m")["answer"] == "a1"
+        with patch('src.qa_agent.time.time', return_value=1100.0):
+            assert cache.get("q1", "ctx", "m") is None
+
+    @patch('src.qa_agent.get_embeddings')
+    def test_semantic_match(self, mock_get_embeddings):
+        """With a semantic threshold, a reworded question on the same context hits."""
+        from src.rag_indexer import HashingEmbeddings
+        mock_get_embeddings.return_value = HashingEmbeddings()
+        cache = AnswerCache(semantic_threshold=0.5)
+        cache.put("What is the patient name?", "ctx", "m", "John Doe")
+
+        assert cache.get("what is patient name", "ctx", "m")["answer"] == "John Doe"
+        assert cache.get("what is patient name", "other-ctx", "m") is None
+        assert cache.stats()["semantic_hits"] == 1
+
+    @patch('src.qa_agent.get_embeddings')
+    def test_lookup_embeds_outside_the_lock(self, mock_get_embeddings):
+        """A slow embedding call does not block other lookups and puts."""
+        from src.rag_indexer import HashingEmbeddings
+        cache = AnswerCache(semantic_threshold=0.5)
+        hashing = HashingEmbeddings()
+        locked = []
+
+        def embed_query(text):
+            locked.append(cache._lock.locked())
+            return hashing.embed_query(text)
+
+        mock_get_embeddings.return_value.embed_query.side_effect = embed_query
+        cache.put("What is the patient name?", "ctx", "m", "John Doe")
+        assert cache.get("what is patient name", "ctx", "m")["answer"] == "John Doe"
+        assert cache.get("What is the patient name?", "ctx", "m")["answer"] == "John Doe"
+
+        assert locked == [False, False]  # put + the semantic lookup; the exact hit embeds nothing
@@ -8,7 +8,11 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.rag_indexer import build_index, retrieve_context, GLOBAL_INDEX
+from src.rag_indexer import (
+    build_index, retrieve_context, chunk_document, get_embeddings, HashingEmbeddings, CachedEmbeddings,
+    NumpyVectorStore, BM25Index, lexical_index, GLOBAL_INDEX
+)
+from src.disk_cache import DiskCache
 
 
 class TestRAGIndexer:
@@ -20,12 +24,12 @@ class TestRAGIndexer:
         import src.rag_indexer
         src.rag_indexer.GLOBAL_INDEX = None
     
-    @patch('src.rag_indexer.OpenAIEmbeddings')
+    @patch('src.rag_indexer.get_embeddings')
     @patch('src.rag_indexer.Chroma')
-    def test_build_index_with_tuples(self, mock_chroma_class, mock_embeddings_class):
+    def test_build_index_with_tuples(self, mock_chroma_class, mock_get_embeddings):
         """Test building index with tuple format."""
         mock_embeddings = MagicMock()
-        mock_embeddings_class.return_value = mock_embeddings
+        mock_get_embeddings.return_value = mock_embeddings
         
         mock_chroma = MagicMock()
         mock_chroma_class.from_texts.return_value = mock_chroma
@@ -36,12 +40,12 @@ class TestRAGIndexer:
         assert result == mock_chroma
         mock_chroma_class.from_texts.assert_called_once()
     
-    @patch('src.rag_indexer.OpenAIEmbeddings')
+    @patch('src.rag_indexer.get_embeddings')
     @patch('src.rag_indexer.Chroma')
-    def test_build_index_with_dicts(self, mock_chroma_class, mock_embeddings_class):
+    def test_build_index_with_dicts(self, mock_chroma_class, mock_get_embeddings):
         """Test building index with dict format."""
         mock_embeddings = MagicMock()
-        mock_embeddings_class.return_value = mock_embeddings
+        mock_get_embeddings.return_value = mock_embeddings
         
         mock_chroma = MagicMock()
         mock_chroma_class.from_texts.return_value = mock_chroma
@@ -55,12 +59,12 @@ class TestRAGIndexer:
         assert result == mock_chroma
         mock_chroma_class.from_texts.assert_called_once()
     
-    @patch('src.rag_indexer.OpenAIEmbeddings')
+    @patch('src.rag_indexer.get_embeddings')
     @patch('src.rag_indexer.Chroma')
-    def test_build_index_adds_to_existing(self, mock_chroma_class, mock_embeddings_class):
+    def test_build_index_adds_to_existing(self, mock_chroma_class, mock_get_embeddings):
         """Test that building index adds to existing global index."""
         mock_embeddings = MagicMock()
-        mock_embeddings_class.return_value = mock_embeddings
+        mock_get_embeddings.return_value = mock_embeddings
         mock_embeddings.embed_query.return_value = [0.1] * 384  # Mock embedding vector
         
         mock_chroma = MagicMock()
@@ -79,6 +83,31 @@ class TestRAGIndexer:
         # Should call add on collection
         assert mock_chroma._collection.add.called
     
+    @patch('src.rag_indexer.get_embeddings')
+    @patch('src.rag_indexer.Chroma')
+    def test_build_index_skips_already_indexed_content(self, mock_chroma_class, mock_get_embeddings):
+        """Documents whose content hash is already stored are not embedded again."""
+        from src.rag_indexer import _content_hash
+        mock_embeddings = MagicMock()
+        mock_get_embeddings.return_value = mock_embeddings
+        mock_embeddings.embed_documents.side_effect = lambda texts: [[0.1] * 4 for _ in texts]
+
+        mock_chroma = MagicMock()
+        mock_chroma_class.from_texts.return_value = mock_chroma
+        mock_chroma._collection.get.return_value = {"ids": [_content_hash("Text 1") + ":0"]}
+
+        build_index([("doc1", "Text 1")])
+        build_index([("doc1-again", "Text 1"), ("doc2", "Text 2"), ("doc3", "Text 3"), ("dup", "Text 3")])
+
+        # New documents embedded once, in one batch; the known one skipped
+        mock_embeddings.embed_documents.assert_called_once_with(["Text 2", "Text 3"])
+        mock_embeddings.embed_query.assert_not_called()
+        added = mock_chroma._collection.add.call_args.kwargs
+        assert added["ids"] == [_content_hash("Text 2") + ":0", _content_hash("Text 3") + ":0"]
+        assert [m["doc_id"] for m in added["metadatas"]] == ["doc2", "doc3"]
+        # No throwaway stores after the first build
+        mock_chroma_class.from_texts.assert_called_once()
+
     def test_retrieve_context_without_index(self):
         """Test that retrieve_context raises error when no index exists."""
         import src.rag_indexer
@@ -119,4 +148,269 @@ class TestRAGIndexer:
         result = retrieve_context("test query", k=1)
         
         assert len(result) == 1
-        mock_index.similarity_search.assert_called_once_with("test query", k=1)
\ No newline at end of file
+        mock_index.similarity_search.assert_called_once_with("test query", k=1)
+
+class TestChunking:
+    """Test document chunking before indexing."""
+
+    def test_token_chunks_overlap_and_offsets(self):
+        """Token windows overlap and their offsets point back into the source text."""
+        text = " ".join(f"word{i}" for i in range(50))
+        with patch('src.rag_indexer._get_encoding', return_value=None):
+            chunks = chunk_document("doc1", text, mode="tokens", size=20, overlap=5)
+
+        assert len(chunks) == 3
+        for c in chunks:
+            assert c["doc_id"] == "doc1"
+            assert text[c["start"]:c["end"]] == c["text"]
+        assert chunks[0]["text"].split()[-5:] == chunks[1]["text"].split()[:5]
+
+    def test_section_chunks_keep_field_blocks_together(self, sample_form_text):
+        """Sections and Label: value blocks are not split mid-block."""
+        text = "PATIENT INFORMATION\n" + sample_form_text.strip() + "\n\nNOTES\nFollow up in two weeks."
+        with patch('src.rag_indexer._get_encoding', return_value=None):
+            chunks = chunk_document("doc1", text, mode="sections", size=25)
+
+        assert len(chunks) == 2
+        assert chunks[0]["text"].startswith("PATIENT INFORMATION")
+        assert "NPI #: 1234567890" in chunks[0]["text"]
+        assert chunks[1]["text"] == "NOTES\nFollow up in two weeks."
+
+    @patch('src.rag_indexer.get_embeddings')
+    @patch('src.rag_indexer.Chroma')
+    def test_build_index_stores_chunk_metadata(self, mock_chroma_class, mock_get_embeddings):
+        """Each chunk is stored with its parent doc_id and offsets."""
+        import src.rag_indexer
+        src.rag_indexer.GLOBAL_INDEX = None
+        text = " ".join(f"word{i}" for i in range(50))
+
+        with patch('src.rag_indexer._get_encoding', return_value=None), \
+                patch('src.rag_indexer.CHUNK_MODE', "tokens"), \
+                patch('src.rag_indexer.CHUNK_SIZE', 20), \
+                patch('src.rag_indexer.CHUNK_OVERLAP', 5):
+            build_index([("doc1", text)])
+
+        texts, _ = mock_chroma_class.from_texts.call_args.args
+        metadatas = mock_chroma_class.from_texts.call_args.kwargs["metadatas"]
+        assert len(texts) == 3
+        assert [m["chunk_index"] for m in metadatas] == [0, 1, 2]
+        assert all(m["doc_id"] == "doc1" for m in metadatas)
+        assert all(text[m["start"]:m["end"]] == t for m, t in zip(metadatas, texts))
+
+
+class TestEmbeddingBackends:
+    """Test embedding backend selection."""
+
+    def setup_method(self):
+        import src.rag_indexer
+        src.rag_indexer._embedders.clear()
+
+    def test_hashing_embeddings_deterministic_and_normalized(self):
+        """Same text gives the same unit vector; related texts are closer."""
+        import numpy as np
+        emb = HashingEmbeddings(dim=256)
+        a = np.array(emb.embed_query("Patient Name: John Doe"))
+        b = np.array(emb.embed_documents(["Patient Name: John Doe"])[0])
+        c = np.array(emb.embed_query("Patient Name: Jane Doe"))
+        d = np.array(emb.embed_query("ICD10 code E11.9 diabetes"))
+
+        assert np.allclose(a, b)
+        assert np.linalg.norm(a) == pytest.approx(1.0, abs=1e-5)
+        assert a @ c > a @ d
+
+    def test_get_embeddings_routes_by_model_name(self):
+        """EMBEDDING_MODEL picks OpenAI, hashing or a local model."""
+        with patch('src.rag_indexer.OpenAIEmbeddings') as mock_openai, \
+                patch('src.rag_indexer.LocalEmbeddings') as mock_local:
+            assert isinstance(get_embeddings("hashing"), HashingEmbeddings)
+            assert get_embeddings("text-embedding-3-small") is mock_openai.return_value
+            assert get_embeddings("sentence-transformers/all-MiniLM-L6-v2") is mock_local.return_value
+            # Backends are reused, not rebuilt per call
+            get_embeddings("sentence-transformers/all-MiniLM-L6-v2")
+            mock_local.assert_called_once_with("sentence-transformers/all-MiniLM-L6-v2")
+
+    def test_get_embeddings_falls_back_to_hashing(self):
+        """A local model that cannot load falls back to the hashing embedder."""
+        with patch('src.rag_indexer.LocalEmbeddings', side_effect=ImportError("no sentence_transformers")):
+            assert isinstance(get_embeddings("some/local-model"), HashingEmbeddings)
+
+
+class TestEmbeddingCache:
+    """Test the persistent embedding cache wrapper."""
+
+    def test_only_unseen_texts_reach_the_backend(self, tmp_path):
+        """Cached and duplicate texts are not re-embedded."""
+        backend = MagicMock(wraps=HashingEmbeddings(dim=16))
+        cached = CachedEmbeddings(backend, "test-model", DiskCache(str(tmp_path / "emb.sqlite")))
+
+        first = cached.embed_documents(["alpha", "beta", "alpha"])
+        second = cached.embed_documents(["beta", "gamma"])
+
+        assert [c.args[0] for c in backend.embed_documents.call_args_list] == [["alpha", "beta"], ["gamma"]]
+        assert first[0] == first[2]
+        assert second[0] == pytest.approx(first[1])
+
+    def test_survives_restart(self, tmp_path):
+        """A new wrapper on the same cache file makes zero backend calls."""
+        path = str(tmp_path / "emb.sqlite")
+        CachedEmbeddings(HashingEmbeddings(dim=16), "test-model", DiskCache(path)).embed_documents(["alpha"])
+
+        backend = MagicMock()
+        vectors = CachedEmbeddings(backend, "test-model", DiskCache(path)).embed_documents(["alpha"])
+
+        backend.embed_documents.assert_not_called()
+        assert vectors[0] == pytest.approx(HashingEmbeddings(dim=16).embed_query("alpha"))
+
+    def test_keyed_by_model_name(self, tmp_path):
+        """Switching models does not return another model's vectors."""
+        cache = DiskCache(str(tmp_path / "emb.sqlite"))
+        CachedEmbeddings(HashingEmbeddings(dim=16), "model-a", cache).embed_documents(["alpha"])
+
+        backend = MagicMock(wraps=HashingEmbeddings(dim=16))
+        CachedEmbeddings(backend, "model-b", cache).embed_documents(["alpha"])
+
+        backend.embed_documents.assert_called_once_with(["alpha"])
+
+    def test_get_embeddings_wraps_model_backends(self, tmp_path, monkeypatch):
+        """Model-backed embedders are cached; the hashing embedder is not."""
+        import src.rag_indexer
+        monkeypatch.delenv("DISABLE_EMBEDDING_CACHE")
+        monkeypatch.setattr(src.rag_indexer, "_embedding_cache", DiskCache(str(tmp_path / "emb.sqlite")))
+        src.rag_indexer._embedders.clear()
+
+        with patch('src.rag_indexer.LocalEmbeddings'):
+            assert isinstance(get_embeddings("some/local-model"), CachedEmbeddings)
+        assert isinstance(get_embeddings("hashing"), HashingEmbeddings)
+        src.rag_indexer._embedders.clear()
+
+
+class TestNumpyVectorStore:
+    """Test the in-process NumPy vector store."""
+
+    TEXTS = [
+        "Patient Name: John Doe",
+        "NPI #: 1234567890",
+        "Diagnosis: Hypertension ICD10 I10",
+        "Provider: Dr. Smith",
+    ]
+
+    def test_similarity_search_ranks_best_match_first(self):
+        """Top-k results come back best first as Documents with metadata."""
+        store = NumpyVectorStore.from_texts(
+            self.TEXTS, HashingEmbeddings(), metadatas=[{"n": i} for i in range(4)]
+        )
+        results = store.similarity_search("Diagnosis Hypertension", k=2)
+
+        assert len(results) == 2
+        assert results[0].page_content == "Diagnosis: Hypertension ICD10 I10"
+        assert results[0].metadata == {"n": 2}
+        assert len(store.similarity_search("anything", k=10)) == 4
+
+    def test_rows_are_normalized_and_contiguous(self):
+        """Vectors are stored as one float32 matrix of unit rows."""
+        import numpy as np
+        store = NumpyVectorStore(HashingEmbeddings())
+        store.add(ids=["a", "b"], documents=["x", "y"], embeddings=[[3.0, 4.0], [0.0, 2.0]])
+        store.add(ids=["b"], documents=["y2"], embeddings=[[1.0, 0.0]])
+
+        assert store.vectors.dtype == np.float32
+        assert store.vectors.shape == (2, 2)
+        assert np.allclose(store.vectors, [[0.6, 0.8], [1.0, 0.0]])
+        assert store.get(ids=["a", "zzz"])["ids"] == ["a"]
+
+    def test_save_and_mmap_load(self, tmp_path):
+        """A saved store reloads memory-mapped and can still grow."""
+        emb = HashingEmbeddings()
+        store = NumpyVectorStore.from_texts(self.TEXTS, emb, ids=[f"id{i}" for i in range(4)])
+        store.save(str(tmp_path / "index"))
+
+        loaded = NumpyVectorStore.load(str(tmp_path / "index"), emb)
+        assert loaded.similarity_search("NPI", k=1)[0].page_content == "NPI #: 1234567890"
+
+        loaded.add(ids=["id4"], documents=["Urgency: Urgent"], embeddings=emb.embed_documents(["Urgency: Urgent"]))
+        assert len(loaded) == 5
+        assert loaded.similarity_search("Urgency Urgent", k=1)[0].page_content == "Urgency: Urgent"
+
+    @patch('src.rag_indexer.VECTOR_STORE', 'numpy')
+    @patch('src.rag_indexer.get_embeddings', return_value=HashingEmbeddings())
+    def test_build_index_uses_numpy_store(self, mock_get_embeddings):
+        """VECTOR_STORE=numpy builds and incrementally extends a NumpyVectorStore."""
+        import src.rag_indexer
+        src.rag_indexer.GLOBAL_INDEX = None
+
+        index = build_index([("doc1", "Patient Name: John Doe")])
+        build_index([("doc1", "Patient Name: John Doe"), ("doc2", "NPI #: 1234567890")])
+
+        assert isinstance(index, NumpyVectorStore)
+        assert len(index) == 2
+        assert retrieve_context("NPI", k=1) == ["NPI #: 1234567890"]
+        src.rag_indexer.GLOBAL_INDEX = None
+
+
+class TestHybridRetrieval:
+    """Test BM25 + vector retrieval."""
+
+    FORMS = [
+        ("form1", "Patient Name: John Doe\nDOB: 02/14/1980\n\nPROVIDER\nProvider: Dr. Smith\nNPI #: 1234567890"),
+        ("form2", "Patient Name: Jane Roe\nDiagnosis: Type 2 diabetes\nICD10: E11.9"),
+        ("form3", "Patient Name: Sam Patel\nService Type: Physical Therapy\nUrgency: Urgent"),
+    ]
+
+    def setup_method(self):
+        import src.rag_indexer
+        src.rag_indexer.GLOBAL_INDEX = None
+
+    def teardown_method(self):
+        import src.rag_indexer
+        src.rag_indexer.GLOBAL_INDEX = None
+
+    def test_bm25_keeps_codes_as_tokens(self):
+        """ICD codes and dates match exactly; stopwords are ignored."""
+        bm25 = BM25Index()
+        bm25.add(["a", "b"], ["ICD10: E11.9 diabetes", "ICD10: I10 hypertension"])
+
+        row, score, coverage = bm25.search("What is code E11.9?", k=2)[0]
+        assert bm25.ids[row] == "a"
+        assert coverage == pytest.approx(0.5)  # "code" is not in the text
+        assert bm25.search("what is the", k=2) == []
+
+    @patch('src.rag_indexer.VECTOR_STORE', 'numpy')
+    @patch('src.rag_indexer.get_embeddings', return_value=HashingEmbeddings())
+    def test_fast_path_skips_vector_search(self, mock_get_embeddings):
+        """A query fully covered by the best lexical hit never reaches the vector store."""
+        index = build_index(self.FORMS)
+        with patch.object(index, 'similarity_search', wraps=index.similarity_search) as vector_search:
+            ctx = retrieve_context("What is the NPI #?", k=1)
+
+        assert "NPI #: 1234567890" in ctx[0]
+        vector_search.assert_not_called()
+
+    @patch('src.rag_indexer.VECTOR_STORE', 'numpy')
+    @patch('src.rag_indexer.get_embeddings', return_value=HashingEmbeddings())
+    def test_partial_match_fuses_with_vector_results(self, mock_get_embeddings):
+        """Queries with unmatched terms fall through to reciprocal-rank fusion."""
+        index = build_index(self.FORMS)
+        with patch.object(index, 'similarity_search', wraps=index.similarity_search) as vector_search:
+            ctx = retrieve_context("ICD10 code for the diagnosis", k=2)
+
+        vector_search.assert_called_once()
+        assert "ICD10: E11.9" in ctx[0]
+        assert len(ctx) == 2
+
+    @patch('src.rag_indexer.VECTOR_STORE', 'numpy')
+    @patch('src.rag_indexer.get_embeddings', return_value=HashingEmbeddings())
+    def test_field_lookup_recall_and_latency(self, mock_get_embeddings, sample_form_text):
+        """Every "Label: value" field is retrievable by its label within k=3, quickly."""
+        import time
+        forms = [(f"form{i}", sample_form_text.replace("John Doe", f"Patient {i}")) for i in range(50)]
+        forms += self.FORMS
+        index = build_index(forms)
+        assert len(lexical_index(index)) == len(forms)
+
+        questions = {"NPI #": "1234567890", "ICD10": "E11.9", "DOB": "02/14/1980", "Urgency": "Urgent"}
+        start = time.perf_counter()
+        hits = sum(any(v in c for c in retrieve_context(f"{label}?", k=3)) for label, v in questions.items())
+        elapsed = time.perf_counter() - start
+
+        assert hits / len(questions) == 1.0
+        assert elapsed / len(questions) < 0.05
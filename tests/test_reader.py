@@ -13,8 +13,17 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from src.reader import (
     load_document_text,
+    _ocr_image,
     _read_pdf_text,
     _ocr_tesseract,
+    _donut_extract_form_data_batch,
+    _donut_analyze,
+    _ocr_scanned_pdf,
+    _iter_scanned_pdf_pages,
+    iter_document_pages,
+    warmup,
+    model_status,
+    models_ready,
     HAS_EASYOCR,
     HAS_DONUT
 )
@@ -34,25 +43,587 @@ class TestPDFReading:
 class TestOCR:
     """Test OCR functions."""
     
-    @patch('src.reader.pytesseract.image_to_string')
-    @patch('src.reader.cv2.imread')
-    def test_ocr_tesseract_basic(self, mock_imread, mock_tesseract):
-        """Test Tesseract OCR function."""
-        mock_imread.return_value = MagicMock()
-        mock_tesseract.return_value = "Sample OCR text"
+    @patch('src.reader.pytesseract.image_to_data')
+    def test_ocr_tesseract_basic(self, mock_tesseract, tmp_path):
+        """Test Tesseract OCR function: lines rebuilt from word data, mean word confidence."""
+        from PIL import Image
+        path = tmp_path / "test.png"
+        Image.new("RGB", (16, 8), "white").save(path)
+        mock_tesseract.return_value = {
+            "text": ["", "Sample", "OCR", "text"],
+            "conf": ["-1", "90", "80", "70"],
+            "block_num": [1, 1, 1, 1], "par_num": [1, 1, 1, 1], "line_num": [0, 1, 1, 2],
+        }
         
-        result = _ocr_tesseract("test.png")
-        assert isinstance(result, str)
+        text, confidence = _ocr_tesseract(str(path))
+        assert text == "Sample OCR\ntext"
+        assert confidence == pytest.approx(0.8)
         mock_tesseract.assert_called_once()
+        assert mock_tesseract.call_args.args[0].shape == (8, 16)
+
+
+    def test_tesseract_uses_persistent_pool(self, tmp_path):
+        """With tesserocr available, pages go to the shared pool instead of a tesseract process."""
+        from PIL import Image
+        path = tmp_path / "scan.png"
+        Image.new("RGB", (16, 8), "white").save(path)
+        pool = MagicMock()
+        pool.image_to_data.return_value = {
+            "text": ["Sample", "OCR"], "conf": [90.0, 70.0],
+            "block_num": [1, 1], "par_num": [1, 1], "line_num": [1, 1],
+        }
+
+        with patch('src.reader._get_tesseract_pool', return_value=pool), \
+                patch('src.reader.pytesseract.image_to_data') as subprocess_ocr:
+            text, confidence = _ocr_tesseract(str(path))
+
+        assert text == "Sample OCR"
+        assert confidence == pytest.approx(0.8)
+        subprocess_ocr.assert_not_called()
+
+    TSV_FALLBACK = {"text": ["Fallback"], "conf": [50], "block_num": [1], "par_num": [1], "line_num": [1]}
+
+    def test_tesseract_pool_failure_falls_back_to_subprocess(self, tmp_path):
+        """Engines that cannot be created switch the process to pytesseract."""
+        from PIL import Image
+        from src.reader import TesseractUnavailable
+        path = tmp_path / "scan.png"
+        Image.new("RGB", (16, 8), "white").save(path)
+        pool = MagicMock()
+        pool.image_to_data.side_effect = TesseractUnavailable("Failed to init API")
+
+        with patch('src.reader.HAS_TESSEROCR', True), \
+                patch('src.reader.TESSERACT_BACKEND', "auto"), \
+                patch('src.reader._tesseract_pool', pool), \
+                patch('src.reader.pytesseract.image_to_data', return_value=self.TSV_FALLBACK):
+            text, _ = _ocr_tesseract(str(path))
+            import src.reader
+            assert src.reader._tesseract_pool is False
+
+        assert text == "Fallback"
+
+    def test_tesseract_page_error_keeps_pool(self, tmp_path):
+        """A failure on one page falls back for that page only."""
+        from PIL import Image
+        import src.reader
+        path = tmp_path / "scan.png"
+        Image.new("RGB", (16, 8), "white").save(path)
+        pool = MagicMock()
+        pool.image_to_data.side_effect = RuntimeError("bad page")
+
+        with patch('src.reader.HAS_TESSEROCR', True), \
+                patch('src.reader.TESSERACT_BACKEND', "auto"), \
+                patch('src.reader._tesseract_pool', pool), \
+                patch('src.reader.pytesseract.image_to_data', return_value=self.TSV_FALLBACK):
+            text, _ = _ocr_tesseract(str(path))
+            assert src.reader._tesseract_pool is pool
+
+        assert text == "Fallback"
+
+    def test_engines_share_one_decode(self, tmp_path):
+        """Every engine in the cascade reads the same decoded page."""
+        import numpy as np
+        from PIL import Image
+        import src.reader
+        path = tmp_path / "scan.png"
+        # Some ink, so the page classifier (which reads the same decode) does not route it as blank
+        pixels = np.full((8, 16, 3), 255, dtype=np.uint8)
+        pixels[2:6, 3:12] = 0
+        Image.fromarray(pixels).save(path)
+
+        def failing_easyocr(page):
+            page.rgb
+            raise RuntimeError("EasyOCR failed")
+
+        real_decode = src.reader.PageImage._decode
+        with patch.object(src.reader.PageImage, "_decode", side_effect=real_decode) as decode, \
+                patch('src.reader.HAS_EASYOCR', True), \
+                patch('src.reader._ocr_easyocr', side_effect=failing_easyocr), \
+                patch('src.reader.pytesseract.image_to_data', return_value={"text": []}), \
+                patch('src.reader._ocr_google_vision', side_effect=lambda page: page.encoded and "Vision text"):
+            doc_id, text = load_document_text(str(path))
+
+        assert text == "Vision text"
+        assert decode.call_count == 1
+
+
+
+class TestOCRCascade:
+    """Test the scored cascade: early exit, best-of fallback and racing."""
+
+    GOOD = "Patient Name: John Doe\nDOB: 02/14/1980\nProvider: Dr. Smith\nDiagnosis: Hypertension"
+    GARBAGE = "l|I; ,rn ~ ]]Ir 1l1 ;:| ff.. ,,,, ##@ !l|"
+
+    def _run(self, engines, order, race=False):
+        from PIL import Image
+        calls = []
+
+        def engine(name):
+            def run(page):
+                calls.append(name)
+                result = engines[name]
+                return result() if callable(result) else result
+            return run
+
+        with patch('src.reader.HAS_EASYOCR', True), \
+                patch('src.reader.OCR_RACE_ENGINES', race), \
+                patch('src.reader._ocr_easyocr', side_effect=engine("easyocr")), \
+                patch('src.reader._ocr_tesseract', side_effect=engine("tesseract")), \
+                patch('src.reader._ocr_google_vision', side_effect=engine("google_vision")):
+            timings = {}
+            text, name = _ocr_image(Image.new("RGB", (8, 8)), timings, engines=order)
+        return text, name, calls, timings
+
+    def test_good_result_stops_the_cascade(self):
+        """An acceptable first result means later engines never run."""
+        text, name, calls, timings = self._run(
+            {"easyocr": self.GOOD, "tesseract": self.GOOD}, ["easyocr", "tesseract", "google_vision"]
+        )
+
+        assert (text, name) == (self.GOOD, "easyocr")
+        assert calls == ["easyocr"]
+        assert timings["ocr_score"] >= 0.6 and "ocr_easyocr" in timings
+
+    def test_garbage_falls_through_to_next_engine(self):
+        """Non-empty but low-quality output no longer ends the cascade."""
+        text, name, calls, _ = self._run(
+            {"easyocr": self.GARBAGE, "tesseract": (self.GOOD, 0.9), "google_vision": ""},
+            ["easyocr", "tesseract", "google_vision"],
+        )
+
+        assert name == "tesseract"
+        assert calls == ["easyocr", "tesseract"]
+
+    def test_best_result_when_nothing_is_acceptable(self):
+        """If no engine reaches the threshold, the highest-scoring text wins."""
+        text, name, calls, _ = self._run(
+            {"easyocr": self.GARBAGE, "tesseract": ("Patient Doe", 0.2), "google_vision": ""},
+            ["easyocr", "tesseract", "google_vision"],
+        )
+
+        assert (text, name) == ("Patient Doe", "tesseract")
+        assert calls == ["easyocr", "tesseract", "google_vision"]
+
+    def test_racing_keeps_first_acceptable_result(self):
+        """With racing, a fast acceptable engine wins without waiting for a slow one."""
+        import time
+
+        def slow():
+            time.sleep(1.0)
+            return self.GOOD
+
+        t0 = time.perf_counter()
+        text, name, calls, _ = self._run(
+            {"easyocr": slow, "tesseract": self.GOOD}, ["easyocr", "tesseract", "google_vision"], race=True
+        )
+
+        assert name == "tesseract"
+        assert time.perf_counter() - t0 < 0.9
+        assert "google_vision" not in calls
+
+
+    def test_engines_read_the_preprocessed_page(self):
+        """Oversize scans are normalized once before any engine sees them."""
+        import numpy as np
+        from functools import partial
+        import src.reader
+        shapes = []
+        downscale = partial(src.reader.preprocess_page, steps=["downscale"], target_dpi=200)
+
+        with patch('src.reader.HAS_EASYOCR', True), \
+                patch('src.reader.preprocess_page', side_effect=downscale), \
+                patch('src.reader._ocr_easyocr', side_effect=lambda page: shapes.append(page.shape) or ""), \
+                patch('src.reader._ocr_tesseract', side_effect=lambda page: shapes.append(page.shape) or ("", None)), \
+                patch('src.reader._ocr_google_vision', return_value=""):
+            timings = {}
+            _ocr_image(np.full((3300, 2550), 255, dtype=np.uint8), timings, engines=["easyocr", "tesseract"])
+
+        assert shapes == [(2200, 1700, 3)] * 2
+        assert "preprocess" in timings
+
+
+class TestPageClassifier:
+    """Test the page classifier and the engine order it picks."""
+
+    @staticmethod
+    def _form(seed=0):
+        import cv2
+        import numpy as np
+        page = np.full((1400, 1000), 255, dtype=np.uint8)
+        for y in range(60, 1360, 40):
+            cv2.putText(page, "Patient Name: John Doe  DOB: 02/14/1980", (40, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+        return page
+
+    def test_clean_print_routes_to_tesseract_first(self):
+        from src.reader import classify_page
+        decision = classify_page(self._form())
+
+        assert decision["kind"] == "printed"
+        assert decision["engines"][0] == "tesseract"
+
+    def test_fax_noise_routes_to_easyocr_first(self):
+        import numpy as np
+        from src.reader import classify_page
+        page = self._form()
+        speckle = np.random.default_rng(0).random(page.shape)
+        page[speckle < 0.01] = 0
+        page[speckle > 0.99] = 255
+
+        decision = classify_page(page)
+        assert decision["kind"] == "fax"
+        assert decision["engines"][0] == "easyocr"
+
+    def test_uneven_lighting_is_a_photo(self):
+        import numpy as np
+        from src.reader import classify_page
+        shade = np.linspace(0, 120, 1000)[None, :]
+        page = np.clip(self._form().astype(float) - shade, 0, 255).astype(np.uint8)
+
+        assert classify_page(page)["kind"] == "photo"
+
+    def test_blank_page(self):
+        import numpy as np
+        from src.reader import classify_page
+        decision = classify_page(np.full((800, 600), 250, dtype=np.uint8))
+
+        assert decision["kind"] == "blank"
+        assert decision["engines"] == ("tesseract",)
+
+    def test_cascade_follows_route_and_records_it(self):
+        """Without explicit engines, _ocr_image uses the classifier's order and records the class."""
+        calls = []
+
+        def engine(name, result):
+            return lambda page: calls.append(name) or result
+
+        with patch('src.reader.HAS_EASYOCR', True), \
+                patch('src.reader.OCR_ROUTING', True), \
+                patch('src.reader._ocr_easyocr', side_effect=engine("easyocr", "")), \
+                patch('src.reader._ocr_tesseract', side_effect=engine("tesseract", (TestOCRCascade.GOOD, 0.9))):
+            timings = {}
+            text, name = _ocr_image(self._form(), timings)
+
+        assert name == "tesseract"
+        assert calls == ["tesseract"]
+        assert timings["page_class"] == "printed" and "classify" in timings
+
+    def test_routing_off_keeps_configured_order(self):
+        calls = []
+
+        with patch('src.reader.HAS_EASYOCR', True), \
+                patch('src.reader.OCR_ROUTING', False), \
+                patch('src.reader._ocr_easyocr', side_effect=lambda page: calls.append("easyocr") or TestOCRCascade.GOOD), \
+                patch('src.reader._ocr_tesseract', side_effect=lambda page: calls.append("tesseract") or ("", None)):
+            timings = {}
+            _, name = _ocr_image(self._form(), timings)
+
+        assert name == "easyocr" and calls == ["easyocr"]
+        assert "page_class" not in timings
+
+    def test_checkbox_pages_never_load_donut(self):
+        """Checkboxes enable Donut only once it is loaded; routing must not start the (multi-GB) load."""
+        from src.reader import _engine_ready, as_page
+        page = as_page(self._form())
+
+        with patch('src.reader._ensure_donut_loaded') as load, \
+                patch.dict('src.reader._model_status', {"donut": "not_loaded"}):
+            assert not _engine_ready("donut", page, checkboxes=60)
+        with patch('src.reader._ensure_donut_loaded') as load_ready, \
+                patch.dict('src.reader._model_status', {"donut": "ready"}):
+            assert _engine_ready("donut", page, checkboxes=60)
+            assert not _engine_ready("donut", page, checkboxes=2)
+
+        load.assert_not_called()
+        load_ready.assert_not_called()
+
+
+class TestDonutBatch:
+    """Test batched Donut extraction."""
+
+    def test_batch_runs_one_generate_per_batch(self, tmp_path):
+        """Pages are grouped into batches and results keep input order."""
+        import torch
+        from PIL import Image
+
+        paths = []
+        for i in range(5):
+            p = tmp_path / f"form{i}.png"
+            Image.new("RGB", (8, 8)).save(p)
+            paths.append(str(p))
+
+        processor = MagicMock()
+        processor.tokenizer.return_value.input_ids = torch.ones((1, 4), dtype=torch.long)
+        processor.side_effect = lambda images, return_tensors: MagicMock(
+            pixel_values=torch.zeros((len(images), 3, 8, 8))
+        )
+        model = MagicMock()
+        model.generate.side_effect = lambda pixel_values, decoder_input_ids, **kw: torch.ones(
+            (pixel_values.shape[0], 6), dtype=torch.long
+        )
+        counter = iter(range(100))
+        processor.batch_decode.side_effect = lambda ids, skip_special_tokens: [
+            '{"page": %d}' % next(counter) for _ in range(ids.shape[0])
+        ]
+
+        with patch('src.reader._ensure_donut_loaded', return_value=True), \
+                patch('src.reader._donut_processor', processor), \
+                patch('src.reader._donut_model', model):
+            results = _donut_extract_form_data_batch(paths + ["missing.png"], batch_size=2)
+
+        assert model.generate.call_count == 3
+        assert [r.get("page") for r in results[:5]] == [0, 1, 2, 3, 4]
+        assert results[5] == {}
+
+
+class TestDonutEncoderReuse:
+    """Test that one image encoding serves several decoder prompts."""
+
+    def test_analyze_encodes_image_once(self, tmp_path):
+        """Extraction and every question share a single encoder pass."""
+        import torch
+        from PIL import Image
+        import src.reader
+
+        path = tmp_path / "form.png"
+        Image.new("RGB", (8, 8)).save(path)
+
+        processor = MagicMock()
+        processor.return_value.pixel_values = torch.zeros((1, 3, 8, 8))
+        processor.tokenizer.return_value.input_ids = torch.ones((1, 4), dtype=torch.long)
+        processor.batch_decode.return_value = ['{"Urgency": "Urgent"}']
+        model = MagicMock()
+        model.encoder.return_value = MagicMock(last_hidden_state=torch.zeros((1, 10, 16)))
+        model.generate.return_value = torch.ones((1, 6), dtype=torch.long)
+
+        src.reader._donut_encodings.clear()
+        with patch('src.reader._ensure_donut_loaded', return_value=True), \
+                patch('src.reader._donut_processor', processor), \
+                patch('src.reader._donut_model', model):
+            data, answers = _donut_analyze(str(path), ["Who is the patient", "Is it urgent"])
+
+        assert data == {"Urgency": "Urgent"}
+        assert set(answers) == {"Who is the patient", "Is it urgent"}
+        assert model.encoder.call_count == 1
+        assert model.generate.call_count == 3
+        for call in model.generate.call_args_list:
+            assert "encoder_outputs" in call.kwargs
+            assert "pixel_values" not in call.kwargs
+
+    def test_encoder_cache_shared_across_threads(self):
+        """Concurrent lookups, inserts and evictions keep the LRU consistent and bounded."""
+        import numpy as np
+        import src.reader
+        from concurrent.futures import ThreadPoolExecutor
+        from src.reader import PageImage, _donut_encode
+
+        pages = [PageImage(np.zeros((8, 8, 3), dtype=np.uint8), digest=f"page-{i}") for i in range(12)]
+        processor = MagicMock()
+        model = MagicMock()
+        model.encoder.side_effect = lambda pixel_values: object()
+
+        src.reader._donut_encodings.clear()
+        with patch('src.reader._donut_processor', processor), \
+                patch('src.reader._donut_model', model), \
+                patch('src.reader.DONUT_ENCODER_CACHE_SIZE', 4), \
+                ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(_donut_encode, pages * 40))
+
+        assert len(src.reader._donut_encodings) <= 4
+        assert set(src.reader._donut_encodings) <= {page.digest for page in pages}
+
+
+class TestScannedPDF:
+    """Test page-parallel OCR of PDFs without a text layer."""
+
+    @staticmethod
+    def _fake_page(path, page_no, dpi, pdf_digest=None):
+        return page_no, f"page {page_no}", "tesseract", {"ocr": 0.0}
+
+    def test_scanned_pdf_pages_inline(self, tmp_path):
+        """With one worker, pages are OCR'd in order without a pool."""
+        with patch('src.reader._pdf_page_count', return_value=3), \
+                patch('src.reader._ocr_pdf_page', side_effect=self._fake_page), \
+                patch('src.reader._get_ocr_pool') as mock_pool:
+            text = _ocr_scanned_pdf(str(tmp_path / "scan.pdf"), max_workers=1)
+
+        assert text == "page 1\npage 2\npage 3"
+        mock_pool.assert_not_called()
+
+    def test_scanned_pdf_pages_reassembled_in_order(self, tmp_path):
+        """Pages finishing out of order are still yielded in page order."""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        def slow_first_pages(path, page_no, dpi, pdf_digest=None):
+            time.sleep(0.05 * (5 - page_no))
+            return self._fake_page(path, page_no, dpi)
+
+        with ThreadPoolExecutor(max_workers=4) as pool, \
+                patch('src.reader._pdf_page_count', return_value=4), \
+                patch('src.reader._ocr_pdf_page', side_effect=slow_first_pages), \
+                patch('src.reader._get_ocr_pool', return_value=pool):
+            pages = list(_iter_scanned_pdf_pages(str(tmp_path / "scan.pdf"), max_workers=4))
+
+        assert [p[0] for p in pages] == [1, 2, 3, 4]
+        assert pages[0][1] == "page 1"
+
+    def test_page_cache_follows_ocr_settings(self, tmp_path):
+        """Cached page text is reused only while the cascade settings stay the same."""
+        from PIL import Image
+        from src.reader import _ocr_pdf_page
+        from src.disk_cache import DiskCache
+        cache = DiskCache(str(tmp_path / "ocr.sqlite"))
+
+        with patch('src.reader._get_ocr_cache', return_value=cache), \
+                patch('src.reader._rasterize_pdf_page', return_value=Image.new("RGB", (8, 8))), \
+                patch('src.reader._ocr_image', return_value=("page text", "tesseract")) as ocr:
+            _ocr_pdf_page("scan.pdf", 1, 200, "abc")
+            assert _ocr_pdf_page("scan.pdf", 1, 200, "abc")[3] == {"cached": True}
+            with patch('src.reader.OCR_PREPROCESS', ["downscale"]):
+                _ocr_pdf_page("scan.pdf", 1, 200, "abc")
+            with patch('src.reader.OCR_ENGINES', ["tesseract"]):
+                _ocr_pdf_page("scan.pdf", 1, 200, "abc")
+
+        assert ocr.call_count == 3
+
+    @staticmethod
+    def _pdf(*page_texts):
+        """A stand-in PdfReader whose pages have the given text layers ("" = scanned page)."""
+        reader = MagicMock()
+        reader.pages = [MagicMock(**{"extract_text.return_value": text}) for text in page_texts]
+        return MagicMock(return_value=reader)
+
+    def test_load_document_text_scanned_pdf_fallback(self, tmp_path):
+        """PDFs without a text layer fall back to rasterize-and-OCR."""
+        pdf_path = tmp_path / "scan.pdf"
+        pdf_path.write_text("dummy")
+
+        with patch('src.reader.PdfReader', self._pdf("  ", "")), \
+                patch('src.reader._ocr_pdf_page', side_effect=self._fake_page):
+            doc_id, text = load_document_text(str(pdf_path))
+
+        assert text == "page 1\npage 2"
+
+    def test_load_document_text_mixed_pdf(self, tmp_path):
+        """Scanned pages between text-layer pages are OCR'd, as iter_document_pages does."""
+        pdf_path = tmp_path / "mixed.pdf"
+        pdf_path.write_text("dummy")
+
+        with patch('src.reader.PdfReader', self._pdf("Cover letter", "", "Signature page")), \
+                patch('src.reader._ocr_pdf_page', side_effect=self._fake_page) as ocr:
+            _, text = load_document_text(str(pdf_path))
+            pages = [p[1] for p in iter_document_pages(str(pdf_path))]
+
+        assert text == "Cover letter\npage 2\nSignature page"
+        assert text == "\n".join(pages)
+        assert [c.args[1] for c in ocr.call_args_list] == [2, 2]
+
+
+class TestPageStreaming:
+    """Test the page-level generator API."""
+
+    def test_iter_document_pages_image(self, tmp_path):
+        """Images are yielded as a single page with engine and timings."""
+        img_path = tmp_path / "form.png"
+        img_path.write_bytes(b"fake image data")
+
+        with patch('src.reader._ocr_image', return_value=("Tesseract text", "tesseract")):
+            pages = list(iter_document_pages(str(img_path)))
+
+        assert len(pages) == 1
+        page_no, text, engine, timings = pages[0]
+        assert (page_no, text, engine) == (1, "Tesseract text", "tesseract")
+        assert "ocr" in timings
+
+    def test_iter_document_pages_mixed_pdf(self, tmp_path):
+        """Text-layer pages stream directly; pages without text are OCR'd in order."""
+        pdf_path = tmp_path / "mixed.pdf"
+        pdf_path.write_text("dummy")
+        reader = MagicMock()
+        reader.pages = [MagicMock(), MagicMock(), MagicMock()]
+        reader.pages[0].extract_text.return_value = "Cover letter"
+        reader.pages[1].extract_text.return_value = ""
+        reader.pages[2].extract_text.return_value = "Signature page"
+
+        def fake_scanned(path, pages=None, **kw):
+            for p in pages:
+                yield p, f"ocr page {p}", "tesseract", {"ocr": 0.0}
+
+        with patch('src.reader.PdfReader', return_value=reader), \
+                patch('src.reader._iter_scanned_pdf_pages', side_effect=fake_scanned):
+            pages = list(iter_document_pages(str(pdf_path)))
+
+        assert [(p[0], p[1], p[2]) for p in pages] == [
+            (1, "Cover letter", "pypdf"),
+            (2, "ocr page 2", "tesseract"),
+            (3, "Signature page", "pypdf"),
+        ]
+
+
+class TestWarmup:
+    """Test background model pre-loading."""
+
+    def test_warmup_background_loads_models(self):
+        """warmup() runs each loader off the calling thread."""
+        import threading
+        loaded = []
+        loaders = {
+            "easyocr": lambda: loaded.append(("easyocr", threading.current_thread().name)),
+            "donut": lambda: loaded.append(("donut", threading.current_thread().name)),
+        }
+        with patch.dict('src.reader._WARMUP_LOADERS', loaders):
+            thread = warmup(("easyocr", "donut"))
+            thread.join(timeout=5)
+
+        assert [name for name, _ in loaded] == ["easyocr", "donut"]
+        assert all(t == "model-warmup" for _, t in loaded)
+
+    @patch.dict(os.environ, {'DISABLE_DONUT': 'true'})
+    def test_model_status_reports_disabled(self):
+        """Disabled models are reported and count as settled."""
+        with patch.dict('src.reader._model_status', {"donut": "not_loaded"}):
+            warmup(("donut",), background=False)
+            assert model_status()["donut"] == "disabled"
+            assert models_ready(("donut",))
+
+
+class TestLazyImports:
+    """Test that heavy engine dependencies are only imported on use."""
+
+    def test_reader_import_skips_heavy_dependencies(self):
+        """Importing reader does not import torch, transformers, cv2 or Google Vision."""
+        import subprocess
+        src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+        code = (
+            "import sys, reader; "
+            "heavy = [m for m in ('torch', 'transformers', 'cv2', 'pytesseract', 'google.cloud.vision', 'easyocr') "
+            "if m in sys.modules]; "
+            "print(','.join(heavy))"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            env=dict(os.environ, PYTHONPATH=src_dir),
+            capture_output=True, text=True, check=True,
+        )
+        assert out.stdout.strip() == ""
+
+    def test_lazy_module_imports_on_first_access(self):
+        """LazyModule resolves attributes from the real module once touched."""
+        from src.lazy_import import LazyModule
+        lazy_json = LazyModule("json")
+
+        assert "not loaded" in repr(lazy_json)
+        assert lazy_json.dumps({"a": 1}) == '{"a": 1}'
+        assert "(loaded)" in repr(lazy_json)
 
 
 class TestDocumentLoading:
     """Test main document loading function."""
     
-    @patch('src.reader._read_pdf_text')
-    def test_load_document_text_pdf(self, mock_pdf_read, tmp_path):
+    @patch('src.reader._iter_pdf_pages')
+    def test_load_document_text_pdf(self, mock_pdf_pages, tmp_path):
         """Test loading a PDF document."""
-        mock_pdf_read.return_value = "PDF text content"
+        mock_pdf_pages.return_value = iter([(1, "PDF text content", "pypdf", {})])
         
         pdf_path = tmp_path / "test.pdf"
         pdf_path.write_text("dummy")
@@ -64,9 +635,10 @@ class TestDocumentLoading:
         assert text == "PDF text content"
     
     @patch.dict(os.environ, {'DISABLE_EASYOCR': 'false'})
+    @patch('src.reader._ocr_google_vision', return_value="")
     @patch('src.reader._ocr_easyocr')
     @patch('src.reader._ocr_tesseract')
-    def test_load_document_text_image_fallback(self, mock_tesseract, mock_easyocr):
+    def test_load_document_text_image_fallback(self, mock_tesseract, mock_easyocr, mock_vision):
         """Test image loading with OCR fallback."""
         # EasyOCR fails, falls back to Tesseract
         mock_easyocr.side_effect = Exception("EasyOCR failed")
@@ -90,6 +662,27 @@ class TestDocumentLoading:
         assert isinstance(doc_id, str)
         assert isinstance(text, str)
     
+    @patch('src.reader._ocr_google_vision', return_value="")
+    @patch('src.reader._ocr_easyocr')
+    def test_load_document_text_uses_ocr_cache(self, mock_easyocr, mock_vision, tmp_path):
+        """Re-uploading identical bytes is served from the OCR cache."""
+        from src.disk_cache import DiskCache
+        mock_easyocr.return_value = "Cached OCR text"
+        cache = DiskCache(str(tmp_path / "ocr.sqlite"))
+
+        first, second = tmp_path / "upload1.png", tmp_path / "upload2.png"
+        first.write_bytes(b"same scanned form")
+        second.write_bytes(b"same scanned form")
+
+        with patch('src.reader.HAS_EASYOCR', True), patch('src.reader._get_ocr_cache', return_value=cache):
+            doc_id1, text1 = load_document_text(str(first))
+            doc_id2, text2 = load_document_text(str(second))
+
+        assert text1 == text2 == "Cached OCR text"
+        assert mock_easyocr.call_count == 1
+        assert doc_id1.split("-")[-1] == doc_id2.split("-")[-1]
+        assert cache.stats()["hits"] == 1
+
     @pytest.mark.skipif(not Path("data/samples").exists(), reason="Sample data not available")
     def test_load_document_text_with_sample(self, sample_image_path):
         """Test with actual sample image if available."""
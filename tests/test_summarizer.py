@@ -2,20 +2,21 @@
 Tests for summarizer.py - Document summarization functionality.
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.summarizer import summarize_doc
+from src.summarizer import summarize_doc, summarize_doc_async
+from src.prompt_budget import count_tokens
 
 
 class TestSummarization:
     """Test document summarization."""
     
     @patch('src.summarizer.can_use_openai')
-    @patch('src.summarizer.OpenAI')
+    @patch('src.summarizer.get_openai_client')
     def test_summarize_doc_with_openai(self, mock_openai_class, mock_can_use, sample_extracted_fields):
         """Test summarization using OpenAI."""
         mock_can_use.return_value = True
@@ -46,7 +47,7 @@ class TestSummarization:
             assert len(result) > 0
     
     @patch('src.summarizer.can_use_openai')
-    @patch('src.summarizer.OpenAI')
+    @patch('src.summarizer.get_openai_client')
     def test_summarize_doc_handles_api_error(self, mock_openai_class, mock_can_use, sample_extracted_fields):
         """Test that summarizer handles API errors gracefully."""
         mock_can_use.return_value = True
@@ -73,7 +74,7 @@ class TestSummarization:
                 assert isinstance(result, str)
     
     @patch('src.summarizer.can_use_openai')
-    @patch('src.summarizer.OpenAI')
+    @patch('src.summarizer.get_openai_client')
     def test_summarize_doc_clips_text(self, mock_openai_class, mock_can_use, sample_extracted_fields):
         """Test that summarizer clips long text input."""
         mock_can_use.return_value = True
@@ -93,3 +94,34 @@ class TestSummarization:
         
         # Verify OpenAI was called (should work with clipped text)
         assert mock_client.chat.completions.create.called
+
+    @patch('src.summarizer.can_use_openai', return_value=True)
+    @patch('src.summarizer.get_async_openai_client')
+    def test_summarize_doc_async(self, mock_get_client, mock_can_use, sample_extracted_fields):
+        """The async variant awaits the async client; failures use the field fallback."""
+        import asyncio
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "- Patient: John Doe"
+        create = mock_get_client.return_value.chat.completions.create = AsyncMock(return_value=response)
+
+        assert asyncio.run(summarize_doc_async(sample_extracted_fields, "text")) == "- Patient: John Doe"
+
+        create.side_effect = Exception("API Error")
+        assert "Patient Name: John Doe" in asyncio.run(summarize_doc_async(sample_extracted_fields, "text"))
+
+    @patch('src.summarizer.can_use_openai', return_value=True)
+    @patch('src.summarizer.get_openai_client')
+    def test_prompt_stays_within_token_budget(self, mock_get_client, mock_can_use, sample_extracted_fields):
+        """Long form text is clipped to SUMMARY_PROMPT_TOKENS; every field is still sent."""
+        create = mock_get_client.return_value.chat.completions.create
+        create.return_value.choices = [MagicMock()]
+        create.return_value.choices[0].message.content = "- Patient: John Doe"
+
+        with patch('src.summarizer.SUMMARY_PROMPT_TOKENS', 300):
+            summarize_doc(sample_extracted_fields, "Clinical notes follow. " * 2000)
+
+        prompt = create.call_args.kwargs["messages"][0]["content"]
+        assert count_tokens(prompt) <= 300
+        assert "NPI #: 1234567890" in prompt
+        assert "Clinical notes follow." in prompt
@@ -0,0 +1,118 @@
+"""
+Tests for tesseract_pool.py - Persistent in-process Tesseract engines.
+"""
+import pytest
+import threading
+import time
+import numpy as np
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.tesseract_pool import TesseractPool, TesseractUnavailable, parse_tsv
+
+TSV = (
+    "1\t1\t0\t0\t0\t0\t0\t0\t16\t8\t-1\t\n"
+    "5\t1\t1\t1\t1\t1\t0\t0\t8\t8\t96.5\tSample\n"
+    "5\t1\t1\t1\t1\t2\t8\t0\t8\t8\t90\tOCR\n"
+    "5\t1\t1\t1\t2\t1\t0\t4\t8\t4\t81.25\ttext\n"
+)
+
+
+def fake_tesserocr(tsv=TSV, created=None):
+    module = MagicMock()
+
+    def make_api(lang):
+        api = MagicMock()
+        api.GetTSVText.return_value = tsv
+        if created is not None:
+            created.append(api)
+        return api
+
+    module.PyTessBaseAPI.side_effect = make_api
+    return module
+
+
+class TestParseTSV:
+    """Test conversion of Tesseract TSV to the pytesseract dict."""
+
+    def test_rows_become_columns(self):
+        data = parse_tsv(TSV)
+
+        assert data["text"] == ["", "Sample", "OCR", "text"]
+        assert data["conf"] == [-1, 96.5, 90, 81.25]
+        assert data["line_num"] == [0, 1, 1, 2]
+        assert data["word_num"][1:] == [1, 2, 1]
+
+    def test_header_and_empty_input(self):
+        header = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+        assert parse_tsv(header + TSV)["text"] == ["", "Sample", "OCR", "text"]
+        assert parse_tsv("")["text"] == []
+
+
+class TestTesseractPool:
+    """Test engine reuse and buffer hand-off."""
+
+    def test_engine_is_reused_and_fed_raw_bytes(self):
+        created = []
+        gray = np.arange(16 * 8, dtype=np.uint8).reshape(8, 16)
+
+        with patch('src.tesseract_pool.tesserocr', fake_tesserocr(created=created)):
+            pool = TesseractPool(size=2)
+            first = pool.image_to_data(gray)
+            pool.image_to_data(gray[:, ::2])
+
+        assert len(created) == 1
+        assert first["text"][1:] == ["Sample", "OCR", "text"]
+        args = created[0].SetImageBytes.call_args_list
+        assert args[0].args == (gray.tobytes(), 16, 8, 1, 16)
+        assert args[1].args[1:] == (8, 8, 1, 8)
+
+    def test_concurrent_callers_get_separate_engines(self):
+        created, barrier = [], threading.Barrier(3)
+        module = fake_tesserocr(created=created)
+        original = module.PyTessBaseAPI.side_effect
+
+        def slow_api(lang):
+            api = original(lang)
+            api.GetTSVText.side_effect = lambda page: time.sleep(0.05) or TSV
+            return api
+
+        module.PyTessBaseAPI.side_effect = slow_api
+        with patch('src.tesseract_pool.tesserocr', module):
+            pool = TesseractPool(size=2)
+
+            def work():
+                barrier.wait()
+                pool.image_to_data(np.zeros((4, 4), dtype=np.uint8))
+
+            threads = [threading.Thread(target=work) for _ in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert len(created) == 2
+
+    def test_failed_engine_is_not_counted(self):
+        module = MagicMock()
+        module.PyTessBaseAPI.side_effect = RuntimeError("Failed to init API, possibly an invalid tessdata path")
+
+        with patch('src.tesseract_pool.tesserocr', module):
+            pool = TesseractPool(size=1)
+            with pytest.raises(TesseractUnavailable):
+                pool.image_to_data(np.zeros((4, 4), dtype=np.uint8))
+
+        assert pool._created == 0
+
+    def test_close_ends_idle_engines(self):
+        created = []
+        with patch('src.tesseract_pool.tesserocr', fake_tesserocr(created=created)):
+            pool = TesseractPool(size=1)
+            pool.image_to_data(np.zeros((4, 4), dtype=np.uint8))
+            pool.close()
+
+        created[0].End.assert_called_once()
+        assert pool._created == 0